@@ -0,0 +1,146 @@
+"""Headless batch scoring of attack scenarios with the dashboard models.
+
+Reads a CSV or Parquet file of scenarios (the dashboard's categorical
+features as labels or ``*_encoded`` codes, plus the numeric features),
+encodes each chunk in one vectorized pass, and scores the chunks across a
+process pool. Output rows carry the input columns plus the decoded attack
+type, target industry and financial loss predictions. With ``--explain``
+they also carry each model's per-feature contributions (tree-path
+attributions from the flat exports, for the predicted class of the
+classifiers), computed once per unique encoded scenario in a chunk.
+
+Usage::
+
+    python batch_score.py scenarios.parquet predictions.parquet --workers 8
+    python batch_score.py scenarios.csv explained.csv --explain
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from cyber_data import DATA_PATH, FEATURE_COLUMNS, encode_scenarios
+from cyber_models import decode_contributions, decode_predictions, explain_all, load_current_models, predict_all
+from flat_forest import FlatForest
+
+DEFAULT_CHUNKSIZE = 100_000
+
+_worker_models = None
+_worker_explainers = None
+
+
+def _init_worker(models, explainer_paths=None):
+    global _worker_models, _worker_explainers
+    _worker_models = models
+    # Each worker memory-maps the flat exports itself, so they share the page cache instead of being copied
+    if explainer_paths is not None:
+        _worker_explainers = {name: FlatForest.load(path) for name, path in explainer_paths.items()}
+
+
+def _score_chunk(X):
+    predictions = predict_all(_worker_models, pd.DataFrame(X, columns=FEATURE_COLUMNS))
+    explanations = explain_all(_worker_explainers, X) if _worker_explainers is not None else None
+    return predictions, explanations
+
+
+def read_chunks(path, chunksize):
+    """Yield DataFrame chunks of a CSV or Parquet file."""
+    if Path(path).suffix.lower() in ('.parquet', '.pq'):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet output file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.parquet = self.path.suffix.lower() in ('.parquet', '.pq')
+        self._writer = None
+        self._schema = None
+        self._first = True
+
+    def write(self, frame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            # Later chunks are converted to the first chunk's schema (e.g. an int column with NaNs)
+            table = pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def score_file(source, output, chunksize=DEFAULT_CHUNKSIZE, workers=None, data_path=DATA_PATH, explain=False):
+    """Score every scenario in ``source`` and write predictions to ``output``.
+
+    At most ``2 * workers`` chunks are in flight, so memory stays bounded by
+    the chunk size rather than the input size. Returns the number of rows.
+    """
+    models, label_encoders = load_current_models(data_path)
+    explainer_paths = None
+    if explain:
+        explainers = load_current_models(data_path, flat=True)[0]
+        explainer_paths = {name: forest.path for name, forest in explainers.items()}
+    workers = workers or os.cpu_count() or 1
+    writer = ChunkWriter(output)
+    rows, pending = 0, []
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(models, explainer_paths)) as pool:
+            def drain(limit):
+                nonlocal rows
+                while len(pending) > limit:
+                    frame, future = pending.pop(0)
+                    predictions, explanations = future.result()
+                    decoded = decode_predictions(predictions, label_encoders)
+                    if explanations is not None:
+                        decoded.update(decode_contributions(explanations))
+                    writer.write(frame.assign(**decoded))
+                    rows += len(frame)
+
+            for frame in read_chunks(source, chunksize):
+                X = encode_scenarios(frame, label_encoders).to_numpy()
+                pending.append((frame, pool.submit(_score_chunk, X)))
+                drain(2 * workers)
+            drain(0)
+    finally:
+        # Close even on failure so a Parquet output is still a readable file
+        writer.close()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score attack scenarios with the dashboard models.")
+    parser.add_argument("scenarios", help="CSV or Parquet file of scenarios")
+    parser.add_argument("output", help="CSV or Parquet file to write predictions to")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows per scoring chunk")
+    parser.add_argument("--workers", type=int, default=None, help="scoring processes (default: all cores)")
+    parser.add_argument("--data", default=str(DATA_PATH), help="dataset the models were trained on")
+    parser.add_argument("--explain", action="store_true", help="add per-feature contribution columns")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rows = score_file(args.scenarios, args.output, args.chunksize, args.workers, args.data, args.explain)
+    seconds = time.perf_counter() - start
+    print(f"Scored {rows:,} scenarios in {seconds:.2f}s ({rows / max(seconds, 1e-9):,.0f} rows/s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Scaling benchmark for the dashboard pipeline on synthetic incident data.
+
+Generates incident files that match the schema and category cardinalities of
+``clean_global_cybersecurity_threats.csv`` (categorical labels drawn with the
+sample's frequencies, numeric columns drawn over the sample's ranges) and
+times every pipeline stage at each size:
+
+    load_clean, label_encoding, incident_cube, charts, trend_tables,
+    training, batch_prediction, metrics
+
+Each stage is timed with ``perf_instrumentation.PerfRecorder`` and records
+wall time, process CPU time and peak Python-tracked memory (tracemalloc, so
+allocations in the training worker processes are not included). Results
+are appended as JSON lines, and ``--compare`` fails the run when a stage got
+slower than a previous results file by more than ``--tolerance``.
+
+Usage::
+
+    python benchmark_pipeline.py --sizes 10000,100000,1000000 --output bench.jsonl
+    python benchmark_pipeline.py --sizes 100000 --compare bench.jsonl --tolerance 0.25
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import (accuracy_score, classification_report, mean_absolute_error,
+                             precision_recall_fscore_support, r2_score)
+
+from chart_layer import CHART_BUILDERS, figure_payload
+from cyber_data import CATEGORICAL_COLUMNS, DATA_PATH, clean_frame, encode_frame
+from cyber_models import MODEL_SPECS, make_estimator, predict_all, split_dataset
+from flat_forest import FlatForest
+from incident_cube import IncidentCube
+from perf_instrumentation import PerfRecorder
+from training_engine import fit_concurrently
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+GENERATE_CHUNK = 1_000_000
+
+
+def generate_incidents(n_rows, path, seed=42, template=DATA_PATH):
+    """Write ``n_rows`` synthetic incidents shaped like ``template`` to ``path``."""
+    sample = pd.read_csv(template)
+    rng = np.random.default_rng(seed)
+    frequencies = {col: sample[col].value_counts(normalize=True) for col in CATEGORICAL_COLUMNS}
+    years = (int(sample['Year'].min()), int(sample['Year'].max()))
+    loss = (float(sample['Financial Loss (in Million $)'].min()), float(sample['Financial Loss (in Million $)'].max()))
+    users = (int(sample['Number of Affected Users'].min()), int(sample['Number of Affected Users'].max()))
+    hours = (int(sample['Incident Resolution Time (in Hours)'].min()),
+             int(sample['Incident Resolution Time (in Hours)'].max()))
+
+    written = 0
+    while written < n_rows:
+        n = min(GENERATE_CHUNK, n_rows - written)
+        columns = {
+            col: rng.choice(freq.index.to_numpy(dtype=object), size=n, p=freq.to_numpy())
+            for col, freq in frequencies.items()
+        }
+        columns['Year'] = rng.integers(years[0], years[1] + 1, n)
+        columns['Financial Loss (in Million $)'] = rng.uniform(*loss, n).round(2)
+        columns['Number of Affected Users'] = rng.integers(users[0], users[1] + 1, n)
+        columns['Incident Resolution Time (in Hours)'] = rng.integers(hours[0], hours[1] + 1, n)
+        chunk = pd.DataFrame(columns)[sample.columns]
+        chunk.to_csv(path, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+        written += n
+    return path
+
+
+def run_size(path, n_rows, recorder, max_train_rows, n_jobs):
+    """Run every pipeline stage once on the incident file at ``path``."""
+    with recorder.stage('load_clean', n_rows):
+        df = clean_frame(pd.read_csv(path))
+    with recorder.stage('label_encoding', n_rows):
+        df, label_encoders = encode_frame(df)
+    with recorder.stage('incident_cube', n_rows) as extra:
+        cube = IncidentCube.from_frame(df)
+        extra['cells'] = len(cube)
+    with recorder.stage('charts', n_rows) as extra:
+        # The dashboard's chart tabs for an unfiltered view, serialized as they are sent to the browser
+        payloads = [figure_payload(builder(cube if source == 'cube' else df[source]))
+                    for builder, source in CHART_BUILDERS.values()]
+        extra['payload_bytes'] = sum(len(payload) for payload in payloads)
+    with recorder.stage('trend_tables', n_rows):
+        cube.summary('Year', {'Financial Loss (in Million $)': ['mean', 'std'],
+                              'Number of Affected Users': ['mean'],
+                              'Incident Resolution Time (in Hours)': ['mean']})
+        df.groupby('Year')[['Financial Loss (in Million $)', 'Number of Affected Users']].median()
+        cube.summary('Target Industry', {'Financial Loss (in Million $)': 'mean',
+                                         'Number of Affected Users': 'mean',
+                                         'Incident Resolution Time (in Hours)': 'mean'})
+        cube.counts('Year', 'Attack Type').pct_change().fillna(0)
+
+    split = split_dataset(df)
+    train_rows = min(len(split.X_train), max_train_rows)
+    X_train = split.X_train.iloc[:train_rows]
+    with recorder.stage('training', train_rows):
+        tasks = {name: (make_estimator(name), split.y_train[name].iloc[:train_rows]) for name in MODEL_SPECS}
+        models, _ = fit_concurrently(X_train, tasks, n_jobs=n_jobs)
+
+    with recorder.stage('batch_prediction', len(split.X_test)):
+        predictions = predict_all(models, split.X_test)
+    flat = {name: FlatForest.from_sklearn(model) for name, model in models.items()}
+    with recorder.stage('flat_prediction', len(split.X_test)):
+        predict_all(flat, split.X_test)
+
+    with recorder.stage('metrics', len(split.X_test)):
+        for name, (kind, _, label_col) in MODEL_SPECS.items():
+            y_true, y_pred = split.y_test[name], predictions[name]
+            if kind == 'classifier':
+                accuracy_score(y_true, y_pred)
+                precision_recall_fscore_support(y_true, y_pred, average='weighted', zero_division=0)
+                classes = label_encoders[label_col].classes_
+                classification_report(y_true, y_pred, labels=np.arange(len(classes)), target_names=classes,
+                                      output_dict=True, zero_division=0)
+            else:
+                mean_absolute_error(y_true, y_pred)
+                r2_score(y_true, y_pred)
+                np.sqrt(np.mean((y_true - y_pred) ** 2))
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_baseline(path, exclude_run=None):
+    """Map ``(size, stage)`` to wall time from a results file, skipping run ``exclude_run``."""
+    baseline = {}
+    if not Path(path).exists():
+        print(f"No baseline at {path} yet; nothing to compare against")
+        return baseline
+    for line in Path(path).read_text().splitlines():
+        if line.strip():
+            record = json.loads(line)
+            if record.get('run_id') == exclude_run:
+                continue
+            # The latest record for each (size, stage) wins
+            baseline[(record['size'], record['stage'])] = record['wall_s']
+    return baseline
+
+
+def compare(records, baseline, tolerance):
+    """Return the stages whose wall time regressed against ``baseline`` (see ``load_baseline``)."""
+    regressions = []
+    for record in records:
+        previous = baseline.get((record['size'], record['stage']))
+        if previous and record['wall_s'] > previous * (1 + tolerance) and record['wall_s'] - previous > 0.01:
+            regressions.append((record['size'], record['stage'], previous, record['wall_s']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard pipeline on synthetic data.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated row counts (default: 10k to 10M)")
+    parser.add_argument("--output", default="bench_results.jsonl", help="JSON lines file to append results to")
+    parser.add_argument("--max-train-rows", type=int, default=1_000_000,
+                        help="cap on training rows so large sizes stay tractable")
+    parser.add_argument("--n-jobs", type=int, default=None, help="training cores (default: all)")
+    parser.add_argument("--workdir", default=None, help="where to write the synthetic files")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--compare", default=None, help="previous results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown for --compare")
+    args = parser.parse_args(argv)
+
+    run = {
+        'run_id': uuid.uuid4().hex[:12],
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_rev': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+    }
+    # Read the baseline before this run appends to --output, which may be the same file
+    baseline = load_baseline(args.compare, exclude_run=run['run_id']) if args.compare else None
+    records = []
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        for size in (int(s) for s in args.sizes.split(',')):
+            path = Path(workdir) / f"incidents_{size}.csv"
+            print(f"Generating {size:,} synthetic incidents...", flush=True)
+            generate_incidents(size, path, seed=args.seed)
+            recorder = PerfRecorder({**run, 'size': size}, registry=None, echo=True,
+                                    cpu_clock=time.process_time)
+            run_size(path, size, recorder, args.max_train_rows, args.n_jobs)
+            records.extend(recorder.records)
+            path.unlink()
+    tracemalloc.stop()
+
+    with open(args.output, 'a') as out:
+        for record in records:
+            out.write(json.dumps(record) + '\n')
+    print(f"Wrote {len(records)} results to {args.output}")
+
+    if baseline is not None:
+        regressions = compare(records, baseline, args.tolerance)
+        for size, stage, before, after in regressions:
+            print(f"REGRESSION size={size:,} {stage}: {before:.3f}s -> {after:.3f}s")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Row-count-aware Plotly figures for the dashboard's incident-level charts.
+
+Charts that plot one mark per incident ("Users Affected vs Financial Loss by
+Attack Type" and the per-country loss box plots from the EDA notebook) ship
+every row to the browser. Up to ``CHART_ROW_THRESHOLD`` rows (env
+``CYBER_CHART_ROW_THRESHOLD``) they are drawn from the rows, with the scatter
+on WebGL; above it they are reduced on the server:
+
+- the scatter becomes a 2D histogram per colour group, drawn as one marker
+  per non-empty bin (sized by its incident count), so the payload is bounded
+  by ``groups x SCATTER_BINS**2`` points;
+- the box plots are drawn from precomputed quartiles, so the payload is one
+  box per group. Whiskers are the 1.5 IQR fences clipped to the data range
+  and outlier points are not drawn.
+
+The dashboard's chart tabs are built by the ``*_chart`` functions below
+(``CHART_BUILDERS``), so the benchmark times the same figures the dashboard
+serves. ``figure_payload`` serializes a figure once so callers can cache the
+JSON.
+"""
+
+import json
+import os
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+CHART_ROW_THRESHOLD = int(os.environ.get("CYBER_CHART_ROW_THRESHOLD", 20_000))
+SCATTER_BINS = 40
+
+
+def figure_payload(fig):
+    """Serialize ``fig`` to the JSON string sent to the browser."""
+    return fig.to_json()
+
+
+def payload_figure(payload):
+    """Plotly figure dict for a payload made by ``figure_payload``."""
+    return json.loads(payload)
+
+
+def _bin_index(values, edges):
+    return np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+
+
+def binned_scatter(frame, x, y, color, title, bins=SCATTER_BINS):
+    """One marker per non-empty (color, x bin, y bin) cell, sized by its count."""
+    xv = frame[x].to_numpy(dtype=np.float64)
+    yv = frame[y].to_numpy(dtype=np.float64)
+    codes, groups = frame[color].factorize(sort=True)
+    x_edges = np.linspace(xv.min(), xv.max(), bins + 1)
+    y_edges = np.linspace(yv.min(), yv.max(), bins + 1)
+    cells = (codes.astype(np.int64) * bins + _bin_index(xv, x_edges)) * bins + _bin_index(yv, y_edges)
+    counts = np.bincount(cells, minlength=len(groups) * bins * bins).reshape(len(groups), bins, bins)
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+    largest = max(int(counts.max()), 1)
+    palette = px.colors.qualitative.Plotly
+
+    fig = go.Figure()
+    for g, group in enumerate(groups):
+        xi, yi = np.nonzero(counts[g])
+        n = counts[g, xi, yi]
+        fig.add_trace(go.Scattergl(
+            # float32 / int32 keep the base64-encoded arrays in the payload small
+            x=x_centers[xi].astype(np.float32), y=y_centers[yi].astype(np.float32), mode='markers', name=str(group),
+            marker=dict(size=(4 + 14 * np.sqrt(n / largest)).astype(np.float32), color=palette[g % len(palette)],
+                        opacity=0.7),
+            customdata=n.astype(np.int32),
+            hovertemplate=f'<b>{group}</b><br>{x}: %{{x:,.0f}}<br>{y}: %{{y:,.2f}}'
+                          '<br>Incidents in bin: %{customdata:,}<extra></extra>',
+        ))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y, legend_title=color)
+    return fig
+
+
+def scatter_figure(frame, x, y, color, title, hover_data=None, threshold=None):
+    """Scatter of ``y`` against ``x`` coloured by ``color``; binned above ``threshold`` rows."""
+    threshold = CHART_ROW_THRESHOLD if threshold is None else threshold
+    if len(frame) > threshold:
+        return binned_scatter(frame, x, y, color, f"{title} (binned, {len(frame):,} incidents)")
+    return px.scatter(frame, x=x, y=y, color=color, hover_data=hover_data, title=title, render_mode='webgl')
+
+
+def quantile_box(frame, x, y, title):
+    """Box plot of ``y`` per ``x`` group from precomputed quartiles."""
+    grouped = frame.groupby(x, observed=True, sort=True)[y]
+    quartiles = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    low, high, mean = grouped.min(), grouped.max(), grouped.mean()
+    iqr = quartiles[0.75] - quartiles[0.25]
+    fig = go.Figure(go.Box(
+        x=quartiles.index.astype(str).tolist(),
+        q1=quartiles[0.25], median=quartiles[0.5], q3=quartiles[0.75],
+        lowerfence=np.maximum(low, quartiles[0.25] - 1.5 * iqr),
+        upperfence=np.minimum(high, quartiles[0.75] + 1.5 * iqr),
+        mean=mean, name=y, boxpoints=False,
+    ))
+    fig.update_layout(title=title)
+    return fig
+
+
+def box_figure(frame, x, y, title, threshold=None):
+    """Box plot of ``y`` per ``x``; drawn from precomputed quartiles above ``threshold`` rows."""
+    threshold = CHART_ROW_THRESHOLD if threshold is None else threshold
+    if len(frame) > threshold:
+        return quantile_box(frame, x, y, f"{title} ({len(frame):,} incidents)")
+    return px.box(frame, x=x, y=y, title=title)
+
+
+# Dashboard chart tabs: the yearly charts read an IncidentCube, the incident-level ones a row frame
+def attack_types_chart(cube):
+    attack_data = cube.counts('Year', 'Attack Type')
+    fig_attack = px.bar(
+        attack_data.reset_index(),
+        x='Year',
+        y=attack_data.columns.tolist(),
+        title="🔴 Cyber Attack Types Distribution by Year",
+        labels={"value": "Number of Incidents", "Year": "Year"},
+        color_discrete_sequence=px.colors.qualitative.Set3,
+        barmode='group'  # This makes bars horizontal/grouped instead of stacked
+    )
+    fig_attack.update_xaxes(dtick=1, tickformat='d')
+    fig_attack.update_layout(
+        xaxis_title="Year",
+        yaxis_title="Number of Incidents",
+        legend_title="Attack Types",
+        hovermode='x unified'
+    )
+    return fig_attack
+
+
+def industries_chart(cube):
+    industry_data = cube.counts('Year', 'Target Industry')
+    fig_industry = px.bar(
+        industry_data.reset_index(),
+        x='Year',
+        y=industry_data.columns.tolist(),
+        title="🏭 Industry Targeting Patterns by Year",
+        labels={"value": "Number of Attacks", "Year": "Year"},
+        color_discrete_sequence=px.colors.qualitative.Pastel,
+        barmode='group'  # This makes bars horizontal/grouped instead of stacked
+    )
+    fig_industry.update_xaxes(dtick=1, tickformat='d')
+    fig_industry.update_layout(
+        xaxis_title="Year",
+        yaxis_title="Number of Attacks",
+        legend_title="Target Industries",
+        hovermode='x unified'
+    )
+    return fig_industry
+
+
+def financial_chart(cube):
+    financial_data = cube.mean('Year', 'Financial Loss (in Million $)').reset_index()
+    fig_financial = px.line(
+        financial_data,
+        x='Year',
+        y='Financial Loss (in Million $)',
+        title='💸 Average Financial Loss per Incident by Year',
+        markers=True,
+        line_shape='linear'
+    )
+    fig_financial.update_xaxes(dtick=1, tickformat='d')
+    fig_financial.update_layout(
+        xaxis_title="Year",
+        yaxis_title="Average Financial Loss (Million $)",
+        showlegend=False,
+        hovermode='x'
+    )
+    fig_financial.update_traces(
+        mode='lines+markers',
+        marker=dict(size=8, color='darkred'),
+        line=dict(width=3, color='darkred'),
+        hovertemplate='<b>Year:</b> %{x}<br><b>Avg Loss:</b> $%{y:.2f}M<extra></extra>'
+    )
+    return fig_financial
+
+
+USERS_VS_LOSS_COLUMNS = ['Number of Affected Users', 'Financial Loss (in Million $)', 'Attack Type', 'Country']
+LOSS_BY_COUNTRY_COLUMNS = ['Country', 'Financial Loss (in Million $)']
+
+
+def users_vs_loss_chart(frame):
+    return scatter_figure(frame, 'Number of Affected Users', 'Financial Loss (in Million $)', 'Attack Type',
+                          'Users Affected vs Financial Loss by Attack Type', hover_data=['Country'])
+
+
+def loss_by_country_chart(frame):
+    fig = box_figure(frame, 'Country', 'Financial Loss (in Million $)', 'Financial Loss Distribution by Country')
+    fig.update_layout(xaxis_title='Country', yaxis_title='Loss (Million $)')
+    return fig
+
+
+# chart name -> (builder, source): 'cube' builders take the filtered IncidentCube, otherwise the
+# builder takes the filtered rows of the listed columns
+CHART_BUILDERS = {
+    'attack_types': (attack_types_chart, 'cube'),
+    'industries': (industries_chart, 'cube'),
+    'financial': (financial_chart, 'cube'),
+    'users_vs_loss': (users_vs_loss_chart, USERS_VS_LOSS_COLUMNS),
+    'loss_by_country': (loss_by_country_chart, LOSS_BY_COUNTRY_COLUMNS),
+}
@@ -4,46 +4,118 @@
 import pandas as pd
 import numpy as np
 import streamlit as st
-import matplotlib.pyplot as plt
-import seaborn as sns
 import plotly.express as px
 import plotly.graph_objects as go
 
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import classification_report, mean_absolute_error, accuracy_score, r2_score
+from sklearn.metrics import (classification_report, mean_absolute_error, accuracy_score, r2_score,
+                             precision_recall_fscore_support)
 
-# load and preprocess data
-df = pd.read_csv("data/clean_global_cybersecurity_threats.csv")
+from chart_layer import CHART_BUILDERS, figure_payload, payload_figure
+from cyber_data import DATA_PATH, FEATURE_COLUMNS, dataset_version, load_dataset
+from cyber_models import explain_all, load_flat_models, split_dataset, test_mask
+from incident_filter import FilterEngine, FilterState
+from model_store import ModelStore
+from partitioned_aggregation import load_or_build_aggregate
+from perf_instrumentation import PerfRecorder
+from scenario_sweep import SWEEP_FEATURES, axis_values, sweep
+from shared_store import STORE
 
-# Clean and ensure proper data types
-df = df.ffill()  # Updated pandas syntax for forward fill
+# Per-stage wall/CPU/memory records for this rerun, shown in the Performance expander at the bottom
+perf = PerfRecorder({'app': 'cyber_dashboard_final'})
 
-# Convert numeric columns to proper types
-numeric_columns = ['Year', 'Financial Loss (in Million $)', 'Number of Affected Users', 'Incident Resolution Time (in Hours)']
-for col in numeric_columns:
-    if col in df.columns:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
+# Fragments rerun on their own, so each one records and exports its stages separately
+def section_recorder(section):
+    return PerfRecorder({'app': 'cyber_dashboard_final', 'section': section})
 
-# Fill any remaining NaN values
-df = df.fillna(0)
+def export_perf(recorder):
+    try:
+        recorder.export()
+    except OSError:
+        pass  # Read-only deployments still get the in-app table
 
-label_encoders = {}
-for col in df.select_dtypes(include='object').columns:
-    le = LabelEncoder()
-    df[col + '_encoded'] = le.fit_transform(df[col])
-    label_encoders[col] = le
+# load and preprocess data
+# The CSV -> ffill -> to_numeric -> fillna -> LabelEncoder pipeline runs once per source file;
+# later loads memory-map the typed columnar cache (see cyber_data.load_dataset)
+# Cached per dataset version, so incidents appended with incident_append.py are picked up on the next rerun.
+# Base artifacts are pinned in the process-wide store, one read-only copy shared by every session; derived
+# results (filtered views, charts, metric tables, sweeps) share its LRU memory budget (see shared_store.py)
+@STORE.memoize('dataset', pinned=True)
+def get_dataset(version):
+    return load_dataset(DATA_PATH)
+
+# Year x Attack Type x Target Industry x Country x Attack Source cube cells plus median and distinct-count
+# sketches, built once per dataset version across a process pool (see partitioned_aggregation.py)
+@STORE.memoize('aggregate', pinned=True)
+def get_aggregate(version):
+    aggregate_df, _ = get_dataset(version)
+    return load_or_build_aggregate(aggregate_df, version)
+
+def get_incident_cube(version):
+    return get_aggregate(version).cube
+
+with perf.stage('load_dataset') as stage:
+    data_version = dataset_version(DATA_PATH)
+    df, label_encoders = get_dataset(data_version)
+    stage['rows'] = len(df)
+with perf.stage('incident_cube') as stage:
+    cube = get_incident_cube(data_version)
+    stage['rows'] = len(cube)
+
+# Bitmap indexes over Country / Year / Target Industry / Attack Source, built once per dataset version;
+# filtered aggregates and row masks are kept in the shared store keyed by the engine and filter state
+@STORE.memoize('filter_engine', pinned=True)
+def get_filter_engine(version):
+    engine_df, engine_encoders = get_dataset(version)
+    return FilterEngine(engine_df, engine_encoders, get_aggregate(version), store=STORE)
+
+def filtered_view(version, filter_state):
+    return get_filter_engine(version).aggregates(filter_state)
+
+with perf.stage('filter_index') as stage:
+    filter_engine = get_filter_engine(data_version)
+    stage['rows'] = len(df)
+
+# Global filter bar: every chart, metric table and finding below covers the selected incidents only
+with st.sidebar:
+    st.header("🔎 Filters")
+    first_year, last_year = min(filter_engine.index.values('Year')), max(filter_engine.index.values('Year'))
+    # st.slider rejects min == max, so a single-year dataset gets no year filter
+    if first_year < last_year:
+        year_range = st.slider("Year range", first_year, last_year, (first_year, last_year))
+    else:
+        st.caption(f"Year: {first_year}")
+        year_range = (first_year, last_year)
+    filter_state = FilterState.from_selection(
+        countries=st.multiselect("Country", filter_engine.index.values('Country'), placeholder="All countries"),
+        years=None if year_range == (first_year, last_year) else year_range,
+        industries=st.multiselect("Target Industry", filter_engine.index.values('Target Industry'),
+                                  placeholder="All industries"),
+        sources=st.multiselect("Attack Source", filter_engine.index.values('Attack Source'),
+                               placeholder="All attack sources"),
+    )
+    with perf.stage('filter') as stage:
+        filtered = filtered_view(data_version, filter_state)
+        stage['rows'] = filtered.n_rows
+    st.caption(f"{filtered.n_rows:,} of {len(df):,} incidents selected")
 
 # Debug information in collapsible sections
-with st.expander("🔍 Data Structure Information (Click to expand)"):
-    st.write("**Available columns:**", df.columns.tolist())
-    st.write("**Data types:**")
-    st.text(str(df.dtypes))
-    st.write("**First few rows of encoded data:**")
-    encoded_cols = [col for col in df.columns if '_encoded' in col]
-    if encoded_cols:
-        st.dataframe(df[encoded_cols].head(), use_container_width=True)
+# Expanders with on_change="rerun" report whether they are open, so their content is only built when shown,
+# and wrapping them in a fragment makes opening one rerun just that section
+@st.fragment
+def data_structure_section():
+    section = st.expander("🔍 Data Structure Information (Click to expand)", key="data_structure_expander",
+                          on_change="rerun")
+    with section:
+        if section.open:
+            st.write("**Available columns:**", df.columns.tolist())
+            st.write("**Data types:**")
+            st.text(str(df.dtypes))
+            st.write("**First few rows of encoded data:**")
+            encoded_cols = [col for col in df.columns if '_encoded' in col]
+            if encoded_cols:
+                st.dataframe(df[encoded_cols].head(), width="stretch")
+
+data_structure_section()
 
 # Streamlit Dashboard
 st.title("🛡️ Cyber Threat Insight Portal")
@@ -86,257 +158,309 @@ with st.expander("💡 Chart Interaction Tips - Click to Learn How to Use Filter
     - **Hover over bars** for detailed values and percentages
     """)
 
-# Decode for plotting
-df['Decoded_Attack'] = df['Attack Type']
-df['Decoded_Industry'] = df['Target Industry']
+if not filtered.n_rows:
+    st.warning("No incidents match the selected filters.")
+    st.stop()
 
 # Main Dashboard Visualizations
-st.subheader("🎯 Attack Types Over Time")
-st.markdown("**💡 Tip:** Click legend items to show/hide specific attack types. Double-click to isolate one type.")
-
-attack_data = df.groupby(['Year', 'Decoded_Attack']).size().unstack(fill_value=0)
-fig_attack = px.bar(
-    attack_data.reset_index(),
-    x='Year',
-    y=attack_data.columns.tolist(),
-    title="🔴 Cyber Attack Types Distribution by Year",
-    labels={"value": "Number of Incidents", "Year": "Year"},
-    color_discrete_sequence=px.colors.qualitative.Set3,
-    barmode='group'  # This makes bars horizontal/grouped instead of stacked
-)
-fig_attack.update_xaxes(dtick=1, tickformat='d')
-fig_attack.update_layout(
-    xaxis_title="Year",
-    yaxis_title="Number of Incidents",
-    legend_title="Attack Types",
-    hovermode='x unified'
-)
-st.plotly_chart(fig_attack, use_container_width=True)
-
-st.subheader("🏢 Target Industries Over Time")
-st.markdown("**💡 Tip:** Use legend filtering to compare vulnerability patterns across different industries.")
-
-industry_data = df.groupby(['Year', 'Decoded_Industry']).size().unstack(fill_value=0)
-fig_industry = px.bar(
-    industry_data.reset_index(),
-    x='Year',
-    y=industry_data.columns.tolist(),
-    title="🏭 Industry Targeting Patterns by Year",
-    labels={"value": "Number of Attacks", "Year": "Year"},
-    color_discrete_sequence=px.colors.qualitative.Pastel,
-    barmode='group'  # This makes bars horizontal/grouped instead of stacked
-)
-fig_industry.update_xaxes(dtick=1, tickformat='d')
-fig_industry.update_layout(
-    xaxis_title="Year",
-    yaxis_title="Number of Attacks",
-    legend_title="Target Industries",
-    hovermode='x unified'
-)
-st.plotly_chart(fig_industry, use_container_width=True)
-
-st.subheader("� Financial Impact Analysis")
-st.markdown("**💡 Tip:** Hover over data points for exact financial impact values and trends.")
-
-financial_data = df.groupby('Year')['Financial Loss (in Million $)'].mean().reset_index()
-fig_financial = px.line(
-    financial_data,
-    x='Year',
-    y='Financial Loss (in Million $)',
-    title='💸 Average Financial Loss per Incident by Year',
-    markers=True,
-    line_shape='linear'
-)
-fig_financial.update_xaxes(dtick=1, tickformat='d')
-fig_financial.update_layout(
-    xaxis_title="Year",
-    yaxis_title="Average Financial Loss (Million $)",
-    showlegend=False,
-    hovermode='x'
-)
-fig_financial.update_traces(
-    mode='lines+markers',
-    marker=dict(size=8, color='darkred'),
-    line=dict(width=3, color='darkred'),
-    hovertemplate='<b>Year:</b> %{x}<br><b>Avg Loss:</b> $%{y:.2f}M<extra></extra>'
-)
-st.plotly_chart(fig_financial, use_container_width=True)
+# Figures are serialized once per dataset version and filter state (see chart_payload);
+# each chart tab renders only while it is selected
+def filtered_rows(version, filter_state, columns):
+    rows_df, _ = get_dataset(version)
+    mask = get_filter_engine(version).mask(filter_state)
+    return rows_df[columns] if mask is None else rows_df.loc[mask, columns]
+
+# The figure builders live in chart_layer, which bins incident-level charts on the server above a row threshold
+@STORE.memoize('chart_payload')
+def chart_payload(version, filter_state, chart):
+    builder, source = CHART_BUILDERS[chart]
+    if source == 'cube':
+        return figure_payload(builder(filtered_view(version, filter_state).cube))
+    return figure_payload(builder(filtered_rows(version, filter_state, source)))
+
+def render_chart(recorder, chart):
+    with recorder.stage(f'chart_{chart}') as stage:
+        payload = chart_payload(data_version, filter_state, chart)
+        stage['payload_bytes'] = len(payload.encode())
+        st.plotly_chart(payload_figure(payload), width="stretch")
+    st.caption(f"Figure payload: {stage['payload_bytes'] / 1024:,.1f} KB")
+
+@st.fragment
+def charts_section():
+    recorder = section_recorder('charts')
+    attack_tab, industry_tab, financial_tab, users_tab, country_tab = st.tabs(
+        ["🎯 Attack Types", "🏢 Target Industries", "💸 Financial Impact", "🔬 Users vs Loss", "🌍 Loss by Country"],
+        key="chart_tabs", on_change="rerun"
+    )
+    with attack_tab:
+        if attack_tab.open:
+            st.subheader("🎯 Attack Types Over Time")
+            st.markdown("**💡 Tip:** Click legend items to show/hide specific attack types. Double-click to isolate one type.")
+            render_chart(recorder, 'attack_types')
+    with industry_tab:
+        if industry_tab.open:
+            st.subheader("🏢 Target Industries Over Time")
+            st.markdown("**💡 Tip:** Use legend filtering to compare vulnerability patterns across different industries.")
+            render_chart(recorder, 'industries')
+    with financial_tab:
+        if financial_tab.open:
+            st.subheader("💸 Financial Impact Analysis")
+            st.markdown("**💡 Tip:** Hover over data points for exact financial impact values and trends.")
+            render_chart(recorder, 'financial')
+    with users_tab:
+        if users_tab.open:
+            st.subheader("🔬 Users Affected vs Financial Loss")
+            st.markdown("**💡 Tip:** Large selections are binned on the server; marker size shows the incidents in each bin.")
+            render_chart(recorder, 'users_vs_loss')
+    with country_tab:
+        if country_tab.open:
+            st.subheader("🌍 Financial Loss by Country")
+            st.markdown("**💡 Tip:** Large selections are drawn from precomputed quartiles without outlier points.")
+            render_chart(recorder, 'loss_by_country')
+    export_perf(recorder)
+
+charts_section()
 
 # Prepare features for ML models
 # Only use encoded columns for categorical features
-features = pd.concat([
-    df[['Country_encoded', 'Attack Source_encoded', 'Security Vulnerability Type_encoded', 'Defense Mechanism Used_encoded']],
-    df[['Year', 'Number of Affected Users', 'Incident Resolution Time (in Hours)']]
-], axis=1)
+@STORE.memoize('features', pinned=True)
+def get_features(version):
+    features_df, _ = get_dataset(version)
+    return features_df[FEATURE_COLUMNS]
+
+features = get_features(data_version)
 
 # Feature validation in collapsible section
-with st.expander("⚙️ Model Features Information (Click to expand)"):
-    st.write("**Features data types:**")
-    st.text(str(features.dtypes))
-    st.write("**Features shape:**", features.shape)
-    st.write("**Any non-numeric data:**", 
-             features.select_dtypes(include=['object']).columns.tolist())
-
-# Target variables
-target_attack = df['Attack Type_encoded']
-target_severity = df['Financial Loss (in Million $)']
-target_threat = df['Target Industry_encoded']
-
-# Train-test splits
-X_train, X_test, y_attack_train, y_attack_test = train_test_split(features, target_attack, test_size=0.2, random_state=42)
-_, _, y_sev_train, y_sev_test = train_test_split(features, target_severity, test_size=0.2, random_state=42)
-_, _, y_thr_train, y_thr_test = train_test_split(features, target_threat, test_size=0.2, random_state=42)
-
-# Train Models
-rf_attack = RandomForestClassifier(n_estimators=100, random_state=42).fit(X_train, y_attack_train)
-rf_sev = RandomForestRegressor(n_estimators=100, random_state=42).fit(X_train, y_sev_train)
-rf_thr = RandomForestClassifier(n_estimators=100, random_state=42).fit(X_train, y_thr_train)
+@st.fragment
+def features_section():
+    section = st.expander("⚙️ Model Features Information (Click to expand)", key="features_expander", on_change="rerun")
+    with section:
+        if section.open:
+            st.write("**Features data types:**")
+            st.text(str(features.dtypes))
+            st.write("**Features shape:**", features.shape)
+            st.write("**Any non-numeric data:**",
+                     features.select_dtypes(include=['object']).columns.tolist())
+
+features_section()
+
+# Train-test split (row assignment is stable when incidents are appended)
+@STORE.memoize('split', pinned=True)
+def get_split(version):
+    split_df, _ = get_dataset(version)
+    return split_dataset(split_df)
+
+# Train Models (loaded from the on-disk model store; retrained only when data, features or params change).
+# The dashboard predicts with the memory-mapped flat exports, so every worker process shares one read-only copy.
+@STORE.memoize('model_store', pinned=True)
+def get_model_store():
+    return ModelStore()
+
+@STORE.memoize('models', pinned=True)
+def get_models(version):
+    return load_flat_models(get_model_store(), get_split(version), version=version)
+
+# Test-set predictions and everything derived from them are computed once per dataset version
+@STORE.memoize('test_predictions', pinned=True)
+def get_test_predictions(version):
+    models = get_models(version)
+    X_test = get_split(version).X_test
+    return {name: model.predict(X_test) for name, model in models.items()}
+
+# Tree-path attributions of one scenario (a few ms per model), cached per unique encoded input
+@STORE.memoize('scenario_attributions')
+def scenario_attributions(version, encoded_row):
+    return explain_all(get_models(version), np.asarray([encoded_row]))
+
+def filtered_test_set(version, filter_state):
+    """Test-set targets and predictions of the incidents selected by ``filter_state``."""
+    y_test, preds = get_split(version).y_test, get_test_predictions(version)
+    mask = get_filter_engine(version).mask(filter_state)
+    if mask is None:
+        return y_test, preds
+    keep = mask[test_mask(len(mask))]
+    return {name: y[keep] for name, y in y_test.items()}, {name: p[keep] for name, p in preds.items()}
+
+@STORE.memoize('model_metrics')
+def model_metrics(version, filter_state):
+    y_test, preds = filtered_test_set(version, filter_state)
+    if not len(y_test['rf_sev']):
+        return None
+    metrics = {}
+    for prefix, name in [('attack', 'rf_attack'), ('industry', 'rf_thr')]:
+        precision, recall, f1, _ = precision_recall_fscore_support(y_test[name], preds[name], average='weighted',
+                                                                 zero_division=0)
+        metrics.update({
+            f'{prefix}_accuracy': accuracy_score(y_test[name], preds[name]),
+            f'{prefix}_precision': precision,
+            f'{prefix}_recall': recall,
+            f'{prefix}_f1': f1,
+        })
+    # Financial Loss Regression Performance
+    y_sev_test, sev_preds = y_test['rf_sev'], preds['rf_sev']
+    metrics['financial_mae'] = mean_absolute_error(y_sev_test, sev_preds)
+    metrics['financial_r2'] = r2_score(y_sev_test, sev_preds)
+    metrics['financial_rmse'] = np.sqrt(np.mean((y_sev_test - sev_preds) ** 2))
+    return metrics
+
+@STORE.memoize('classification_report')
+def classification_report_frame(version, filter_state, name, label_col):
+    _, encoders = get_dataset(version)
+    classes = encoders[label_col].classes_
+    y_test, preds = filtered_test_set(version, filter_state)
+    report_df = pd.DataFrame(
+        classification_report(
+            y_test[name], preds[name],
+            labels=np.arange(len(classes)),
+            target_names=classes,
+            output_dict=True,
+            zero_division=0
+        )
+    ).transpose()
+    # Round numeric columns for better display
+    for col in ['precision', 'recall', 'f1-score']:
+        if col in report_df.columns:
+            report_df[col] = report_df[col].round(3)
+    return report_df
+
+# Feature importance analysis
+@STORE.memoize('feature_importance')
+def feature_importance_tables(version):
+    return {
+        name: pd.DataFrame({
+            'feature': FEATURE_COLUMNS,
+            'importance': model.feature_importances_
+        }).sort_values('importance', ascending=False)
+        for name, model in get_models(version).items()
+    }
+
+with perf.stage('split') as stage:
+    split = get_split(data_version)
+    stage['rows'] = len(split.X_train) + len(split.X_test)
+X_train, X_test = split.X_train, split.X_test
+
+with perf.stage('model_load'):
+    models = get_models(data_version)
+rf_attack, rf_sev, rf_thr = models['rf_attack'], models['rf_sev'], models['rf_thr']
 
 # Predict and Display Reports
-attack_preds = rf_attack.predict(X_test)
-sev_preds = rf_sev.predict(X_test)
-thr_preds = rf_thr.predict(X_test)
+with perf.stage('predict_test_set', rows=len(X_test)):
+    get_test_predictions(data_version)
 
 st.subheader("🔍 Model Performance Reports")
 
 # Calculate detailed performance metrics
-from sklearn.metrics import precision_recall_fscore_support
-
-# Attack Type Classification Performance
-attack_precision, attack_recall, attack_f1, _ = precision_recall_fscore_support(
-    y_attack_test, attack_preds, average='weighted'
-)
-attack_accuracy = accuracy_score(y_attack_test, attack_preds)
-
-# Industry Classification Performance  
-industry_precision, industry_recall, industry_f1, _ = precision_recall_fscore_support(
-    y_thr_test, thr_preds, average='weighted'
-)
-industry_accuracy = accuracy_score(y_thr_test, thr_preds)
-
-# Financial Loss Regression Performance
-financial_mae = mean_absolute_error(y_sev_test, sev_preds)
-financial_r2 = r2_score(y_sev_test, sev_preds)
-financial_rmse = np.sqrt(np.mean((y_sev_test - sev_preds) ** 2))
-
-# Create performance summary table
-col1, col2, col3 = st.columns(3)
-
-with col1:
-    st.markdown("#### 🎯 Attack Type Prediction")
-    attack_metrics = pd.DataFrame({
-        'Metric': ['Accuracy', 'Precision', 'Recall', 'F1-Score'],
-        'Score': [f"{attack_accuracy:.3f}", f"{attack_precision:.3f}", 
-                 f"{attack_recall:.3f}", f"{attack_f1:.3f}"],
-        'Percentage': [f"{attack_accuracy:.1%}", f"{attack_precision:.1%}", 
-                      f"{attack_recall:.1%}", f"{attack_f1:.1%}"]
-    })
-    st.dataframe(attack_metrics, use_container_width=True, hide_index=True)
-
-with col2:
-    st.markdown("#### 🏭 Industry Prediction")
-    industry_metrics = pd.DataFrame({
-        'Metric': ['Accuracy', 'Precision', 'Recall', 'F1-Score'],
-        'Score': [f"{industry_accuracy:.3f}", f"{industry_precision:.3f}", 
-                 f"{industry_recall:.3f}", f"{industry_f1:.3f}"],
-        'Percentage': [f"{industry_accuracy:.1%}", f"{industry_precision:.1%}", 
-                      f"{industry_recall:.1%}", f"{industry_f1:.1%}"]
-    })
-    st.dataframe(industry_metrics, use_container_width=True, hide_index=True)
-
-with col3:
-    st.markdown("#### 💸 Financial Loss Prediction")
-    financial_metrics = pd.DataFrame({
-        'Metric': ['R² Score', 'MAE (Million $)', 'RMSE (Million $)', 'Explained Variance'],
-        'Value': [f"{financial_r2:.3f}", f"{financial_mae:.2f}", 
-                 f"{financial_rmse:.2f}", f"{financial_r2:.1%}"]
-    })
-    st.dataframe(financial_metrics, use_container_width=True, hide_index=True)
-
-# Detailed classification reports in expandable sections
-with st.expander("📊 Detailed Classification Reports (Click to expand)"):
-    
-    col1, col2 = st.columns(2)
-    
+with perf.stage('metrics', rows=len(X_test)):
+    metrics = model_metrics(data_version, filter_state)
+
+if metrics is None:
+    st.info("No test-set incidents match the selected filters, so there is nothing to score the models on.")
+else:
+    # Create performance summary table
+    col1, col2, col3 = st.columns(3)
+
     with col1:
-        st.markdown("**🎯 Attack Type - Detailed Report**")
-        attack_report_df = pd.DataFrame(
-            classification_report(
-                y_attack_test, attack_preds, 
-                target_names=label_encoders['Attack Type'].classes_,
-                output_dict=True
-            )
-        ).transpose()
-        # Round numeric columns for better display
-        numeric_cols = ['precision', 'recall', 'f1-score']
-        for col in numeric_cols:
-            if col in attack_report_df.columns:
-                attack_report_df[col] = attack_report_df[col].round(3)
-        st.dataframe(attack_report_df, use_container_width=True)
-    
-    with col2:
-        st.markdown("**🏭 Target Industry - Detailed Report**")
-        industry_report_df = pd.DataFrame(
-            classification_report(
-                y_thr_test, thr_preds, 
-                target_names=label_encoders['Target Industry'].classes_,
-                output_dict=True
-            )
-        ).transpose()
-        # Round numeric columns for better display
-        for col in numeric_cols:
-            if col in industry_report_df.columns:
-                industry_report_df[col] = industry_report_df[col].round(3)
-        st.dataframe(industry_report_df, use_container_width=True)
-
-# Calculate additional metrics for analysis
-# Calculate performance metrics
-attack_accuracy = accuracy_score(y_attack_test, attack_preds)
-industry_accuracy = accuracy_score(y_thr_test, thr_preds)
-financial_r2 = r2_score(y_sev_test, sev_preds)
-financial_mae = mean_absolute_error(y_sev_test, sev_preds)
+        st.markdown("#### 🎯 Attack Type Prediction")
+        attack_metrics = pd.DataFrame({
+            'Metric': ['Accuracy', 'Precision', 'Recall', 'F1-Score'],
+            'Score': [f"{metrics['attack_accuracy']:.3f}", f"{metrics['attack_precision']:.3f}",
+                     f"{metrics['attack_recall']:.3f}", f"{metrics['attack_f1']:.3f}"],
+            'Percentage': [f"{metrics['attack_accuracy']:.1%}", f"{metrics['attack_precision']:.1%}",
+                          f"{metrics['attack_recall']:.1%}", f"{metrics['attack_f1']:.1%}"]
+        })
+        st.dataframe(attack_metrics, width="stretch", hide_index=True)
 
-# Feature importance analysis
-attack_feature_importance = pd.DataFrame({
-    'feature': features.columns,
-    'importance': rf_attack.feature_importances_
-}).sort_values('importance', ascending=False)
-
-financial_feature_importance = pd.DataFrame({
-    'feature': features.columns,
-    'importance': rf_sev.feature_importances_
-}).sort_values('importance', ascending=False)
-
-industry_feature_importance = pd.DataFrame({
-    'feature': features.columns,
-    'importance': rf_thr.feature_importances_
-}).sort_values('importance', ascending=False)
-
-# Analysis of data trends
-yearly_stats = df.groupby('Year').agg({
-    'Financial Loss (in Million $)': ['mean', 'median', 'std'],
-    'Number of Affected Users': ['mean', 'median'],
-    'Incident Resolution Time (in Hours)': 'mean'
-}).round(2)
-
-attack_evolution = df.groupby(['Year', 'Attack Type']).size().unstack(fill_value=0)
-most_common_attacks_by_year = attack_evolution.idxmax(axis=1)
-attack_growth = attack_evolution.pct_change().fillna(0)
-
-# Industry targeting analysis
-industry_targeting = df.groupby('Target Industry').agg({
-    'Financial Loss (in Million $)': 'mean',
-    'Number of Affected Users': 'mean',
-    'Incident Resolution Time (in Hours)': 'mean'
-}).round(2)
+    with col2:
+        st.markdown("#### 🏭 Industry Prediction")
+        industry_metrics = pd.DataFrame({
+            'Metric': ['Accuracy', 'Precision', 'Recall', 'F1-Score'],
+            'Score': [f"{metrics['industry_accuracy']:.3f}", f"{metrics['industry_precision']:.3f}",
+                     f"{metrics['industry_recall']:.3f}", f"{metrics['industry_f1']:.3f}"],
+            'Percentage': [f"{metrics['industry_accuracy']:.1%}", f"{metrics['industry_precision']:.1%}",
+                          f"{metrics['industry_recall']:.1%}", f"{metrics['industry_f1']:.1%}"]
+        })
+        st.dataframe(industry_metrics, width="stretch", hide_index=True)
 
-# Create findings text box
-st.subheader("📊 Machine Learning Analysis & Key Findings")
+    with col3:
+        st.markdown("#### 💸 Financial Loss Prediction")
+        financial_metrics = pd.DataFrame({
+            'Metric': ['R² Score', 'MAE (Million $)', 'RMSE (Million $)', 'Explained Variance'],
+            'Value': [f"{metrics['financial_r2']:.3f}", f"{metrics['financial_mae']:.2f}",
+                     f"{metrics['financial_rmse']:.2f}", f"{metrics['financial_r2']:.1%}"]
+        })
+        st.dataframe(financial_metrics, width="stretch", hide_index=True)
+
+# Detailed classification reports in expandable sections, computed only while the expander is open
+@st.fragment
+def classification_reports_section():
+    section = st.expander("📊 Detailed Classification Reports (Click to expand)", key="reports_expander",
+                          on_change="rerun")
+    with section:
+        if not section.open:
+            return
+        if metrics is None:
+            st.info("No test-set incidents match the selected filters.")
+            return
+        recorder = section_recorder('classification_reports')
+        col1, col2 = st.columns(2)
 
-# Add scroll disclaimer
-st.info("📜 **Navigation Tip:** This is a comprehensive analysis report. Please **scroll down within the text box below** to read the complete findings, trends analysis, strategic recommendations, and model limitations.")
+        with col1:
+            st.markdown("**🎯 Attack Type - Detailed Report**")
+            with recorder.stage('classification_report_attack', rows=len(X_test)):
+                attack_report_df = classification_report_frame(data_version, filter_state, 'rf_attack', 'Attack Type')
+            st.dataframe(attack_report_df, width="stretch")
 
-findings_text = f"""
+        with col2:
+            st.markdown("**🏭 Target Industry - Detailed Report**")
+            with recorder.stage('classification_report_industry', rows=len(X_test)):
+                industry_report_df = classification_report_frame(data_version, filter_state, 'rf_thr', 'Target Industry')
+            st.dataframe(industry_report_df, width="stretch")
+        export_perf(recorder)
+
+classification_reports_section()
+
+with perf.stage('feature_importance'):
+    importance_tables = feature_importance_tables(data_version)
+attack_feature_importance = importance_tables['rf_attack']
+
+# Trend tables and the findings report are built once per dataset version and filter state
+@STORE.memoize('findings_report')
+def findings_report(version, filter_state):
+    view = filtered_view(version, filter_state)
+    cube = view.cube
+    # Scores are undefined (nan) when no test-set incident matches the filters
+    metrics = model_metrics(version, filter_state) or {}
+    attack_accuracy, industry_accuracy = metrics.get('attack_accuracy', np.nan), metrics.get('industry_accuracy', np.nan)
+    financial_r2, financial_mae = metrics.get('financial_r2', np.nan), metrics.get('financial_mae', np.nan)
+    importance_tables = feature_importance_tables(version)
+    attack_feature_importance = importance_tables['rf_attack']
+    financial_feature_importance = importance_tables['rf_sev']
+    industry_feature_importance = importance_tables['rf_thr']
+
+    # Analysis of data trends
+    # Means and std are exact cube roll-ups; medians come from the quantile sketches (within 0.5%)
+    yearly_stats = view.aggregate.summary('Year', {
+        'Financial Loss (in Million $)': ['mean', 'median', 'std'],
+        'Number of Affected Users': ['mean', 'median'],
+        'Incident Resolution Time (in Hours)': ['mean']
+    }).round(2)
+
+    attack_evolution = cube.counts('Year', 'Attack Type')
+    most_common_attacks_by_year = attack_evolution.idxmax(axis=1)
+
+    # Industry targeting analysis
+    industry_targeting = cube.summary('Target Industry', {
+        'Financial Loss (in Million $)': 'mean',
+        'Number of Affected Users': 'mean',
+        'Incident Resolution Time (in Hours)': 'mean'
+    }).round(2)
+    # A year with a single selected incident has no standard deviation
+    loss_std = yearly_stats['Financial Loss (in Million $)']['std'].fillna(0)
+    overall = cube.summary([], {'Number of Affected Users': 'mean', 'Incident Resolution Time (in Hours)': 'mean'}).iloc[0]
+    # Distinct counts come from the HyperLogLog sketches
+    reach = view.aggregate.summary([], {'Country': 'nunique', 'Attack Source': 'nunique'}).iloc[0]
+
+    return f"""
 ## 🔍 **Model Performance Analysis**
 
 **Attack Type Prediction:**
@@ -357,17 +481,18 @@ findings_text = f"""
 **Financial Impact Evolution:**
 - Average Financial Loss: ${yearly_stats['Financial Loss (in Million $)']['mean'].mean():.2f} Million per incident
 - Highest Loss Year: {yearly_stats['Financial Loss (in Million $)']['mean'].idxmax()} (${yearly_stats['Financial Loss (in Million $)']['mean'].max():.2f}M avg)
-- Most Volatile Year: {yearly_stats['Financial Loss (in Million $)']['std'].idxmax()} (σ=${yearly_stats['Financial Loss (in Million $)']['std'].max():.2f}M)
+- Most Volatile Year: {loss_std.idxmax()} (σ=${loss_std.max():.2f}M)
 
 **Attack Pattern Insights:**
 - Most Targeted Industry: {industry_targeting['Financial Loss (in Million $)'].idxmax()} (${industry_targeting['Financial Loss (in Million $)'].max():.2f}M avg loss)
 - Fastest Recovery Industry: {industry_targeting['Incident Resolution Time (in Hours)'].idxmin()} ({industry_targeting['Incident Resolution Time (in Hours)'].min():.1f}h avg)
 - Slowest Recovery Industry: {industry_targeting['Incident Resolution Time (in Hours)'].idxmax()} ({industry_targeting['Incident Resolution Time (in Hours)'].max():.1f}h avg)
+- Reach: {reach['Attack Source']:.0f} attack source types across {reach['Country']:.0f} countries
 
 **User Impact Analysis:**
-- Average Users Affected: {df['Number of Affected Users'].mean():,.0f} per incident
+- Average Users Affected: {overall['Number of Affected Users']:,.0f} per incident
 - Peak Impact Year: {yearly_stats['Number of Affected Users']['mean'].idxmax()} ({yearly_stats['Number of Affected Users']['mean'].max():,.0f} avg users)
-- Average Resolution Time: {df['Incident Resolution Time (in Hours)'].mean():.1f} hours
+- Average Resolution Time: {overall['Incident Resolution Time (in Hours)']:.1f} hours
 
 ## 🎯 **Strategic Recommendations**
 
@@ -387,130 +512,278 @@ findings_text = f"""
 - External factors (geopolitical events, new technologies) not fully captured
 """
 
+# Create findings text box
+st.subheader("📊 Machine Learning Analysis & Key Findings")
+
+# Add scroll disclaimer
+st.info("📜 **Navigation Tip:** This is a comprehensive analysis report. Please **scroll down within the text box below** to read the complete findings, trends analysis, strategic recommendations, and model limitations.")
+
+with perf.stage('findings', rows=len(df)):
+    findings_text = findings_report(data_version, filter_state)
+
 st.text_area("📋 Detailed Analysis Report", findings_text, height=600)
 
 # Interactive Prediction Form
-st.subheader("🎛️ Simulate an Attack Scenario")
-
-with st.form("prediction_form"):
-    st.markdown("_Enter hypothetical feature values to simulate an attack incident_")
-    
-    user_input = {}
-    
-    # Create input fields for each feature
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown("**Categorical Features**")
+# Submitting the form reruns only this fragment, not the rest of the dashboard
+@st.fragment
+def prediction_section():
+    recorder = section_recorder('prediction')
+    st.subheader("🎛️ Simulate an Attack Scenario")
+
+    with st.form("prediction_form"):
+        st.markdown("_Enter hypothetical feature values to simulate an attack incident_")
         
-        # Country selection
-        country_options = df['Country'].unique()
-        selected_country = st.selectbox("Country", country_options)
-        user_input['Country_encoded'] = label_encoders['Country'].transform([selected_country])[0]
+        user_input = {}
         
-        # Attack Source selection
-        attack_source_options = df['Attack Source'].unique()
-        selected_attack_source = st.selectbox("Attack Source", attack_source_options)
-        user_input['Attack Source_encoded'] = label_encoders['Attack Source'].transform([selected_attack_source])[0]
+        # Create input fields for each feature
+        col1, col2 = st.columns(2)
         
-        # Security Vulnerability Type selection
-        vuln_options = df['Security Vulnerability Type'].unique()
-        selected_vuln = st.selectbox("Security Vulnerability Type", vuln_options)
-        user_input['Security Vulnerability Type_encoded'] = label_encoders['Security Vulnerability Type'].transform([selected_vuln])[0]
+        with col1:
+            st.markdown("**Categorical Features**")
+            
+            # Country selection
+            country_options = df['Country'].unique()
+            selected_country = st.selectbox("Country", country_options)
+            user_input['Country_encoded'] = label_encoders['Country'].transform([selected_country])[0]
+            
+            # Attack Source selection
+            attack_source_options = df['Attack Source'].unique()
+            selected_attack_source = st.selectbox("Attack Source", attack_source_options)
+            user_input['Attack Source_encoded'] = label_encoders['Attack Source'].transform([selected_attack_source])[0]
+            
+            # Security Vulnerability Type selection
+            vuln_options = df['Security Vulnerability Type'].unique()
+            selected_vuln = st.selectbox("Security Vulnerability Type", vuln_options)
+            user_input['Security Vulnerability Type_encoded'] = label_encoders['Security Vulnerability Type'].transform([selected_vuln])[0]
+            
+            # Defense Mechanism selection
+            defense_options = df['Defense Mechanism Used'].unique()
+            selected_defense = st.selectbox("Defense Mechanism Used", defense_options)
+            user_input['Defense Mechanism Used_encoded'] = label_encoders['Defense Mechanism Used'].transform([selected_defense])[0]
         
-        # Defense Mechanism selection
-        defense_options = df['Defense Mechanism Used'].unique()
-        selected_defense = st.selectbox("Defense Mechanism Used", defense_options)
-        user_input['Defense Mechanism Used_encoded'] = label_encoders['Defense Mechanism Used'].transform([selected_defense])[0]
-    
-    with col2:
-        st.markdown("**Numerical Features**")
-        user_input['Year'] = st.slider(
-            "Year", 
-            int(df['Year'].min()), 
-            int(df['Year'].max()), 
-            int(df['Year'].mean())
-        )
-        user_input['Number of Affected Users'] = st.number_input(
-            "Number of Affected Users", 
-            value=int(df['Number of Affected Users'].mean()),
-            min_value=0,
-            max_value=int(df['Number of Affected Users'].max())
-        )
-        user_input['Incident Resolution Time (in Hours)'] = st.slider(
-            "Incident Resolution Time (Hours)", 
-            float(df['Incident Resolution Time (in Hours)'].min()), 
-            float(df['Incident Resolution Time (in Hours)'].max()), 
-            float(df['Incident Resolution Time (in Hours)'].mean())
-        )
+        with col2:
+            st.markdown("**Numerical Features**")
+            year_min, year_max = int(df['Year'].min()), int(df['Year'].max())
+            if year_min < year_max:
+                user_input['Year'] = st.slider("Year", year_min, year_max, int(df['Year'].mean()))
+            else:  # st.slider rejects min == max
+                user_input['Year'] = st.number_input("Year", value=year_min, disabled=True)
+            user_input['Number of Affected Users'] = st.number_input(
+                "Number of Affected Users", 
+                value=int(df['Number of Affected Users'].mean()),
+                min_value=0,
+                max_value=int(df['Number of Affected Users'].max())
+            )
+            user_input['Incident Resolution Time (in Hours)'] = st.slider(
+                "Incident Resolution Time (Hours)", 
+                float(df['Incident Resolution Time (in Hours)'].min()), 
+                float(df['Incident Resolution Time (in Hours)'].max()), 
+                float(df['Incident Resolution Time (in Hours)'].mean())
+            )
 
-    submitted = st.form_submit_button("🔮 Predict Outcome")
-    
-    # Store form values for display outside form
-    if submitted:
-        st.session_state.form_data = {
-            'country': selected_country,
-            'attack_source': selected_attack_source,
-            'vuln_type': selected_vuln,
-            'defense': selected_defense,
-            'user_input': user_input
-        }
-        st.session_state.submitted = True
-
-# Check if form was submitted
-if hasattr(st.session_state, 'submitted') and st.session_state.submitted:
-    user_input = st.session_state.form_data['user_input']
-    
-    # Create input dataframe with correct column order
-    input_df = pd.DataFrame([user_input])
-    input_df = input_df[features.columns]  # Ensure correct column order
-    
-    # Make predictions
-    attack_pred = rf_attack.predict(input_df)[0]
-    industry_pred = rf_thr.predict(input_df)[0]
-    loss_pred = rf_sev.predict(input_df)[0]
-
-    # Decode predictions
-    decoded_attack = label_encoders['Attack Type'].inverse_transform([attack_pred])[0]
-    decoded_industry = label_encoders['Target Industry'].inverse_transform([industry_pred])[0]
-
-    # Display results
-    st.success("🚨 Prediction Results:")
-    
-    col1, col2, col3 = st.columns(3)
+        submitted = st.form_submit_button("🔮 Predict Outcome")
+        
+        # Store form values for display outside form
+        if submitted:
+            st.session_state.form_data = {
+                'country': selected_country,
+                'attack_source': selected_attack_source,
+                'vuln_type': selected_vuln,
+                'defense': selected_defense,
+                'user_input': user_input
+            }
+            st.session_state.submitted = True
+
+    # Check if form was submitted
+    if hasattr(st.session_state, 'submitted') and st.session_state.submitted:
+        user_input = st.session_state.form_data['user_input']
+        
+        # Create input dataframe with correct column order
+        input_df = pd.DataFrame([user_input])
+        input_df = input_df[features.columns]  # Ensure correct column order
+        
+        # Make predictions
+        with recorder.stage('predict_scenario', rows=1):
+            attack_pred = rf_attack.predict(input_df)[0]
+            industry_pred = rf_thr.predict(input_df)[0]
+            loss_pred = rf_sev.predict(input_df)[0]
+
+        # Decode predictions
+        decoded_attack = label_encoders['Attack Type'].inverse_transform([attack_pred])[0]
+        decoded_industry = label_encoders['Target Industry'].inverse_transform([industry_pred])[0]
+
+        # Display results
+        st.success("🚨 Prediction Results:")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Predicted Attack Type", decoded_attack)
+        with col2:
+            st.metric("Predicted Target Industry", decoded_industry)
+        with col3:
+            st.metric("Estimated Financial Loss", f"${loss_pred:,.2f}M")
+        
+        # Display input summary
+        if 'form_data' in st.session_state:
+            st.markdown("**📋 Input Summary:**")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write(f"• **Country:** {st.session_state.form_data['country']}")
+                st.write(f"• **Attack Source:** {st.session_state.form_data['attack_source']}")
+                st.write(f"• **Year:** {st.session_state.form_data['user_input']['Year']}")
+                st.write(f"• **Affected Users:** {st.session_state.form_data['user_input']['Number of Affected Users']:,}")
+            with col2:
+                st.write(f"• **Security Vulnerability:** {st.session_state.form_data['vuln_type']}")
+                st.write(f"• **Defense Mechanism:** {st.session_state.form_data['defense']}")
+                st.write(f"• **Resolution Time:** {st.session_state.form_data['user_input']['Incident Resolution Time (in Hours)']} hours")
+            
+            st.divider()
+        
+        # Additional insights
+        st.info(f"""
+        **Scenario Analysis:**
+        - This prediction suggests a **{decoded_attack}** attack targeting the **{decoded_industry}** sector
+        - Expected financial impact: **${loss_pred:,.2f} Million**
+        - Based on the input parameters, this scenario has a moderate to high risk profile
+        """)
+        
+        # Per-prediction attributions: how much each input moved each model away from its average output
+        with recorder.stage('attribute_scenario', rows=1):
+            explanations = scenario_attributions(data_version, tuple(float(v) for v in input_df.iloc[0]))
+        attributions = pd.DataFrame({
+            'feature': [col.replace('_encoded', '') for col in features.columns],
+            f'Attack Type → {decoded_attack}': explanations['rf_attack'][1][0] * 100,
+            f'Target Industry → {decoded_industry}': explanations['rf_thr'][1][0] * 100,
+            'Financial Loss ($M)': explanations['rf_sev'][1][0],
+        })
+        st.markdown("**What Drove this Prediction:**")
+        st.caption(f"Contribution of each input relative to the models' average output "
+                   f"(base: {explanations['rf_attack'][0][0]:.1%} {decoded_attack}, "
+                   f"{explanations['rf_thr'][0][0]:.1%} {decoded_industry}, ${explanations['rf_sev'][0][0]:,.2f}M loss)")
+        st.dataframe(attributions, width="stretch", hide_index=True,
+                     column_config={attributions.columns[1]: st.column_config.NumberColumn(format="%+.1f pp"),
+                                    attributions.columns[2]: st.column_config.NumberColumn(format="%+.1f pp"),
+                                    attributions.columns[3]: st.column_config.NumberColumn(format="%+.2f")})
+        top = attributions.iloc[attributions.iloc[:, 1].abs().argsort()[::-1]]['feature'].head(3).tolist()
+        st.markdown("**Top 3 Features Behind the Predicted Attack Type:**")
+        for rank, feature in enumerate(top, 1):
+            st.write(f"{rank}. {feature}")
+    export_perf(recorder)
+
+prediction_section()
+
+# What-if sweep: the categorical features are fixed and Year x Affected Users x Resolution Time is scored as one
+# grid per model (see scenario_sweep.py), so a 100 x 100 x 100 grid takes about a second. Results are kept per
+# scenario; the year slider only re-slices them.
+SWEEP_CATEGORICAL = ['Country', 'Attack Source', 'Security Vulnerability Type', 'Defense Mechanism Used']
+
+@STORE.memoize('sweep')
+def get_sweep(version, labels, steps):
+    sweep_df, sweep_encoders = get_dataset(version)
+    fixed = {col + '_encoded': int(sweep_encoders[col].transform([label])[0])
+             for col, label in zip(SWEEP_CATEGORICAL, labels)}
+    axes = {col: axis_values(sweep_df[col].min(), sweep_df[col].max(), steps, integer=(col == 'Year'))
+            for col in SWEEP_FEATURES}
+    return sweep(get_models(version), fixed, axes)
+
+@st.fragment
+def sweep_section():
+    recorder = section_recorder('sweep')
+    st.subheader("🧪 What-if Sensitivity Sweep")
+
+    with st.form("sweep_form"):
+        st.markdown("_Fix the scenario and see how the predictions change across Year, Affected Users and Resolution Time_")
+        cols = st.columns(len(SWEEP_CATEGORICAL))
+        labels = tuple(col.selectbox(name, label_encoders[name].classes_, key=f"sweep_{name}")
+                       for col, name in zip(cols, SWEEP_CATEGORICAL))
+        steps = st.slider("Grid points per axis", 10, 100, 50, step=10)
+        if st.form_submit_button("📐 Run Sweep"):
+            st.session_state.sweep_params = (labels, steps)
+
+    if 'sweep_params' not in st.session_state:
+        return
+    labels, steps = st.session_state.sweep_params
+    with recorder.stage('sweep') as stage:
+        result = get_sweep(data_version, labels, steps)
+        stage['rows'] = result.n_points
+    st.caption(f"{result.n_points:,} scenarios scored in {result.elapsed_s:.2f}s")
+
+    years, users, hours = (result.axes[col] for col in SWEEP_FEATURES)
+    year = st.select_slider("Year shown in the heatmaps", options=years.astype(int).tolist(),
+                            value=int(years[len(years) // 2]))
+    i = int(np.searchsorted(years, year))
+    attack_names = label_encoders['Attack Type'].classes_
+    attack_codes = result.predictions['rf_attack'][i].astype(int)
+
+    col1, col2 = st.columns(2)
     with col1:
-        st.metric("Predicted Attack Type", decoded_attack)
+        fig = go.Figure(go.Heatmap(
+            z=result.predictions['rf_sev'][i].T, x=users, y=hours, colorscale='Reds',
+            colorbar=dict(title='Loss ($M)'),
+            hovertemplate='Users: %{x:,.0f}<br>Resolution: %{y:.1f}h<br>Loss: $%{z:,.2f}M<extra></extra>',
+        ))
+        fig.update_layout(title=f"Predicted Financial Loss ({year})", xaxis_title=SWEEP_FEATURES[1],
+                          yaxis_title=SWEEP_FEATURES[2])
+        st.plotly_chart(fig, width="stretch")
     with col2:
-        st.metric("Predicted Target Industry", decoded_industry)
-    with col3:
-        st.metric("Estimated Financial Loss", f"${loss_pred:,.2f}M")
-    
-    # Display input summary
-    if 'form_data' in st.session_state:
-        st.markdown("**📋 Input Summary:**")
+        # One flat colour band per attack type
+        palette, scale = px.colors.qualitative.Plotly, []
+        for k in range(len(attack_names)):
+            scale += [[k / len(attack_names), palette[k % len(palette)]],
+                      [(k + 1) / len(attack_names), palette[k % len(palette)]]]
+        fig = go.Figure(go.Heatmap(
+            z=attack_codes.T, x=users, y=hours, zmin=-0.5, zmax=len(attack_names) - 0.5, colorscale=scale,
+            text=attack_names[attack_codes].T, customdata=result.confidence['rf_attack'][i].T,
+            colorbar=dict(tickvals=list(range(len(attack_names))), ticktext=list(attack_names)),
+            hovertemplate='Users: %{x:,.0f}<br>Resolution: %{y:.1f}h<br>%{text} (%{customdata:.0%})<extra></extra>',
+        ))
+        fig.update_layout(title=f"Predicted Attack Type ({year})", xaxis_title=SWEEP_FEATURES[1],
+                          yaxis_title=SWEEP_FEATURES[2])
+        st.plotly_chart(fig, width="stretch")
+
+    st.markdown("**Partial dependence** (mean prediction over the other two swept features)")
+    for col, axis in zip(st.columns(3), SWEEP_FEATURES):
+        with col:
+            loss_curve = pd.DataFrame({axis: result.axes[axis],
+                                       'Financial Loss (in Million $)': result.partial_dependence['rf_sev'][axis][:, 0]})
+            st.plotly_chart(px.line(loss_curve, x=axis, y='Financial Loss (in Million $)'), width="stretch")
+            attack_curve = pd.DataFrame(result.partial_dependence['rf_attack'][axis], columns=attack_names)
+            attack_curve[axis] = result.axes[axis]
+            fig = px.line(attack_curve, x=axis, y=list(attack_names), labels={'value': 'Probability',
+                                                                                'variable': 'Attack Type'})
+            st.plotly_chart(fig, width="stretch")
+    export_perf(recorder)
+
+sweep_section()
+
+# Stage timings: the last full rerun plus the latest run of every stage in this process, since fragments
+# rerun on their own. Also appended to artifacts/metrics/stages.jsonl and stages.prom (Prometheus textfile format).
+@st.fragment
+def performance_section():
+    section = st.expander("⏱️ Performance (Click to expand)", key="performance_expander", on_change="rerun")
+    with section:
+        if not section.open:
+            return
+        st.write(f"**Instrumented time of the last full rerun:** {perf.total_wall_s:.3f}s")
+        stages = pd.DataFrame.from_dict(perf.registry.snapshot(), orient='index').rename_axis('stage').reset_index()
+        stages['last_memory_mb'] = (stages['last_memory'] / 2**20).round(1)
+        st.dataframe(
+            stages[['stage', 'runs', 'last_rows', 'last_wall', 'last_cpu', 'last_memory_mb', 'wall_total']],
+            width="stretch", hide_index=True
+        )
         col1, col2 = st.columns(2)
         with col1:
-            st.write(f"• **Country:** {st.session_state.form_data['country']}")
-            st.write(f"• **Attack Source:** {st.session_state.form_data['attack_source']}")
-            st.write(f"• **Year:** {st.session_state.form_data['user_input']['Year']}")
-            st.write(f"• **Affected Users:** {st.session_state.form_data['user_input']['Number of Affected Users']:,}")
+            st.download_button("Download JSON lines", pd.DataFrame(perf.records).to_json(orient='records', lines=True),
+                               file_name="stages.jsonl", mime="application/json")
         with col2:
-            st.write(f"• **Security Vulnerability:** {st.session_state.form_data['vuln_type']}")
-            st.write(f"• **Defense Mechanism:** {st.session_state.form_data['defense']}")
-            st.write(f"• **Resolution Time:** {st.session_state.form_data['user_input']['Incident Resolution Time (in Hours)']} hours")
-        
-        st.divider()
-    
-    # Additional insights
-    st.info(f"""
-    **Scenario Analysis:**
-    - This prediction suggests a **{decoded_attack}** attack targeting the **{decoded_industry}** sector
-    - Expected financial impact: **${loss_pred:,.2f} Million**
-    - Based on the input parameters, this scenario has a moderate to high risk profile
-    """)
-    
-    # Show feature importance for this prediction
-    st.markdown("**Top 3 Most Important Features for this Prediction:**")
-    st.write(f"1. {attack_feature_importance.iloc[0]['feature']}")
-    st.write(f"2. {attack_feature_importance.iloc[1]['feature']}")
-    st.write(f"3. {attack_feature_importance.iloc[2]['feature']}")
+            st.download_button("Download Prometheus metrics", perf.registry.to_prometheus(),
+                               file_name="stages.prom", mime="text/plain")
+        st.write(f"**Shared store:** {STORE.nbytes / 2**20:,.1f} of {STORE.budget_bytes / 2**20:,.0f} MB "
+                 f"budget in derived results, {STORE.pinned_nbytes / 2**20:,.1f} MB pinned")
+        store_stats = pd.DataFrame(STORE.stats())
+        store_stats['mb'] = (store_stats['bytes'] / 2**20).round(2)
+        st.dataframe(store_stats[['artifact', 'pinned', 'entries', 'mb', 'hits', 'misses', 'evictions']],
+                     width="stretch", hide_index=True)
+
+performance_section()
+export_perf(perf)
@@ -0,0 +1,264 @@
+"""Loading, cleaning and encoding of the cyber threat incident dataset.
+
+The first load of a CSV runs the original ``ffill`` / ``to_numeric`` /
+``fillna`` / ``LabelEncoder`` pipeline once and writes the result to an Arrow
+IPC file under ``artifacts/dataset``. Numeric columns are stored with their
+final dtypes and categorical columns as dictionary-encoded codes, so later
+loads memory-map the file and take the ``*_encoded`` columns and the label
+encoders straight from it without re-parsing or re-encoding anything.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc  # noqa: F401  (registers pa.ipc)
+except ImportError:  # pragma: no cover - CSV pipeline still works without it
+    pa = None
+
+from model_store import ARTIFACT_DIR
+
+DATA_PATH = Path(__file__).resolve().parent / "data" / "clean_global_cybersecurity_threats.csv"
+DATASET_CACHE_DIR = ARTIFACT_DIR / "dataset"
+
+NUMERIC_COLUMNS = ['Year', 'Financial Loss (in Million $)', 'Number of Affected Users', 'Incident Resolution Time (in Hours)']
+CATEGORICAL_COLUMNS = ['Country', 'Attack Type', 'Target Industry', 'Attack Source', 'Security Vulnerability Type', 'Defense Mechanism Used']
+
+# Feature layout shared by the dashboard models and every tool that scores them
+CATEGORICAL_FEATURES = ['Country', 'Attack Source', 'Security Vulnerability Type', 'Defense Mechanism Used']
+NUMERIC_FEATURES = ['Year', 'Number of Affected Users', 'Incident Resolution Time (in Hours)']
+FEATURE_COLUMNS = [col + '_encoded' for col in CATEGORICAL_FEATURES] + NUMERIC_FEATURES
+
+
+def clean_frame(df, carry=None):
+    """Apply the dashboard's cleaning: forward fill, numeric coercion, zero fill.
+
+    ``carry`` is the last cleaned row of a preceding chunk. It seeds the
+    forward fill so cleaning a file chunk by chunk gives the same result as
+    cleaning it in one piece.
+    """
+    df = df.ffill()
+    if carry is not None:
+        df = df.fillna(carry)
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df.fillna(0)
+
+
+def encoder_from_classes(classes):
+    """Rebuild a fitted ``LabelEncoder`` from its category table."""
+    le = LabelEncoder()
+    le.classes_ = np.asarray(classes, dtype=object)
+    return le
+
+
+def encode_frame(df):
+    """Label-encode the categorical columns of a cleaned frame.
+
+    Adds one ``<col>_encoded`` column per categorical column and turns the
+    label column itself into a ``Categorical`` over the encoder's classes.
+    Returns the frame and a ``{column: LabelEncoder}`` mapping.
+    """
+    label_encoders = {}
+    for col in CATEGORICAL_COLUMNS:
+        if col not in df.columns:
+            continue
+        le = LabelEncoder()
+        codes = le.fit_transform(df[col].astype(str))
+        df[col] = pd.Categorical.from_codes(codes, categories=le.classes_)
+        df[col + '_encoded'] = codes.astype(np.int32)
+        label_encoders[col] = le
+    return df, label_encoders
+
+
+def encode_scenarios(frame, label_encoders):
+    """Return the model feature matrix (``FEATURE_COLUMNS`` order) for ``frame``.
+
+    Each categorical feature is taken from its ``<col>_encoded`` column when
+    present, otherwise its labels are encoded in one vectorized pass against
+    the encoder's classes. Unknown labels raise ``ValueError``.
+    """
+    columns = {}
+    for col in CATEGORICAL_FEATURES:
+        if col + '_encoded' in frame.columns:
+            columns[col + '_encoded'] = frame[col + '_encoded'].to_numpy(dtype=np.int32)
+            continue
+        classes = label_encoders[col].classes_
+        codes = pd.Categorical(frame[col].astype(str), categories=classes).codes
+        if (codes < 0).any():
+            unknown = sorted(set(frame[col].astype(str)[codes < 0]))
+            raise ValueError(f"Unknown {col} labels: {', '.join(unknown[:10])}")
+        columns[col + '_encoded'] = codes.astype(np.int32)
+    for col in NUMERIC_FEATURES:
+        columns[col] = pd.to_numeric(frame[col], errors='coerce').fillna(0).to_numpy()
+    return pd.DataFrame(columns, index=frame.index)[FEATURE_COLUMNS]
+
+
+def load_csv_dataset(path=DATA_PATH):
+    """Run the full CSV -> clean -> encode pipeline without any caching."""
+    df = clean_frame(pd.read_csv(path))
+    return encode_frame(df)
+
+
+def cache_path_for(source, cache_dir=None):
+    """Return the columnar cache file for ``source`` (keyed by size and mtime)."""
+    source = Path(source)
+    stat = source.stat()
+    cache_dir = Path(cache_dir) if cache_dir is not None else DATASET_CACHE_DIR
+    return cache_dir / f"{source.stem}-{stat.st_size}-{stat.st_mtime_ns}.arrow"
+
+
+def segment_paths(cached):
+    """Return the base cache file followed by its appended segments, in order."""
+    cached = Path(cached)
+    return [cached] + sorted(cached.parent.glob(f"{cached.stem}.part-*.arrow"))
+
+
+def dataset_version(path=DATA_PATH, cache_dir=None):
+    """Identify the current contents of the dataset (source file plus appends)."""
+    cached = cache_path_for(path, cache_dir)
+    if pa is None or not cached.exists():
+        return cached.stem
+    return f"{cached.stem}+{len(segment_paths(cached)) - 1}"
+
+
+def frame_to_table(df, label_encoders):
+    """Convert an encoded frame to an Arrow table with dictionary columns."""
+    arrays, names = [], []
+    for col in df.columns:
+        if col.endswith('_encoded') and col[:-len('_encoded')] in label_encoders:
+            continue
+        if col in label_encoders:
+            codes = df[col + '_encoded'].to_numpy(dtype=np.int32)
+            dictionary = pa.array(label_encoders[col].classes_.tolist(), type=pa.string())
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array(codes), dictionary))
+        else:
+            arrays.append(pa.array(df[col].to_numpy()))
+        names.append(col)
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def write_table(path, table):
+    """Write ``table`` as an uncompressed Arrow IPC file (atomic replace)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_columnar(path, df, label_encoders):
+    """Write an encoded frame to ``path`` in the columnar cache format."""
+    write_table(path, frame_to_table(df, label_encoders))
+
+
+def table_to_frame(table):
+    """Rebuild the encoded frame and label encoders from an Arrow table.
+
+    Numeric columns and dictionary codes are taken as views of the Arrow
+    buffers, so a memory-mapped table is not copied into the process.
+    """
+    columns, encoded, label_encoders = {}, {}, {}
+    for name, column in zip(table.column_names, table.columns):
+        if pa.types.is_dictionary(column.type):
+            # Appended segments only ever extend the category table, so the
+            # last chunk's dictionary covers the codes of every earlier chunk
+            classes = column.chunk(column.num_chunks - 1).dictionary.to_pylist()
+            if column.num_chunks == 1:
+                codes = column.chunk(0).indices.to_numpy(zero_copy_only=False)
+            else:
+                codes = np.concatenate([chunk.indices.to_numpy(zero_copy_only=False)
+                                        for chunk in column.chunks])
+            columns[name] = pd.Categorical.from_codes(codes, categories=classes)
+            encoded[name + '_encoded'] = codes
+            label_encoders[name] = encoder_from_classes(classes)
+        else:
+            columns[name] = column.to_numpy()
+    columns.update(encoded)
+    return pd.DataFrame(columns, copy=False), label_encoders
+
+
+def read_columnar(paths):
+    """Memory-map Arrow IPC dataset file(s) and return ``(df, label_encoders)``.
+
+    A single file is read without copying; several segments are concatenated.
+    """
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    tables = []
+    for path in paths:
+        # The mapping stays alive for as long as the returned arrays reference it
+        source = pa.memory_map(str(path), 'r')
+        tables.append(pa.ipc.open_file(source).read_all())
+    table = tables[0] if len(tables) == 1 else pa.concat_tables(tables)
+    return table_to_frame(table)
+
+
+def append_segment(df, label_encoders, path=DATA_PATH, cache_dir=None):
+    """Append already encoded incidents to the columnar cache of ``path``.
+
+    ``label_encoders`` must be the existing encoders extended with any new
+    labels (existing codes unchanged). The rows are written as a new segment
+    file, so the cost depends on the size of ``df`` only.
+    """
+    if pa is None:
+        raise RuntimeError("Appending incidents requires pyarrow")
+    cached = cache_path_for(path, cache_dir)
+    segments = segment_paths(cached)
+    with pa.memory_map(str(cached), 'r') as source:
+        schema = pa.ipc.open_file(source).schema
+    table = frame_to_table(df, label_encoders).select(schema.names).cast(schema)
+    target = cached.with_name(f"{cached.stem}.part-{len(segments):05d}.arrow")
+    write_table(target, table)
+    return target
+
+
+def dataset_tail(path=DATA_PATH, cache_dir=None):
+    """Return ``(n_rows, last_row, label_encoders)`` of the cached dataset without loading it.
+
+    The row count comes from the segment files' batch headers and the last
+    row and encoders from the last segment, whose dictionaries cover every
+    earlier one, so the cost does not grow with the dataset.
+    """
+    if pa is None:
+        raise RuntimeError("Reading the dataset tail requires pyarrow")
+    cached = cache_path_for(path, cache_dir)
+    if not cached.exists():
+        load_dataset(path, cache_dir)
+    n_rows = 0
+    for segment in segment_paths(cached):
+        # The mapping stays alive for as long as the last segment's arrays reference it
+        reader = pa.ipc.open_file(pa.memory_map(str(segment), 'r'))
+        n_rows += sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    last = reader.read_all()
+    last_row, label_encoders = table_to_frame(last.slice(last.num_rows - 1))
+    return n_rows, last_row.iloc[0], label_encoders
+
+
+def load_dataset(path=DATA_PATH, cache_dir=None):
+    """Return the cleaned, encoded dataset and its label encoders.
+
+    Uses the columnar cache when pyarrow is available, building it from the
+    CSV on the first call; otherwise falls back to the plain CSV pipeline.
+    """
+    if pa is None:
+        return load_csv_dataset(path)
+    cached = cache_path_for(path, cache_dir)
+    if not cached.exists():
+        df, label_encoders = load_csv_dataset(path)
+        write_columnar(cached, df, label_encoders)
+    return read_columnar(segment_paths(cached))
@@ -0,0 +1,218 @@
+"""Model definitions and the train/test split shared by the dashboard and tools.
+
+The three dashboard forests are described once in ``MODEL_SPECS`` so the
+dashboard, the append pipeline and the scoring tools build, split and look up
+exactly the same models in the ``ModelStore``.
+"""
+
+import argparse
+from dataclasses import dataclass
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+from cyber_data import DATA_PATH, FEATURE_COLUMNS, dataset_version, load_dataset
+from flat_forest import load_or_export
+from model_store import ModelStore
+from training_engine import fit_concurrently
+
+# name -> (estimator kind, target column, label column decoded for display)
+MODEL_SPECS = {
+    'rf_attack': ('classifier', 'Attack Type_encoded', 'Attack Type'),
+    'rf_sev': ('regressor', 'Financial Loss (in Million $)', None),
+    'rf_thr': ('classifier', 'Target Industry_encoded', 'Target Industry'),
+}
+DEFAULT_PARAMS = {'n_estimators': 100, 'random_state': 42}
+TEST_SIZE = 0.2
+SPLIT_SEED = 42
+
+
+def make_estimator(name, **params):
+    """Return an unfitted estimator for ``name`` with the dashboard defaults."""
+    kind = MODEL_SPECS[name][0]
+    params = {**DEFAULT_PARAMS, **params}
+    if kind == 'classifier':
+        return RandomForestClassifier(**params)
+    return RandomForestRegressor(**params)
+
+
+def test_mask(n_rows, test_size=TEST_SIZE, seed=SPLIT_SEED, start=0):
+    """Boolean mask of test rows, stable under appends.
+
+    Each row position is hashed (splitmix64) to a uniform number, so a row
+    keeps its train/test assignment when new incidents are appended after it.
+    ``start`` gives the mask of rows ``start`` to ``start + n_rows`` only.
+    """
+    with np.errstate(over='ignore'):
+        z = np.arange(start, start + n_rows, dtype=np.uint64) + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53) < test_size
+
+
+@dataclass
+class DatasetSplit:
+    """Features and per-model targets for the train and test rows."""
+
+    X_train: object
+    X_test: object
+    y_train: dict
+    y_test: dict
+
+
+def split_dataset(df, test_size=TEST_SIZE, seed=SPLIT_SEED):
+    """Split ``df`` into features and targets for every model in ``MODEL_SPECS``."""
+    mask = test_mask(len(df), test_size, seed)
+    features = df[FEATURE_COLUMNS]
+    y_train, y_test = {}, {}
+    for name, (_, target, _) in MODEL_SPECS.items():
+        y_train[name] = df[target][~mask]
+        y_test[name] = df[target][mask]
+    return DatasetSplit(features[~mask], features[mask], y_train, y_test)
+
+
+def train_models(store, split, params=None, n_jobs=None, force=False, version=None):
+    """Return ``(models, timings)`` for every model in ``MODEL_SPECS``.
+
+    Models found in ``store`` are loaded; the rest (all of them with
+    ``force``) are fitted concurrently on one shared copy of the training
+    features and saved. ``params`` optionally maps a model name to
+    hyperparameter overrides (default: those published to ``store`` by
+    ``model_tuning.py``). With the dataset ``version`` the keys come from the
+    store's data index instead of hashing the training data. ``timings``
+    only covers the fitted models.
+    """
+    params = store.load_params() if params is None else params
+    models, tasks, keys = {}, {}, {}
+    for name in MODEL_SPECS:
+        estimator = make_estimator(name, **params.get(name, {}))
+        keys[name] = store.key_for(name, estimator, split.X_train, split.y_train[name], version)
+        model = None if force else store.load(keys[name])
+        if model is None:
+            tasks[name] = (estimator, split.y_train[name])
+        else:
+            models[name] = model
+    fitted, timings = fit_concurrently(split.X_train, tasks, n_jobs=n_jobs)
+    for name, model in fitted.items():
+        store.save(keys[name], model)
+    models.update(fitted)
+    return {name: models[name] for name in MODEL_SPECS}, timings
+
+
+def load_or_train_models(store, split, params=None, version=None):
+    """Return ``{name: fitted model}`` from ``store``, training only on a miss."""
+    return train_models(store, split, params, version=version)[0]
+
+
+def load_flat_models(store, split, params=None, quantize=False, version=None):
+    """Return memory-mapped ``FlatForest`` exports of the models for ``split``.
+
+    Exports live next to the model store, keyed like the sklearn models; a
+    missing export is created from the stored (or freshly trained) forest.
+    """
+    params = store.load_params() if params is None else params
+    fitted = {}
+
+    def fitted_model(name):
+        if not fitted:
+            fitted.update(load_or_train_models(store, split, params, version))
+        return fitted[name]
+
+    flat = {}
+    for name in MODEL_SPECS:
+        estimator = make_estimator(name, **params.get(name, {}))
+        key = store.key_for(name, estimator, split.X_train, split.y_train[name], version)
+        flat[name] = load_or_export(key + ('-q' if quantize else ''),
+                                    lambda name=name: fitted_model(name), quantize)
+    return flat
+
+
+def load_current_models(path=DATA_PATH, store=None, flat=False):
+    """Return ``(models, label_encoders)`` for the current dataset at ``path``.
+
+    With ``flat`` the models are the memory-mapped ``FlatForest`` exports.
+    """
+    df, label_encoders = load_dataset(path)
+    store = store if store is not None else ModelStore()
+    split, version = split_dataset(df), dataset_version(path)
+    models = (load_flat_models(store, split, version=version) if flat
+              else load_or_train_models(store, split, version=version))
+    return models, label_encoders
+
+
+def predict_all(models, X):
+    """Run every model on the feature frame ``X``; returns ``{name: predictions}``."""
+    return {name: model.predict(X) for name, model in models.items()}
+
+
+def explain_all(models, X):
+    """Per-feature contributions of every flat model on ``X``; returns ``{name: (bias, contributions)}``.
+
+    Classifier attributions are for the predicted class, so ``bias`` has shape
+    ``(n_rows,)`` and ``contributions`` ``(n_rows, n_features)`` for every
+    model. Duplicate rows are explained once.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    unique, inverse = np.unique(X, axis=0, return_inverse=True)
+    explanations = {}
+    for name, model in models.items():
+        bias, contributions = model.contributions(unique)
+        if MODEL_SPECS[name][0] == 'classifier':
+            predicted = (bias + contributions.sum(axis=1)).argmax(axis=1)
+            bias = bias[np.arange(len(unique)), predicted]
+            contributions = contributions[np.arange(len(unique)), :, predicted]
+        else:
+            bias, contributions = bias[:, 0], contributions[:, :, 0]
+        explanations[name] = bias[inverse], contributions[inverse]
+    return explanations
+
+
+def decode_contributions(explanations):
+    """Turn ``explain_all`` output into named ``<target> bias`` / ``<target> | <feature>`` columns."""
+    decoded = {}
+    for name, (bias, contributions) in explanations.items():
+        _, target, label_col = MODEL_SPECS[name]
+        target = label_col or target
+        decoded[f'{target} bias'] = bias
+        for i, col in enumerate(FEATURE_COLUMNS):
+            decoded[f"{target} | {col.removesuffix('_encoded')}"] = contributions[:, i]
+    return decoded
+
+
+def decode_predictions(predictions, label_encoders):
+    """Turn ``predict_all`` output into named, decoded prediction columns."""
+    decoded = {}
+    for name, values in predictions.items():
+        _, target, label_col = MODEL_SPECS[name]
+        if label_col is None:
+            decoded[f'Predicted {target}'] = values
+        else:
+            decoded[f'Predicted {label_col}'] = label_encoders[label_col].classes_[values.astype(np.int64)]
+    return decoded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the dashboard models and report per-target timings.")
+    parser.add_argument("--data", default=str(DATA_PATH), help="dataset to train on")
+    parser.add_argument("--n-jobs", type=int, default=None, help="cores to use (default: all)")
+    parser.add_argument("--force", action="store_true", help="retrain even when the model store has the models")
+    parser.add_argument("--flat", action="store_true", help="also export the memory-mapped inference format")
+    parser.add_argument("--quantize", action="store_true", help="quantize the flat export (with --flat)")
+    args = parser.parse_args(argv)
+
+    df, _ = load_dataset(args.data)
+    store, split, version = ModelStore(), split_dataset(df), dataset_version(args.data)
+    _, timings = train_models(store, split, n_jobs=args.n_jobs, force=args.force, version=version)
+    if not timings:
+        print("All models loaded from the model store (use --force to retrain).")
+    for timing in timings.values():
+        print(f"{timing.name:<10} wall {timing.wall_s:7.2f}s  cpu {timing.cpu_s:7.2f}s  n_jobs {timing.n_jobs}")
+    if args.flat:
+        for name, forest in load_flat_models(store, split, quantize=args.quantize, version=version).items():
+            print(f"{name:<10} flat export {forest.nbytes / 2**20:6.1f} MiB, {forest.n_trees} trees, "
+                  f"depth {forest.max_depth}")
+
+
+if __name__ == "__main__":
+    main()
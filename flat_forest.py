@@ -0,0 +1,241 @@
+"""Compact, memory-mapped inference format for the RandomForest models.
+
+A fitted forest is flattened into a handful of contiguous typed arrays
+(split feature, threshold, (left, right) children and node value for every
+node of every tree, plus each tree's root offset) saved as ``.npy`` files.
+Loading memory-maps them read-only, so every process that serves
+predictions shares one copy of the model through the page cache instead of
+holding its own scikit-learn objects.
+
+Prediction walks all trees at once: leaves point to themselves, so at most
+``max_depth`` vectorized steps of ``node = children[node, x > threshold]``
+take every (row, tree) pair to its leaf; pairs that reached a leaf are
+dropped from the working set every few steps. This is much faster than
+scikit-learn's per-tree dispatch for the small batches of the prediction
+form and service, and slower for very large batches.
+
+``contributions`` walks the same paths and credits every step's change in
+node value to the feature split on (Saabas-style attributions), so the mean
+leaf value splits exactly into the forest's root value plus one
+contribution per feature.
+
+With ``quantize=True`` thresholds are stored as float32 and node values as
+float16, roughly halving the size at the cost of rare one-ulp split
+differences and ~1e-3 relative error in node values.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from model_store import ARTIFACT_DIR
+
+FLAT_DIR = ARTIFACT_DIR / "flat"
+ARRAYS = ('feature', 'threshold', 'children', 'value', 'roots')
+DEFAULT_CHUNK_ROWS = 4096
+COMPACT_EVERY = 3
+
+
+class FlatForest:
+    """Array-backed forest with a scikit-learn-like ``predict`` API."""
+
+    def __init__(self, arrays, meta):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+        # Directory the arrays are memory-mapped from, if any
+        self.path = None
+        self.kind = meta['kind']
+        self.max_depth = meta['max_depth']
+        self.n_features_in_ = meta['n_features']
+        self.classes_ = np.asarray(meta['classes']) if meta.get('classes') is not None else None
+        self.feature_importances_ = np.asarray(meta['feature_importances'])
+        if meta.get('feature_names') is not None:
+            self.feature_names_in_ = np.asarray(meta['feature_names'], dtype=object)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAYS)
+
+    @classmethod
+    def from_sklearn(cls, model, quantize=False):
+        """Flatten a fitted ``RandomForestClassifier`` / ``RandomForestRegressor``."""
+        is_classifier = hasattr(model, 'classes_')
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset, max_depth = 0, 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            leaf = tree.children_left < 0
+            own = np.arange(offset, offset + n)
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(np.where(leaf, 0.0, tree.threshold))
+            children.append(np.column_stack([np.where(leaf, own, tree.children_left + offset),
+                                             np.where(leaf, own, tree.children_right + offset)]))
+            value = tree.value[:, 0, :]
+            if is_classifier:
+                value = value / value.sum(axis=1, keepdims=True)
+            values.append(value)
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        n_features = model.n_features_in_
+        arrays = {
+            'feature': np.concatenate(features).astype(np.uint8 if n_features < 256 else np.int32),
+            'threshold': np.concatenate(thresholds).astype(np.float32 if quantize else np.float64),
+            'children': np.concatenate(children).astype(np.int32),
+            'value': np.concatenate(values).astype(np.float16 if quantize else np.float64),
+            'roots': np.asarray(roots, dtype=np.int32),
+        }
+        names = getattr(model, 'feature_names_in_', None)
+        meta = {
+            'kind': 'classifier' if is_classifier else 'regressor',
+            'max_depth': int(max_depth),
+            'n_features': int(n_features),
+            'classes': model.classes_.tolist() if is_classifier else None,
+            'feature_importances': model.feature_importances_.tolist(),
+            'feature_names': [str(n) for n in names] if names is not None else None,
+            'quantized': bool(quantize),
+        }
+        return cls(arrays, meta)
+
+    def save(self, directory):
+        """Write the arrays and metadata to ``directory`` (atomic rename).
+
+        Exports are keyed by content, so if another process got there first
+        its directory is kept and this copy is discarded.
+        """
+        directory = Path(directory)
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(dir=directory.parent, suffix='.tmp'))
+        try:
+            for name in ARRAYS:
+                np.save(tmp_dir / f"{name}.npy", np.ascontiguousarray(getattr(self, name)))
+            (tmp_dir / 'meta.json').write_text(json.dumps(self.meta))
+            try:
+                os.rename(tmp_dir, directory)
+            except OSError:
+                if not (directory / 'meta.json').exists():
+                    raise
+        finally:
+            if tmp_dir.exists():
+                shutil.rmtree(tmp_dir)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Load a saved forest; with ``mmap`` the arrays are read-only memory maps."""
+        directory = Path(directory)
+        # Plain ndarray views of the maps index faster than np.memmap objects
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode='r' if mmap else None).view(np.ndarray)
+                  for name in ARRAYS}
+        forest = cls(arrays, json.loads((directory / 'meta.json').read_text()))
+        forest.path = directory if mmap else None
+        return forest
+
+    def _as_matrix(self, X):
+        return np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+
+    def leaf_nodes(self, X):
+        """Return the ``(n_rows, n_trees)`` global leaf index reached by each row."""
+        X = self._as_matrix(X)
+        n_rows, n_features = X.shape
+        flat_x = X.ravel()
+        children = self.children.ravel()
+        # One entry per (row, tree) pair: current node and offset of the row in flat_x
+        node = np.tile(self.roots.astype(np.intp), n_rows)
+        row_offset = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, self.n_trees)
+        pending = np.arange(len(node))
+        leaves = np.empty(len(node), dtype=np.intp)
+        for depth in range(self.max_depth):
+            go_right = flat_x[row_offset + self.feature[node]] > self.threshold[node]
+            next_node = children[2 * node + go_right]
+            if depth % COMPACT_EVERY == COMPACT_EVERY - 1:
+                done = next_node == node
+                leaves[pending[done]] = next_node[done]
+                keep = ~done
+                pending, next_node, row_offset = pending[keep], next_node[keep], row_offset[keep]
+            node = next_node
+            if not len(node):
+                break
+        leaves[pending] = node
+        return leaves.reshape(n_rows, self.n_trees)
+
+    def _mean_value(self, X, chunk_rows):
+        X = self._as_matrix(X)
+        out = np.empty((len(X), self.value.shape[1]), dtype=np.float64)
+        for start in range(0, len(X), chunk_rows):
+            leaves = self.leaf_nodes(X[start:start + chunk_rows])
+            out[start:start + chunk_rows] = self.value[leaves].astype(np.float64).mean(axis=1)
+        return out
+
+    def contributions(self, X, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """Return ``(bias, contributions)`` of shapes ``(n_rows, n_outputs)`` and ``(n_rows, n_features, n_outputs)``.
+
+        ``bias`` is the mean root value of the trees and ``contributions``
+        the per-feature change in node value along each row's decision paths,
+        averaged over the trees; they add up to ``predict_proba`` (or the
+        regression prediction).
+        """
+        X = self._as_matrix(X)
+        n_rows, n_features = X.shape
+        n_outputs = self.value.shape[1]
+        bias = np.broadcast_to(self.value[self.roots].astype(np.float64).mean(axis=0), (n_rows, n_outputs))
+        out = np.zeros((n_rows, n_features, n_outputs), dtype=np.float64)
+        children = self.children.ravel()
+        for start in range(0, n_rows, chunk_rows):
+            chunk = X[start:start + chunk_rows]
+            flat_x = chunk.ravel()
+            size = len(chunk) * n_features
+            node = np.tile(self.roots.astype(np.intp), len(chunk))
+            row = np.repeat(np.arange(len(chunk), dtype=np.intp), self.n_trees)
+            totals = np.zeros((n_outputs, size), dtype=np.float64)
+            for _ in range(self.max_depth):
+                split = self.feature[node].astype(np.intp)
+                next_node = children[2 * node + (flat_x[row * n_features + split] > self.threshold[node])]
+                # Leaves point to themselves, so pairs that stopped moving are done
+                moved = next_node != node
+                node, next_node, row, split = node[moved], next_node[moved], row[moved], split[moved]
+                if not len(node):
+                    break
+                delta = self.value[next_node].astype(np.float64) - self.value[node]
+                cell = row * n_features + split
+                for output in range(n_outputs):
+                    totals[output] += np.bincount(cell, weights=delta[:, output], minlength=size)
+                node = next_node
+            out[start:start + len(chunk)] = totals.T.reshape(len(chunk), n_features, n_outputs) / self.n_trees
+        return np.array(bias), out
+
+    def predict_proba(self, X, chunk_rows=DEFAULT_CHUNK_ROWS):
+        if self.kind != 'classifier':
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self._mean_value(X, chunk_rows)
+
+    def predict(self, X, chunk_rows=DEFAULT_CHUNK_ROWS):
+        mean = self._mean_value(X, chunk_rows)
+        if self.kind == 'classifier':
+            return self.classes_[mean.argmax(axis=1)]
+        return mean[:, 0]
+
+
+def flat_path_for(key, root=None):
+    return (Path(root) if root is not None else FLAT_DIR) / key
+
+
+def load_or_export(key, model_loader, quantize=False, root=None):
+    """Memory-map the flat export stored under ``key``, exporting it on first use.
+
+    ``model_loader`` is called (only on a miss) to get the fitted sklearn model.
+    """
+    path = flat_path_for(key, root)
+    if not (path / 'meta.json').exists():
+        FlatForest.from_sklearn(model_loader(), quantize=quantize).save(path)
+    return FlatForest.load(path)
@@ -0,0 +1,288 @@
+"""Incremental append of new incidents.
+
+``append_incidents`` takes a batch of raw incident rows and, without
+rebuilding anything from the full history:
+
+- extends the label encoders with labels they have never seen (existing
+  codes are unchanged, so the forests stay valid),
+- writes the encoded rows as a new segment of the columnar dataset cache,
+- folds the rows into the saved partitioned aggregate (moments and
+  sketches merge, so it is not rebuilt),
+- grows each RandomForest with extra trees fitted on the new training rows,
+  or refits it from scratch when the ``RefitPolicy`` says the grown forest
+  has drifted too far from a full fit.
+
+Only the dataset's row count, last row and encoders are read, and the new
+version's training-data hashes are derived from the previous version's
+(recorded in the ``ModelStore`` data index) and the appended rows, so the
+cost follows the size of the batch. The full history is loaded only for a
+refit, or when the previous version's aggregate or models are missing
+(reported as such in ``AppendReport.actions``).
+
+The updated models are saved under the ``ModelStore`` keys the dashboard
+computes for the new dataset, so the next rerun loads them directly.
+
+Usage::
+
+    python incident_append.py new_incidents.csv
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.tree._tree import Tree
+
+from cyber_data import (
+    CATEGORICAL_COLUMNS, DATA_PATH, FEATURE_COLUMNS, append_segment, clean_frame,
+    dataset_tail, dataset_version, encoder_from_classes, load_dataset,
+)
+from cyber_models import MODEL_SPECS, make_estimator, split_dataset, test_mask
+from partitioned_aggregation import PartialAggregate, aggregate_path_for, load_or_build_aggregate, partial_aggregate
+from model_store import ARTIFACT_DIR, ModelStore, frame_fingerprint, model_key
+
+LINEAGE_PATH = ARTIFACT_DIR / "models" / "lineage.json"
+
+
+@dataclass
+class RefitPolicy:
+    """Decides whether a forest is grown with extra trees or fully refitted.
+
+    A full refit is due when the target gains a class the forest has never
+    seen, when the rows appended since the last full fit exceed
+    ``max_delta_fraction`` of the rows it was fitted on, or when the trees
+    added since then would exceed ``max_tree_growth`` of its original size.
+    """
+
+    max_delta_fraction: float = 0.25
+    max_tree_growth: float = 0.5
+    min_new_trees: int = 1
+
+    def new_tree_count(self, lineage, delta_rows):
+        share = delta_rows / max(lineage['rows_at_refit'], 1)
+        return max(self.min_new_trees, math.ceil(lineage['trees_at_refit'] * share))
+
+    def needs_refit(self, lineage, delta_rows, new_trees, new_classes):
+        if new_classes:
+            return True
+        rows = lineage['rows_since_refit'] + delta_rows
+        trees = lineage['trees_added'] + new_trees
+        return (rows > self.max_delta_fraction * lineage['rows_at_refit']
+                or trees > self.max_tree_growth * lineage['trees_at_refit'])
+
+
+@dataclass
+class AppendReport:
+    rows: int
+    dataset_version: str
+    new_labels: dict = field(default_factory=dict)
+    actions: dict = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+def extend_label_encoders(label_encoders, delta):
+    """Return copies of ``label_encoders`` extended with the unseen labels in ``delta``.
+
+    New labels are appended after the existing classes, so every code issued
+    before stays the same. Returns ``(encoders, {column: [new labels]})``.
+    """
+    extended, new_labels = {}, {}
+    for col, le in label_encoders.items():
+        classes = list(le.classes_)
+        if col in delta.columns:
+            known = set(classes)
+            new = [label for label in pd.unique(delta[col].astype(str)) if label not in known]
+            if new:
+                classes.extend(new)
+                new_labels[col] = new
+        extended[col] = encoder_from_classes(classes)
+    return extended, new_labels
+
+
+def unseen_classes(model, y):
+    """Labels in ``y`` that the fitted classifier ``model`` has no class for (none for regressors)."""
+    if not hasattr(model, 'classes_'):
+        return np.array([])
+    return np.setdiff1d(np.unique(y), model.classes_)
+
+
+def _remap_classes(tree, positions, n_classes):
+    """Widen a fitted classification tree to ``n_classes`` outputs, its class ``i`` becoming ``positions[i]``."""
+    state = tree.tree_.__getstate__()
+    values = np.zeros((*state['values'].shape[:2], n_classes), dtype=state['values'].dtype)
+    values[:, :, positions] = state['values']
+    state['values'] = values
+    remapped = Tree(tree.n_features_in_, np.array([n_classes], dtype=np.intp), tree.n_outputs_)
+    remapped.__setstate__(state)
+    tree.tree_ = remapped
+    tree.classes_ = np.arange(n_classes, dtype=tree.classes_.dtype)
+    tree.n_classes_ = n_classes
+    return tree
+
+
+def grow_forest(model, X, y, n_new_trees):
+    """Add ``n_new_trees`` trees fitted on ``X`` / ``y`` to a fitted forest.
+
+    The new trees are fitted as a forest of their own. For a classifier their
+    class columns are then mapped onto the forest's ``classes_``, so a batch
+    that lacks some of the forest's classes still yields trees that vote in
+    the forest's layout; ``y`` must not hold classes the forest lacks (see
+    ``unseen_classes``).
+    """
+    if len(unseen_classes(model, y)):
+        raise ValueError("y has classes the forest has never seen; refit instead")
+    seed = model.random_state + len(model.estimators_) if isinstance(model.random_state, int) else None
+    extra = clone(model).set_params(n_estimators=n_new_trees, warm_start=False, random_state=seed)
+    extra.fit(pd.DataFrame(np.asarray(X), columns=FEATURE_COLUMNS), np.asarray(y))
+    trees = extra.estimators_
+    if hasattr(model, 'classes_'):
+        positions = np.searchsorted(model.classes_, extra.classes_)
+        trees = [_remap_classes(tree, positions, len(model.classes_)) for tree in trees]
+    model.estimators_.extend(trees)
+    model.set_params(n_estimators=len(model.estimators_))
+    return model
+
+
+def load_lineage():
+    if LINEAGE_PATH.exists():
+        return json.loads(LINEAGE_PATH.read_text())
+    return {}
+
+
+def save_lineage(lineage):
+    LINEAGE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = LINEAGE_PATH.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(lineage, indent=2))
+    os.replace(tmp_path, LINEAGE_PATH)
+
+
+def chain_hash(data_hash, X_delta, y_delta):
+    """Training-data hash after appending ``X_delta``/``y_delta`` to data hashed as ``data_hash``."""
+    if len(X_delta) == 0:
+        return data_hash
+    return hashlib.sha256((data_hash + frame_fingerprint(X_delta, y_delta)).encode()).hexdigest()
+
+
+def append_incidents(new_rows, path=DATA_PATH, store=None, policy=None, cache_dir=None, aggregate_dir=None):
+    """Append raw incident rows to the dataset, aggregate and models.
+
+    ``new_rows`` has the columns of the source CSV. ``cache_dir`` is the
+    dataset cache and ``aggregate_dir`` the aggregate directory (defaults as
+    for the dashboard). Returns an ``AppendReport``.
+    """
+    start = time.perf_counter()
+    store = store if store is not None else ModelStore()
+    policy = policy if policy is not None else RefitPolicy()
+    history = {}
+
+    def full_split(version):
+        # Only refits and missing artifacts need the full history
+        if version not in history:
+            df, _ = load_dataset(path, cache_dir)
+            history[version] = df, split_dataset(df)
+        return history[version]
+
+    n_old, last_row, label_encoders = dataset_tail(path, cache_dir)
+    old_version = dataset_version(path, cache_dir)
+
+    # Clean the delta as if it had been at the end of the source file
+    raw_columns = [col for col in last_row.index if not col.endswith('_encoded')]
+    delta = clean_frame(new_rows[raw_columns].copy(), carry=last_row[raw_columns])
+    label_encoders, new_labels = extend_label_encoders(label_encoders, delta)
+    for col in CATEGORICAL_COLUMNS:
+        delta[col] = delta[col].astype(str)
+        delta[col + '_encoded'] = label_encoders[col].transform(delta[col]).astype(np.int32)
+
+    old_aggregate_path = aggregate_path_for(old_version, aggregate_dir)
+    if old_aggregate_path.exists():
+        aggregate = PartialAggregate.load(old_aggregate_path)
+    else:
+        aggregate = load_or_build_aggregate(full_split(old_version)[0], old_version, aggregate_dir)
+
+    # Training rows and data hash of every model for the current version (hashed once if never recorded)
+    entries = {}
+    for name in MODEL_SPECS:
+        entries[name] = store.data_entry(old_version, name)
+        if entries[name] is None:
+            split = full_split(old_version)[1]
+            data_hash = store.data_hash(old_version, name, split.X_train, split.y_train[name])
+            entries[name] = {'rows': len(split.X_train), 'hash': data_hash}
+
+    append_segment(delta, label_encoders, path, cache_dir)
+    version = dataset_version(path, cache_dir)
+    aggregate.merge(partial_aggregate(delta)).save(aggregate_path_for(version, aggregate_dir))
+
+    # Rows keep their train/test assignment, so the delta's training rows are
+    # exactly the new rows that land outside the test mask
+    delta_train = ~test_mask(len(delta), start=n_old)
+    X_delta = delta.loc[delta_train, FEATURE_COLUMNS]
+
+    # Lineage (rows and trees since the last full fit) is tracked per model key
+    lineage_all = load_lineage()
+    report = AppendReport(rows=len(delta), dataset_version=version, new_labels=new_labels)
+    params = store.load_params()
+    for name, (_, target, _) in MODEL_SPECS.items():
+        estimator = make_estimator(name, **params.get(name, {}))
+        entry = entries[name]
+        old_key = model_key(name, entry['hash'], FEATURE_COLUMNS, estimator)
+        y_delta = delta.loc[delta_train, target]
+        rows, data_hash = entry['rows'] + len(y_delta), chain_hash(entry['hash'], X_delta, y_delta)
+        key = model_key(name, data_hash, FEATURE_COLUMNS, estimator)
+        old_model = store.load(old_key)
+        lineage = lineage_all.get(old_key) or {
+            'rows_at_refit': entry['rows'],
+            'trees_at_refit': len(old_model.estimators_) if old_model is not None else 0,
+            'rows_since_refit': 0,
+            'trees_added': 0,
+        }
+        new_trees = policy.new_tree_count(lineage, len(y_delta))
+        new_classes = old_model is not None and len(unseen_classes(old_model, y_delta)) > 0
+        if old_model is not None and len(y_delta) == 0:
+            model, action = old_model, 'unchanged'
+        elif old_model is None or policy.needs_refit(lineage, len(y_delta), new_trees, new_classes):
+            split = full_split(version)[1]
+            model = estimator.fit(split.X_train, split.y_train[name])
+            lineage = {'rows_at_refit': len(split.X_train), 'trees_at_refit': len(model.estimators_),
+                       'rows_since_refit': 0, 'trees_added': 0}
+            action = 'refit' if old_model is not None else 'refit (previous model not in the store)'
+        else:
+            model = grow_forest(old_model, X_delta, y_delta, new_trees)
+            lineage['rows_since_refit'] += len(y_delta)
+            lineage['trees_added'] += new_trees
+            action = f'grown +{new_trees} trees'
+        store.save(key, model)
+        store.record_data(version, name, rows, data_hash)
+        lineage_all[key] = lineage
+        report.actions[name] = action
+    save_lineage(lineage_all)
+
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append new incidents without a full recompute.")
+    parser.add_argument("incidents", help="CSV of new incidents with the source dataset's columns")
+    parser.add_argument("--source", default=str(DATA_PATH), help="dataset the incidents are appended to")
+    parser.add_argument("--max-delta-fraction", type=float, default=RefitPolicy.max_delta_fraction)
+    parser.add_argument("--max-tree-growth", type=float, default=RefitPolicy.max_tree_growth)
+    args = parser.parse_args(argv)
+
+    policy = RefitPolicy(args.max_delta_fraction, args.max_tree_growth)
+    report = append_incidents(pd.read_csv(args.incidents), args.source, policy=policy)
+    print(f"Appended {report.rows:,} incidents in {report.seconds:.2f}s -> {report.dataset_version}")
+    for col, labels in report.new_labels.items():
+        print(f"  new {col} labels: {', '.join(labels)}")
+    for name, action in report.actions.items():
+        print(f"  {name}: {action}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Pre-aggregated incident cube behind the dashboard charts and trend tables.
+
+The cube is grouped once on Year x Attack Type x Target Industry x Country x
+Attack Source and keeps, per cell, the incident count plus the sum and sum of
+squares of every numeric measure. Counts, means and standard deviations for
+any subset of those dimensions are roll-ups of the cells, so their cost
+depends on the number of distinct keys rather than on the number of incidents.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from model_store import ARTIFACT_DIR
+
+CUBE_CACHE_DIR = ARTIFACT_DIR / "cubes"
+CUBE_DIMENSIONS = ['Year', 'Attack Type', 'Target Industry', 'Country', 'Attack Source']
+CUBE_MEASURES = ['Financial Loss (in Million $)', 'Number of Affected Users', 'Incident Resolution Time (in Hours)']
+
+
+def aggregate_cells(df, dimensions=CUBE_DIMENSIONS, measures=CUBE_MEASURES):
+    """Group ``df`` into cube cells with ``count``, ``<m>|sum`` and ``<m>|sumsq`` columns."""
+    values = {'count': np.ones(len(df), dtype=np.int64)}
+    for measure in measures:
+        column = df[measure].to_numpy(dtype=np.float64)
+        values[f'{measure}|sum'] = column
+        values[f'{measure}|sumsq'] = column * column
+    frame = pd.DataFrame(values, index=pd.MultiIndex.from_frame(df[dimensions]))
+    return frame.groupby(level=dimensions, observed=True, sort=True).sum()
+
+
+class IncidentCube:
+    """Count / sum / sum-of-squares cube with roll-up helpers."""
+
+    def __init__(self, cells, dimensions=CUBE_DIMENSIONS, measures=CUBE_MEASURES):
+        self.cells = cells
+        self.dimensions = list(dimensions)
+        self.measures = list(measures)
+
+    @classmethod
+    def from_frame(cls, df, dimensions=CUBE_DIMENSIONS, measures=CUBE_MEASURES):
+        return cls(aggregate_cells(df, dimensions, measures), dimensions, measures)
+
+    @classmethod
+    def load(cls, path):
+        cells, dimensions, measures = pd.read_pickle(path)
+        return cls(cells, dimensions, measures)
+
+    def save(self, path):
+        """Persist the cube cells to ``path`` (atomic replace)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        os.close(fd)
+        try:
+            pd.to_pickle((self.cells, self.dimensions, self.measures), tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def merge(self, other):
+        """Return a cube holding the cells of both cubes (moments add up)."""
+        cells = pd.concat([self.cells, other.cells])
+        cells = cells.groupby(level=self.dimensions, observed=True, sort=True).sum()
+        return type(self)(cells, self.dimensions, self.measures)
+
+    def update(self, df):
+        """Fold the incidents in ``df`` into the cube in place."""
+        delta = aggregate_cells(df, self.dimensions, self.measures)
+        self.cells = self.merge(type(self)(delta, self.dimensions, self.measures)).cells
+        return self
+
+    def __len__(self):
+        return len(self.cells)
+
+    @property
+    def total_count(self):
+        return int(self.cells['count'].sum())
+
+    def rollup(self, dims):
+        """Sum the cells over every dimension not in ``dims``."""
+        dims = [dims] if isinstance(dims, str) else list(dims)
+        if not dims:
+            return self.cells.sum().to_frame().T
+        return self.cells.groupby(level=dims, observed=True, sort=True).sum()
+
+    def where(self, selections):
+        """Return the sub-cube whose cells match ``{dimension: allowed values}``."""
+        keep = np.ones(len(self.cells), dtype=bool)
+        for dim, values in selections.items():
+            keep &= self.cells.index.get_level_values(dim).isin(list(values))
+        return type(self)(self.cells[keep], self.dimensions, self.measures)
+
+    def counts(self, index, columns):
+        """Incident counts pivoted as ``index`` x ``columns`` (zero-filled).
+
+        Equivalent to ``df.groupby([index, columns]).size().unstack(fill_value=0)``.
+        """
+        return self.rollup([index, columns])['count'].unstack(fill_value=0)
+
+    def mean(self, dims, measure):
+        rolled = self.rollup(dims)
+        return (rolled[f'{measure}|sum'] / rolled['count']).rename(measure)
+
+    def std(self, dims, measure, ddof=1):
+        """Sample standard deviation from the count / sum / sum-of-squares moments."""
+        rolled = self.rollup(dims)
+        n = rolled['count'].astype(np.float64)
+        total = rolled[f'{measure}|sum']
+        centered = (rolled[f'{measure}|sumsq'] - total * total / n).clip(lower=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var = centered / (n - ddof)
+        return np.sqrt(var.where(n > ddof)).rename(measure)
+
+    def summary(self, dims, spec):
+        """Build a ``groupby(dims).agg(spec)``-shaped table from the cube.
+
+        ``spec`` maps a measure to one statistic or a list of them; the
+        supported statistics are ``count``, ``sum``, ``mean`` and ``std``.
+        List values produce MultiIndex columns like ``DataFrame.agg`` does.
+        """
+        rolled = self.rollup(dims)
+        columns = {}
+        for measure, stats in spec.items():
+            for stat in ([stats] if isinstance(stats, str) else stats):
+                if stat == 'count':
+                    values = rolled['count']
+                elif stat == 'sum':
+                    values = rolled[f'{measure}|sum']
+                elif stat == 'mean':
+                    values = rolled[f'{measure}|sum'] / rolled['count']
+                elif stat == 'std':
+                    values = self.std(dims, measure)
+                else:
+                    raise ValueError(f"Statistic '{stat}' cannot be answered from the cube")
+                columns[(measure, stat)] = values
+        table = pd.DataFrame(columns)
+        if all(isinstance(stats, str) for stats in spec.values()):
+            table.columns = table.columns.get_level_values(0)
+        return table
+
+
+def cube_path_for(version, cache_dir=None):
+    cache_dir = Path(cache_dir) if cache_dir is not None else CUBE_CACHE_DIR
+    return cache_dir / f"{version}.cube.pkl"
+
+
+def load_or_build_cube(df, version, cache_dir=None):
+    """Load the cube saved for dataset ``version`` or build and save it from ``df``."""
+    path = cube_path_for(version, cache_dir)
+    if path.exists():
+        return IncidentCube.load(path)
+    cube = IncidentCube.from_frame(df)
+    cube.save(path)
+    return cube
@@ -0,0 +1,344 @@
+"""Streaming ETL from a raw incident dump to a Year-partitioned dataset.
+
+Replaces the cleaning step of ``ETL_EDA_global_cyberthreats.ipynb`` (load the
+whole raw CSV, ``drop_duplicates``, write a CSV) with three bounded-memory
+passes over the raw file:
+
+1. Stream it in chunks of ``chunksize`` rows with pyarrow's CSV reader
+   (every column as text, so equal rows hash equally in every chunk), hash
+   each row twice (128 bits, straight from the Arrow string buffers) and
+   spill ``(hash, row number)`` records to ``partitions`` temporary files
+   chosen by hash.
+2. Load one spill file at a time and mark every row whose hash was already
+   seen at a lower row number in a duplicate bitmap (one bit per row).
+   Like ``drop_duplicates``, the first occurrence of a row is kept.
+3. Read the raw file again, skip the marked rows, apply the dashboard's
+   ``clean_frame`` coercion (forward fill carried across chunks, numeric
+   coercion, zero fill) and write each chunk's rows to
+   ``Year=<year>/part-<chunk>.arrow`` (hive partitioning, Arrow IPC).
+
+Peak memory is one chunk, one spill file (24 bytes per row in it) and the
+bitmap (one bit per row), whatever the size of the dump. The output holds
+no timestamps, so the same input and chunk size always produce the same
+files; ``_manifest.json`` records the source digest and row counts.
+``load_partitioned`` reads it back, opening only the requested years.
+
+Usage::
+
+    python incident_etl.py raw_incidents.csv artifacts/incidents --csv data/clean_global_cybersecurity_threats.csv
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pcsv
+import pyarrow.dataset as ds
+
+from cyber_data import CATEGORICAL_COLUMNS, NUMERIC_COLUMNS, clean_frame, write_table
+
+DEFAULT_CHUNKSIZE = 100_000
+# The CSV reader reads ahead several blocks, so small blocks keep its buffers small
+READ_BLOCK_BYTES = 1 << 20
+DEFAULT_MEMORY_MB = 256
+PARTITION_COLUMN = 'Year'
+# Seeds of the two independent 64-bit row hashes; rows are duplicates when both agree
+HASH_SEEDS = (0x9E3779B97F4A7C15, 0xD1B54A32D192ED03)
+SPILL_DTYPE = np.dtype([('h1', '<u8'), ('h2', '<u8'), ('row', '<u8')])
+# Measures are stored as float64 so every part file has the same schema whatever a chunk's values parse as
+OUTPUT_SCHEMA = pa.schema([(col, pa.string()) for col in CATEGORICAL_COLUMNS]
+                          + [(col, pa.float64()) for col in NUMERIC_COLUMNS if col != PARTITION_COLUMN])
+PARTITIONING = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.int64())]), flavor='hive')
+
+
+@dataclass
+class EtlReport:
+    source: str
+    source_sha256: str
+    chunksize: int
+    partitions: int
+    rows_read: int = 0
+    duplicates: int = 0
+    rows_written: int = 0
+    years: dict = field(default_factory=dict)
+    seconds: dict = field(default_factory=dict)
+
+    @property
+    def rows_per_second(self):
+        total = sum(self.seconds.values())
+        return self.rows_read / total if total else float('nan')
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def spill_partitions(path, memory_mb=DEFAULT_MEMORY_MB):
+    """Spill files needed to keep each one under ``memory_mb`` (assumes raw rows of at least 24 bytes)."""
+    return max(1, math.ceil(os.path.getsize(path) / (memory_mb * 2**20)))
+
+
+def read_raw(path, chunksize):
+    """Yield record batches of ``chunksize`` rows (the last may be shorter) with every column read as text."""
+    names = pd.read_csv(path, nrows=0).columns
+    convert = pcsv.ConvertOptions(column_types={name: pa.string() for name in names}, strings_can_be_null=True)
+    reader = pcsv.open_csv(path, read_options=pcsv.ReadOptions(block_size=READ_BLOCK_BYTES), convert_options=convert)
+    pending, rows = [], 0
+    for batch in reader:
+        pending.append(batch)
+        rows += batch.num_rows
+        while rows >= chunksize:
+            chunk = pa.Table.from_batches(pending).combine_chunks().to_batches()[0]
+            yield chunk.slice(0, chunksize)
+            pending, rows = [chunk.slice(chunksize)], rows - chunksize
+    if rows:
+        yield pa.Table.from_batches(pending).combine_chunks().to_batches()[0]
+
+
+def _mix(x):
+    """splitmix64 finalizer (uint64 arithmetic wraps around)."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _string_words(array):
+    """Return ``(words, positions, starts, lengths)`` for a string array.
+
+    Each string's bytes are padded to its own 8-byte boundary (not to the
+    longest string's) and read as little-endian ``uint64`` words, stored
+    back to back: string ``i``'s words begin at ``starts[i]`` and
+    ``positions`` is each word's index within its string.
+    """
+    _, offsets, data = array.buffers()
+    offsets = np.frombuffer(offsets, dtype=np.int32, count=len(array) + 1, offset=array.offset * 4)
+    lengths = np.diff(offsets)
+    n_words = (lengths + 7) // 8
+    starts = np.cumsum(n_words) - n_words
+    padded = np.zeros(int(n_words.sum()) * 8, dtype=np.uint8)
+    total = int(offsets[-1] - offsets[0])
+    if total:
+        # Byte k of string i goes to byte starts[i] * 8 + k
+        shift = np.repeat(starts * 8 - (offsets[:-1] - offsets[0]), lengths)
+        padded[shift + np.arange(total)] = np.frombuffer(data, dtype=np.uint8)[offsets[0]:offsets[-1]]
+    positions = np.arange(len(padded) // 8, dtype=np.uint64) - np.repeat(starts, n_words).astype(np.uint64)
+    return padded.view('<u8'), positions, starts, lengths.astype(np.uint64)
+
+
+def _string_hashes(words, positions, starts, seed):
+    """64-bit hash of each string: the sum of its words, each mixed with its position."""
+    hashes = np.zeros(len(starts), dtype=np.uint64)
+    if len(words):
+        mixed = _mix(words ^ _mix(positions + np.uint64(seed)))
+        nonempty = np.flatnonzero(np.diff(np.append(starts, len(words))))
+        hashes[nonempty] = np.add.reduceat(mixed, starts[nonempty])
+    return hashes
+
+
+def row_hashes(batch):
+    """Two independent 64-bit hashes of every row of a record batch of string columns."""
+    columns = []
+    for column in batch.columns:
+        words, positions, starts, lengths = _string_words(column)
+        # Nulls and empty strings both have no bytes; the top bit tells them apart
+        nulls = column.is_null().to_numpy(zero_copy_only=False).astype(np.uint64) << np.uint64(63)
+        columns.append((words, positions, starts, lengths | nulls))
+    hashes = []
+    for seed in HASH_SEEDS:
+        h = np.full(batch.num_rows, seed, dtype=np.uint64)
+        for words, positions, starts, lengths in columns:
+            h = _mix(h ^ lengths)
+            h = _mix(h ^ _string_hashes(words, positions, starts, seed))
+        hashes.append(h)
+    return hashes
+
+
+def spill_hashes(path, chunksize, partitions, spill_dir):
+    """Pass 1: write every row's hashes and number to its spill file; returns the row count."""
+    files = [open(Path(spill_dir) / f"spill-{p:05d}.bin", 'wb') for p in range(partitions)]
+    rows = 0
+    try:
+        for batch in read_raw(path, chunksize):
+            h1, h2 = row_hashes(batch)
+            records = np.empty(batch.num_rows, dtype=SPILL_DTYPE)
+            records['h1'], records['h2'] = h1, h2
+            records['row'] = np.arange(rows, rows + batch.num_rows, dtype=np.uint64)
+            target = (h1 % np.uint64(partitions)).astype(np.intp)
+            order = np.argsort(target, kind='stable')
+            bounds = np.searchsorted(target[order], np.arange(partitions + 1))
+            for p in np.flatnonzero(np.diff(bounds)):
+                records[order[bounds[p]:bounds[p + 1]]].tofile(files[p])
+            rows += batch.num_rows
+    finally:
+        for f in files:
+            f.close()
+    return rows
+
+
+def duplicate_bitmap(n_rows, partitions, spill_dir):
+    """Pass 2: little-endian bitmap of the rows that repeat an earlier row."""
+    bitmap = np.zeros((n_rows + 7) // 8, dtype=np.uint8)
+    for p in range(partitions):
+        records = np.fromfile(Path(spill_dir) / f"spill-{p:05d}.bin", dtype=SPILL_DTYPE)
+        if len(records) < 2:
+            continue
+        records = records[np.lexsort((records['row'], records['h2'], records['h1']))]
+        repeat = np.r_[False, (records['h1'][1:] == records['h1'][:-1]) & (records['h2'][1:] == records['h2'][:-1])]
+        rows = np.sort(records['row'][repeat])
+        if len(rows):
+            byte, bit = rows >> np.uint64(3), (np.uint8(1) << (rows & np.uint64(7)).astype(np.uint8))
+            starts = np.flatnonzero(np.r_[True, byte[1:] != byte[:-1]])
+            bitmap[byte[starts].astype(np.intp)] |= np.bitwise_or.reduceat(bit, starts)
+    return bitmap
+
+
+def duplicate_mask(bitmap, start, stop):
+    """Boolean duplicate flags of rows ``start:stop``."""
+    bits = np.unpackbits(bitmap[start // 8:(stop + 7) // 8], bitorder='little')
+    return bits[start % 8:start % 8 + stop - start].view(bool)
+
+
+def parse_numeric(batch):
+    """Parse the numeric text columns that hold only valid numbers (or nulls) in Arrow.
+
+    Such a column coerces the same before or after the forward fill, so
+    ``clean_frame`` only has to coerce the columns that fail to parse.
+    """
+    columns = []
+    for name, column in zip(batch.schema.names, batch.columns):
+        if name in NUMERIC_COLUMNS:
+            for target in (pa.int64(), pa.float64()):
+                try:
+                    column = column.cast(target)
+                    break
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                    continue
+        columns.append(column)
+    return pa.RecordBatch.from_arrays(columns, names=batch.schema.names)
+
+
+def to_output_table(chunk):
+    return pa.Table.from_pandas(chunk, schema=OUTPUT_SCHEMA, preserve_index=False)
+
+
+def write_partitions(path, chunksize, bitmap, out_dir, csv_path=None):
+    """Pass 3: drop duplicates, clean and write each chunk per year; returns ``{year: rows}``."""
+    years, start, carry, chunk_id = {}, 0, None, 0
+    csv_file = open(csv_path, 'w', newline='') if csv_path is not None else None
+    try:
+        for batch in read_raw(path, chunksize):
+            stop = start + batch.num_rows
+            raw = parse_numeric(batch.filter(pa.array(~duplicate_mask(bitmap, start, stop)))).to_pandas()
+            start = stop
+            chunk = clean_frame(raw, carry)
+            if chunk.empty:
+                continue
+            carry = chunk.iloc[-1]
+            for col in CATEGORICAL_COLUMNS:
+                chunk[col] = chunk[col].astype(str)
+            chunk[PARTITION_COLUMN] = chunk[PARTITION_COLUMN].astype(np.int64)
+            if csv_file is not None:
+                chunk.to_csv(csv_file, header=chunk_id == 0, index=False)
+            for year, rows in chunk.groupby(PARTITION_COLUMN, sort=True):
+                write_table(Path(out_dir) / f"{PARTITION_COLUMN}={year}" / f"part-{chunk_id:05d}.arrow",
+                            to_output_table(rows))
+                years[int(year)] = years.get(int(year), 0) + len(rows)
+            chunk_id += 1
+    finally:
+        if csv_file is not None:
+            csv_file.close()
+    return dict(sorted(years.items()))
+
+
+def _replace_dir(tmp_dir, target):
+    """Move ``tmp_dir`` to ``target``, replacing any earlier output there."""
+    target = Path(target)
+    old = None
+    if target.exists():
+        old = Path(tempfile.mkdtemp(dir=target.parent, prefix=f".{target.name}.old-"))
+        os.replace(target, old / target.name)
+    os.replace(tmp_dir, target)
+    if old is not None:
+        shutil.rmtree(old)
+
+
+def run_etl(source, out_dir, chunksize=DEFAULT_CHUNKSIZE, memory_mb=DEFAULT_MEMORY_MB, csv_path=None):
+    """Deduplicate, clean and partition ``source`` into ``out_dir``; returns an ``EtlReport``."""
+    source, out_dir = Path(source), Path(out_dir)
+    out_dir.parent.mkdir(parents=True, exist_ok=True)
+    report = EtlReport(str(source), file_sha256(source), chunksize, spill_partitions(source, memory_mb))
+    with tempfile.TemporaryDirectory(dir=out_dir.parent, prefix=f".{out_dir.name}.spill-") as spill_dir:
+        start = time.perf_counter()
+        report.rows_read = spill_hashes(source, chunksize, report.partitions, spill_dir)
+        report.seconds['hash'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        bitmap = duplicate_bitmap(report.rows_read, report.partitions, spill_dir)
+        report.duplicates = int(np.unpackbits(bitmap).sum())
+        report.seconds['dedup'] = time.perf_counter() - start
+
+    tmp_dir = Path(tempfile.mkdtemp(dir=out_dir.parent, prefix=f".{out_dir.name}.tmp-"))
+    tmp_csv = None
+    try:
+        start = time.perf_counter()
+        if csv_path is not None:
+            fd, tmp_csv = tempfile.mkstemp(dir=Path(csv_path).parent, suffix=".tmp")
+            os.close(fd)
+        report.years = write_partitions(source, chunksize, bitmap, tmp_dir, tmp_csv)
+        report.rows_written = sum(report.years.values())
+        report.seconds['write'] = time.perf_counter() - start
+        manifest = {k: v for k, v in asdict(report).items() if k != 'seconds'}
+        manifest['schema'] = [f"{f.name}: {f.type}" for f in OUTPUT_SCHEMA]
+        (tmp_dir / "_manifest.json").write_text(json.dumps(manifest, indent=2))
+        if tmp_csv is not None:
+            os.replace(tmp_csv, csv_path)
+        _replace_dir(tmp_dir, out_dir)
+    finally:
+        if tmp_csv is not None and os.path.exists(tmp_csv):
+            os.remove(tmp_csv)
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+    return report
+
+
+def load_partitioned(path, years=None, columns=None):
+    """Read a partitioned ETL output as a frame, opening only the files of ``years`` (default: all)."""
+    dataset = ds.dataset(path, format='ipc', partitioning=PARTITIONING, exclude_invalid_files=True)
+    flt = ds.field(PARTITION_COLUMN).isin([int(y) for y in years]) if years is not None else None
+    return dataset.to_table(columns=columns, filter=flt).to_pandas()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Deduplicate, clean and partition a raw incident CSV by Year.")
+    parser.add_argument("source", help="raw incident CSV")
+    parser.add_argument("out_dir", help="output directory (replaced atomically)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows per chunk")
+    parser.add_argument("--memory-mb", type=float, default=DEFAULT_MEMORY_MB,
+                        help="target size of each deduplication spill file")
+    parser.add_argument("--csv", default=None, help="also write the cleaned rows to this CSV, in source order")
+    args = parser.parse_args(argv)
+
+    report = run_etl(args.source, args.out_dir, args.chunksize, args.memory_mb, args.csv)
+    for stage, seconds in report.seconds.items():
+        print(f"{stage:>6}: {seconds:6.2f}s ({report.rows_read / seconds if seconds else float('nan'):,.0f} rows/s)")
+    print(f"Read {report.rows_read:,} rows, dropped {report.duplicates:,} duplicates, wrote "
+          f"{report.rows_written:,} rows in {len(report.years)} year partitions "
+          f"({report.rows_per_second:,.0f} rows/s overall)")
+
+
+if __name__ == "__main__":
+    main()
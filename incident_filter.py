@@ -0,0 +1,160 @@
+"""Global dashboard filters answered from packed bitmap indexes.
+
+``BitmapIndex`` keeps, for every value of the filterable columns (Country,
+Year, Target Industry and Attack Source), a packed bitmap of the incident
+rows holding it: one bit per row in little-endian ``uint64`` words, built
+once per dataset from the ``*_encoded`` columns. A filter combination is
+answered by OR-ing the bitmaps of the selected values of each column and
+AND-ing the columns together, which touches ``n_rows / 8`` bytes per bitmap
+instead of scanning and comparing the frame.
+
+``FilterEngine`` turns a ``FilterState`` into ``FilteredAggregates``: the
+row bitmap, the matching incident count and the dataset's partitioned
+aggregate (cube cells plus median and distinct-count sketches) restricted to
+the selection. Every filter column is a dimension of the cube and of the
+sketches, so this costs a pass over their cells, never over the rows.
+Results and row masks are kept in a ``SharedStore`` keyed by the engine and
+the filter state: the dashboard passes the process-wide store, so they
+share its memory budget; otherwise the engine keeps its own bounded LRU.
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from shared_store import SharedStore
+
+FILTER_COLUMNS = ['Country', 'Year', 'Target Industry', 'Attack Source']
+DEFAULT_CACHE_ENTRIES = 32
+
+
+@dataclass(frozen=True)
+class FilterState:
+    """Selected values per filter column; an empty selection means no filter on that column."""
+    countries: Tuple[str, ...] = ()
+    years: Optional[Tuple[int, int]] = None
+    industries: Tuple[str, ...] = ()
+    sources: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_selection(cls, countries=(), years=None, industries=(), sources=()):
+        """Build a canonical (sorted, hashable) state from widget values."""
+        return cls(tuple(sorted(countries)), tuple(int(y) for y in years) if years is not None else None,
+                   tuple(sorted(industries)), tuple(sorted(sources)))
+
+
+def popcount(words):
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(words).sum(dtype=np.int64))
+    return int(np.unpackbits(words.view(np.uint8)).sum(dtype=np.int64))
+
+
+class BitmapIndex:
+    """Per-value packed row bitmaps over the filter columns."""
+
+    def __init__(self, n_rows, bitmaps):
+        self.n_rows = n_rows
+        self.n_words = (n_rows + 63) // 64
+        self.bitmaps = bitmaps
+
+    @classmethod
+    def from_frame(cls, df, label_encoders, columns=FILTER_COLUMNS):
+        n_words = (len(df) + 63) // 64
+        bitmaps = {}
+        for col in columns:
+            if col + '_encoded' in df.columns:
+                codes = df[col + '_encoded'].to_numpy()
+                values = label_encoders[col].classes_
+            else:
+                codes, values = pd.factorize(df[col], sort=True)
+            bitmaps[col] = {}
+            for code, value in enumerate(values):
+                packed = np.zeros(n_words * 8, dtype=np.uint8)
+                bits = np.packbits(codes == code, bitorder='little')
+                packed[:len(bits)] = bits
+                bitmaps[col][value.item() if hasattr(value, 'item') else value] = packed.view('<u8')
+        return cls(len(df), bitmaps)
+
+    def values(self, column):
+        return list(self.bitmaps[column])
+
+    def union(self, column, values):
+        """Bitmap of the rows whose ``column`` holds any of ``values``."""
+        result = np.zeros(self.n_words, dtype=np.uint64)
+        for value in values:
+            bitmap = self.bitmaps[column].get(value)
+            if bitmap is not None:
+                result |= bitmap
+        return result
+
+    def select(self, selections):
+        """Intersect the per-column unions of ``{column: values}``; ``None`` means every row."""
+        result = None
+        for column, values in selections.items():
+            union = self.union(column, values)
+            if result is None:
+                result = union
+            else:
+                result &= union
+        return result
+
+    def to_mask(self, words):
+        """Unpack a bitmap into a boolean row mask."""
+        return np.unpackbits(words.view(np.uint8), count=self.n_rows, bitorder='little').view(bool)
+
+
+@dataclass
+class FilteredAggregates:
+    state: FilterState
+    bitmap: Optional[np.ndarray]
+    n_rows: int
+    # PartialAggregate restricted to the selection, and its cube
+    aggregate: object
+
+    @property
+    def cube(self):
+        return self.aggregate.cube
+
+
+class FilterEngine:
+    """Answers filter states for one dataset version from its bitmap index and partitioned aggregate."""
+
+    def __init__(self, df, label_encoders, aggregate, max_entries=DEFAULT_CACHE_ENTRIES, store=None):
+        self.aggregate = aggregate
+        self.index = BitmapIndex.from_frame(df, label_encoders)
+        self.store = store if store is not None else SharedStore(max_entries=max_entries)
+
+    def selections(self, state):
+        """Translate ``state`` into ``{column: values}``, dropping columns that keep every row."""
+        selections = {}
+        if state.countries:
+            selections['Country'] = state.countries
+        if state.years is not None:
+            years = [y for y in self.index.values('Year') if state.years[0] <= y <= state.years[1]]
+            if len(years) < len(self.index.values('Year')):
+                selections['Year'] = years
+        if state.industries:
+            selections['Target Industry'] = state.industries
+        if state.sources:
+            selections['Attack Source'] = state.sources
+        return selections
+
+    def mask(self, state):
+        """Boolean row mask for ``state``, or ``None`` when it selects every row."""
+        bitmap = self.aggregates(state).bitmap
+        if bitmap is None:
+            return None
+        return self.store.get(('filter_mask', self, state), lambda: self.index.to_mask(bitmap))
+
+    def aggregates(self, state):
+        """Return the (cached) ``FilteredAggregates`` for ``state``."""
+        return self.store.get(('filtered_aggregates', self, state), lambda: self._compute(state))
+
+    def _compute(self, state):
+        selections = self.selections(state)
+        bitmap = self.index.select(selections)
+        if bitmap is None:
+            return FilteredAggregates(state, None, self.index.n_rows, self.aggregate)
+        return FilteredAggregates(state, bitmap, popcount(bitmap), self.aggregate.where(selections))
@@ -0,0 +1,147 @@
+"""Chunked streaming ingestion for incident files larger than memory.
+
+The source CSV is read in bounded-size chunks. Each chunk gets the same
+``ffill`` / ``to_numeric`` / ``fillna`` cleaning as the in-memory pipeline
+(with the forward fill carried across chunk boundaries), its categorical
+columns are encoded against category dictionaries that grow as new labels
+appear, and its rows are folded into an ``IncidentCube``. Only one chunk, the
+dictionaries and the cube cells are held at a time, so peak memory depends on
+the chunk size and the number of distinct keys, not on the file size.
+
+Usage::
+
+    python incident_stream.py incidents.csv --chunksize 250000
+"""
+
+import argparse
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from cyber_data import CATEGORICAL_COLUMNS, DATA_PATH, clean_frame, encoder_from_classes
+from incident_cube import IncidentCube
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+class CategoryDictionary:
+    """Label -> code table that grows in order of first appearance.
+
+    Codes are never reassigned, so rows encoded earlier stay valid as the
+    dictionary grows.
+    """
+
+    def __init__(self, labels=()):
+        self.labels = []
+        self._index = pd.Index([], dtype=object)
+        self.extend(labels)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def extend(self, values):
+        """Add the labels of ``values`` not seen before; return the new ones."""
+        uniques = pd.unique(pd.Series(values, dtype=object))
+        new = [label for label in uniques if label not in self._index]
+        if new:
+            self.labels.extend(new)
+            self._index = pd.Index(self.labels, dtype=object)
+        return new
+
+    def encode(self, values):
+        """Encode ``values``, first adding any unseen labels."""
+        values = pd.Series(values, dtype=object)
+        self.extend(values)
+        return self._index.get_indexer(values).astype(np.int32)
+
+    def to_label_encoder(self):
+        return encoder_from_classes(self.labels)
+
+
+@dataclass
+class StreamResult:
+    """Aggregates and dictionaries built by ``ingest``."""
+
+    cube: IncidentCube
+    dictionaries: dict
+    rows: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    label_encoders: dict = field(init=False)
+
+    def __post_init__(self):
+        self.label_encoders = {col: d.to_label_encoder() for col, d in self.dictionaries.items()}
+
+
+def stream_incidents(path=DATA_PATH, chunksize=DEFAULT_CHUNKSIZE, dictionaries=None):
+    """Yield cleaned, encoded chunks of the incident file at ``path``.
+
+    ``dictionaries`` maps each categorical column to a ``CategoryDictionary``
+    and is updated in place, so callers can pass in existing dictionaries to
+    keep codes consistent with earlier loads.
+    """
+    if dictionaries is None:
+        dictionaries = {}
+    carry = None
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        chunk = clean_frame(chunk, carry)
+        if chunk.empty:
+            continue
+        carry = chunk.iloc[-1]
+        for col in CATEGORICAL_COLUMNS:
+            if col in chunk.columns:
+                chunk[col] = chunk[col].astype(str)
+                dictionary = dictionaries.setdefault(col, CategoryDictionary())
+                chunk[col + '_encoded'] = dictionary.encode(chunk[col])
+        yield chunk
+
+
+def ingest(path=DATA_PATH, chunksize=DEFAULT_CHUNKSIZE, dictionaries=None):
+    """Stream ``path`` into an ``IncidentCube`` and category dictionaries."""
+    if dictionaries is None:
+        dictionaries = {}
+    start = time.perf_counter()
+    cube, rows, chunks = None, 0, 0
+    for chunk in stream_incidents(path, chunksize, dictionaries):
+        if cube is None:
+            cube = IncidentCube.from_frame(chunk)
+        else:
+            cube.update(chunk)
+        rows += len(chunk)
+        chunks += 1
+    if cube is None:
+        raise ValueError(f"No incidents found in {path}")
+    return StreamResult(cube, dictionaries, rows, chunks, time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream an incident CSV into the dashboard aggregates.")
+    parser.add_argument("path", nargs="?", default=str(DATA_PATH), help="incident CSV to ingest")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows per chunk")
+    args = parser.parse_args(argv)
+
+    result = ingest(args.path, args.chunksize)
+    cube = result.cube
+    pd.set_option('display.width', 200)
+    print(f"Ingested {result.rows:,} rows in {result.chunks} chunks "
+          f"({result.seconds:.2f}s, {len(cube):,} cube cells)")
+    print("\nYearly statistics:")
+    print(cube.summary('Year', {
+        'Financial Loss (in Million $)': ['mean', 'std'],
+        'Number of Affected Users': ['mean'],
+        'Incident Resolution Time (in Hours)': ['mean']
+    }).round(2))
+    print("\nAttack evolution:")
+    print(cube.counts('Year', 'Attack Type'))
+    print("\nIndustry targeting:")
+    print(cube.summary('Target Industry', {
+        'Financial Loss (in Million $)': 'mean',
+        'Number of Affected Users': 'mean',
+        'Incident Resolution Time (in Hours)': 'mean'
+    }).round(2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""Concurrent-session load test of the dashboard under a local Streamlit server.
+
+Starts ``cyber_dashboard_final.py`` with ``serve_dashboard.py`` (or targets a
+running server with ``--url``) and, for each concurrency level, opens that
+many sessions over Streamlit's websocket protocol. Each session behaves like
+an analyst in a browser:
+
+- ``load``: the first full run of the page;
+- ``filter``: a full rerun after picking countries and a year range in the
+  sidebar filters (every other time the filters are cleared again);
+- ``predict``: submitting the prediction form with a random country and
+  year, which reruns only the form's fragment.
+
+A rerun's latency runs from sending the widget states to the server's
+``script_finished`` message. Per level the tool reports p50/p95/p99 latency
+per action and overall, throughput (reruns per second across all sessions)
+and the peak resident memory of every server process, sampled while the level
+runs. A warm-up session runs first so the first level is not charged for the
+server's cold start.
+
+Results are appended as JSON lines, and ``--compare`` fails the run when a
+level's p95 got slower than in a previous results file by more than
+``--tolerance``. The load generator shares the machine with the server, so
+for sizing replicas run it from another host with ``--url`` (memory is then
+only sampled for a local ``--pid``).
+
+Usage::
+
+    python load_test.py --concurrency 1,2,4,8 --iterations 5
+    python load_test.py --concurrency 4 --compare loadtest_results.jsonl --tolerance 0.25
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+import uuid
+from pathlib import Path
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from websockets.asyncio.client import connect
+
+from benchmark_pipeline import git_revision
+
+SERVE_SCRIPT = Path(__file__).resolve().parent / "serve_dashboard.py"
+DEFAULT_LEVELS = [1, 2, 4, 8]
+ACTIONS = ['load', 'filter', 'predict']
+PREDICT_FORM = 'prediction_form'
+FINISHED_OK = {ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY}
+
+
+class DashboardSession:
+    """One simulated browser session: its websocket, the widgets it has seen and their current values."""
+
+    def __init__(self, websocket, timeout):
+        self.websocket = websocket
+        self.timeout = timeout
+        # (form id, element type, label) -> (widget proto, fragment id)
+        self.widgets = {}
+        self.states = {}
+
+    def widget(self, kind, label, form=''):
+        return self.widgets[(form, kind, label)]
+
+    def set_state(self, widget, **value):
+        state = WidgetState(id=widget.id, **{k: v for k, v in value.items() if not k.endswith('_array_value')})
+        for name, data in value.items():
+            if name.endswith('_array_value'):
+                getattr(state, name).data.extend(data)
+        self.states[widget.id] = state
+
+    async def rerun(self, trigger=None, fragment_id=''):
+        """Send a rerun with the current widget states (plus ``trigger``); returns its latency in seconds."""
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        msg.rerun_script.widget_states.widgets.extend(self.states.values())
+        if trigger is not None:
+            msg.rerun_script.widget_states.widgets.append(WidgetState(id=trigger.id, trigger_value=True))
+        if fragment_id:
+            msg.rerun_script.fragment_id = fragment_id
+        start = time.perf_counter()
+        await self.websocket.send(msg.SerializeToString())
+        return await asyncio.wait_for(self._until_finished(start), self.timeout)
+
+    async def _until_finished(self, start):
+        errors = []
+        while True:
+            msg = ForwardMsg()
+            msg.ParseFromString(await self.websocket.recv())
+            kind = msg.WhichOneof('type')
+            if kind == 'delta' and msg.delta.WhichOneof('type') == 'new_element':
+                element = msg.delta.new_element
+                element_type = element.WhichOneof('type')
+                if element_type == 'exception':
+                    errors.append(element.exception.message)
+                    continue
+                proto = getattr(element, element_type)
+                if getattr(proto, 'id', ''):
+                    key = (getattr(proto, 'form_id', ''), element_type, getattr(proto, 'label', ''))
+                    self.widgets[key] = (proto, msg.delta.fragment_id)
+            elif kind == 'script_finished':
+                elapsed = time.perf_counter() - start
+                if msg.script_finished not in FINISHED_OK:
+                    errors.append(ForwardMsg.ScriptFinishedStatus.Name(msg.script_finished))
+                if errors:
+                    raise RuntimeError("; ".join(errors))
+                return elapsed
+
+
+async def run_session(url, iterations, rng, timings, timeout):
+    """Load the page, then alternate filter changes and prediction form submits."""
+    async with connect(url, subprotocols=['streamlit'], max_size=None) as websocket:
+        session = DashboardSession(websocket, timeout)
+        timings['load'].append(await session.rerun())
+        for i in range(iterations):
+            countries, _ = session.widget('multiselect', 'Country')
+            years, _ = session.widget('slider', 'Year range')
+            if i % 2 == 0:
+                picked = rng.sample(list(countries.options), rng.randint(1, 3))
+                low = rng.randint(int(years.min), int(years.max))
+                span = [low, rng.randint(low, int(years.max))]
+            else:
+                picked, span = [], [years.min, years.max]
+            session.set_state(countries, string_array_value=picked)
+            session.set_state(years, double_array_value=span)
+            timings['filter'].append(await session.rerun())
+
+            country, _ = session.widget('selectbox', 'Country', PREDICT_FORM)
+            year, _ = session.widget('slider', 'Year', PREDICT_FORM)
+            submit, fragment_id = session.widget('button', '🔮 Predict Outcome', PREDICT_FORM)
+            session.set_state(country, string_value=rng.choice(list(country.options)))
+            session.set_state(year, double_array_value=[rng.randint(int(year.min), int(year.max))])
+            timings['predict'].append(await session.rerun(trigger=submit, fragment_id=fragment_id))
+
+
+def process_rss(pid):
+    """``{pid: resident bytes}`` of ``pid`` and its descendants (Linux ``/proc``; ``ps`` elsewhere)."""
+    if os.path.isdir('/proc'):
+        parents = {}
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                try:
+                    with open(f'/proc/{entry}/stat') as f:
+                        parents[int(entry)] = int(f.read().rsplit(')', 1)[1].split()[1])
+                except (OSError, IndexError, ValueError):
+                    continue
+        tree, frontier = [], [pid]
+        while frontier:
+            current = frontier.pop()
+            tree.append(current)
+            frontier.extend(child for child, parent in parents.items() if parent == current)
+        rss = {}
+        for member in tree:
+            try:
+                with open(f'/proc/{member}/status') as f:
+                    for line in f:
+                        if line.startswith('VmRSS:'):
+                            rss[member] = int(line.split()[1]) * 1024
+            except OSError:
+                continue
+        return rss
+    try:
+        out = subprocess.run(['ps', '-o', 'rss=', '-p', str(pid)], capture_output=True, text=True, check=True).stdout
+        return {pid: int(out.strip()) * 1024}
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return {}
+
+
+async def sample_memory(pid, peaks, interval=0.25):
+    """Track each process's peak RSS in ``peaks`` until cancelled."""
+    while True:
+        for member, rss in process_rss(pid).items():
+            peaks[member] = max(peaks.get(member, 0), rss)
+        await asyncio.sleep(interval)
+
+
+def percentiles(values):
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': round(float(p50), 4), 'p95': round(float(p95), 4), 'p99': round(float(p99), 4)}
+
+
+async def run_level(url, concurrency, iterations, pid=None, seed=0, timeout=120.0):
+    """Run ``concurrency`` sessions at once; returns the level's latency, throughput and memory record."""
+    timings = {action: [] for action in ACTIONS}
+    peaks = {}
+    sampler = asyncio.create_task(sample_memory(pid, peaks)) if pid else None
+    start = time.perf_counter()
+    results = await asyncio.gather(*(run_session(url, iterations, random.Random(seed + i), timings, timeout)
+                                     for i in range(concurrency)), return_exceptions=True)
+    wall = time.perf_counter() - start
+    if sampler is not None:
+        sampler.cancel()
+        for member, rss in process_rss(pid).items():
+            peaks[member] = max(peaks.get(member, 0), rss)
+    errors = [f"{type(r).__name__}: {r}" for r in results if isinstance(r, BaseException)]
+    latencies = [t for action in ACTIONS for t in timings[action]]
+    return {
+        'concurrency': concurrency,
+        'iterations': iterations,
+        'reruns': len(latencies),
+        'errors': len(errors),
+        'error_samples': errors[:3],
+        'wall_s': round(wall, 3),
+        'throughput_rps': round(len(latencies) / wall, 3) if wall else None,
+        **percentiles(latencies),
+        'actions': {action: {'count': len(timings[action]), **percentiles(timings[action])} for action in ACTIONS},
+        'server_rss_peak_mb': {str(member): round(rss / 2**20, 1) for member, rss in sorted(peaks.items())},
+        'server_rss_peak_total_mb': round(sum(peaks.values()) / 2**20, 1) if peaks else None,
+    }
+
+
+def start_server(port, startup_timeout=120.0):
+    """Launch the dashboard on ``port`` and wait for its health check; returns the ``Popen``."""
+    server = subprocess.Popen(
+        [sys.executable, str(SERVE_SCRIPT), '--server.port', str(port), '--server.address', '127.0.0.1',
+         '--server.headless', 'true', '--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Dashboard server exited with code {server.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=2) as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"Dashboard server did not become healthy within {startup_timeout:.0f}s")
+
+
+def load_baseline(path, exclude_run=None):
+    """Map concurrency level to p95 latency from a results file, skipping run ``exclude_run``."""
+    baseline = {}
+    if not Path(path).exists():
+        print(f"No baseline at {path} yet; nothing to compare against")
+        return baseline
+    for line in Path(path).read_text().splitlines():
+        if line.strip():
+            record = json.loads(line)
+            if record.get('run_id') == exclude_run:
+                continue
+            # The latest record for each level wins
+            baseline[record['concurrency']] = record['p95']
+    return baseline
+
+
+def compare(records, baseline, tolerance):
+    """Return the levels whose p95 latency regressed against ``baseline`` (see ``load_baseline``)."""
+    regressions = []
+    for record in records:
+        previous = baseline.get(record['concurrency'])
+        if previous and record['p95'] and record['p95'] > previous * (1 + tolerance) and record['p95'] - previous > 0.01:
+            regressions.append((record['concurrency'], previous, record['p95']))
+    return regressions
+
+
+def format_level(record):
+    actions = "  ".join(f"{action} p95 {stats['p95'] or 0:6.3f}s" for action, stats in record['actions'].items())
+    memory = f"{record['server_rss_peak_total_mb']:8.1f} MB" if record['server_rss_peak_total_mb'] else "       - MB"
+    return (f"  {record['concurrency']:>4} sessions  {record['reruns']:>5} reruns  "
+            f"p50 {record['p50'] or 0:6.3f}s  p95 {record['p95'] or 0:6.3f}s  p99 {record['p99'] or 0:6.3f}s  "
+            f"{record['throughput_rps']:7.2f} reruns/s  peak RSS {memory}  errors {record['errors']}\n      {actions}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the dashboard with concurrent Streamlit sessions.")
+    parser.add_argument("--concurrency", default=",".join(map(str, DEFAULT_LEVELS)),
+                        help="comma-separated numbers of concurrent sessions")
+    parser.add_argument("--iterations", type=int, default=5, help="filter + predict rounds per session")
+    parser.add_argument("--port", type=int, default=8599, help="port for the local server")
+    parser.add_argument("--url", default=None, help="websocket URL of a running server (.../_stcore/stream)")
+    parser.add_argument("--pid", type=int, default=None, help="server process to sample memory of with --url")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds allowed per rerun")
+    parser.add_argument("--output", default="loadtest_results.jsonl", help="JSON lines file to append results to")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--compare", default=None, help="previous results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown for --compare")
+    args = parser.parse_args(argv)
+
+    run = {
+        'run_id': uuid.uuid4().hex[:12],
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_rev': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+    # Read the baseline before this run appends to --output, which may be the same file
+    baseline = load_baseline(args.compare, exclude_run=run['run_id']) if args.compare else None
+    server, pid, url = None, args.pid, args.url
+    if url is None:
+        print(f"Starting the dashboard on port {args.port}...", flush=True)
+        server = start_server(args.port)
+        pid, url = server.pid, f"ws://127.0.0.1:{args.port}/_stcore/stream"
+    records = []
+    try:
+        warmup = asyncio.run(run_level(url, 1, 1, pid, args.seed, args.timeout))
+        print(f"Warm-up: load {warmup['actions']['load']['p50'] or 0:.3f}s, errors {warmup['errors']}", flush=True)
+        for level in (int(c) for c in args.concurrency.split(',')):
+            record = {**run, **asyncio.run(run_level(url, level, args.iterations, pid, args.seed, args.timeout))}
+            print(format_level(record), flush=True)
+            records.append(record)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    with open(args.output, 'a') as out:
+        for record in records:
+            out.write(json.dumps(record) + '\n')
+    print(f"Wrote {len(records)} results to {args.output}")
+
+    failed = sum(record['errors'] for record in records)
+    for record in records:
+        for sample in record['error_samples']:
+            print(f"ERROR ({record['concurrency']} sessions): {sample}")
+    if baseline is not None:
+        regressions = compare(records, baseline, args.tolerance)
+        for concurrency, before, after in regressions:
+            print(f"REGRESSION {concurrency} sessions: p95 {before:.3f}s -> {after:.3f}s")
+        if regressions:
+            sys.exit(1)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Persistent on-disk cache for the dashboard's trained models.
+
+Streamlit reruns ``cyber_dashboard_final.py`` on every interaction, so the
+forests are stored under ``artifacts/models`` keyed by a hash of the training
+data, the feature list and the estimator hyperparameters. A rerun only loads
+the pickled model; a retrain happens only when that key changes.
+
+The training-data hash of every dataset version is recorded in
+``data_index.json``, so callers that know the version look it up instead
+of hashing the whole training set, and ``incident_append`` derives the next
+version's hash from the previous one and the appended rows.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import joblib
+import pandas as pd
+import sklearn
+
+ARTIFACT_DIR = Path(os.environ.get(
+    "CYBER_ARTIFACT_DIR", Path(__file__).resolve().parent / "artifacts"
+))
+
+
+def frame_fingerprint(*frames):
+    """Return a stable SHA-256 hex digest of one or more DataFrames/Series."""
+    digest = hashlib.sha256()
+    for frame in frames:
+        if isinstance(frame, pd.Series):
+            frame = frame.to_frame()
+        digest.update(json.dumps([str(c) for c in frame.columns]).encode())
+        row_hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+        digest.update(row_hashes.tobytes())
+    return digest.hexdigest()
+
+
+# Parameters that change how a model is fitted but not the fitted result
+EXECUTION_PARAMS = ("n_jobs", "verbose")
+# Hyperparameters published by model_tuning.py, read by every trainer
+PARAMS_FILE = "tuned_params.json"
+# dataset version -> model name -> training rows and data hash
+DATA_INDEX_FILE = "data_index.json"
+
+
+def model_key(name, data_hash, feature_columns, estimator):
+    """Build the cache key for ``estimator`` trained on ``data_hash``."""
+    params = {k: v for k, v in estimator.get_params().items() if k not in EXECUTION_PARAMS}
+    payload = {
+        "name": name,
+        "data": data_hash,
+        "features": [str(c) for c in feature_columns],
+        "estimator": type(estimator).__name__,
+        "params": params,
+        "sklearn": sklearn.__version__,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return f"{name}-{hashlib.sha256(encoded).hexdigest()[:20]}"
+
+
+class ModelStore:
+    """Load-or-train cache for fitted scikit-learn estimators.
+
+    Fitted models are kept in memory once loaded and persisted with joblib
+    under ``root``. Writes go through a temporary file and ``os.replace`` so
+    concurrent Streamlit workers never read a half-written artifact.
+    """
+
+    def __init__(self, root=None):
+        self.root = Path(root) if root is not None else ARTIFACT_DIR / "models"
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, key):
+        return self.root / f"{key}.joblib"
+
+    def load(self, key):
+        """Return the model stored under ``key`` or ``None`` if absent."""
+        with self._lock:
+            if key in self._loaded:
+                return self._loaded[key]
+            path = self.path_for(key)
+            if not path.exists():
+                return None
+            model = joblib.load(path)
+            self._loaded[key] = model
+            return model
+
+    def save(self, key, model):
+        """Persist ``model`` under ``key`` atomically."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        os.close(fd)
+        try:
+            joblib.dump(model, tmp_path)
+            os.replace(tmp_path, self.path_for(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        with self._lock:
+            self._loaded[key] = model
+
+    def load_params(self):
+        """Return the published ``{name: hyperparameters}``, or ``{}`` when none were published."""
+        path = self.root / PARAMS_FILE
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text())["params"]
+
+    def _write_json(self, filename, payload):
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(payload, f, indent=2, default=str)
+            os.replace(tmp_path, self.root / filename)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def publish_params(self, params, **details):
+        """Atomically publish ``{name: hyperparameters}`` (plus ``details``) for later training."""
+        self._write_json(PARAMS_FILE, {"params": params, **details})
+
+    def data_entry(self, version, name):
+        """Return the recorded ``{"rows", "hash"}`` of ``name``'s training data for ``version``, or ``None``."""
+        path = self.root / DATA_INDEX_FILE
+        if not path.exists():
+            return None
+        return json.loads(path.read_text()).get(version, {}).get(name)
+
+    def record_data(self, version, name, rows, data_hash):
+        """Record the training rows and data hash of ``name`` for dataset ``version``."""
+        with self._lock:
+            path = self.root / DATA_INDEX_FILE
+            index = json.loads(path.read_text()) if path.exists() else {}
+            index.setdefault(version, {})[name] = {"rows": rows, "hash": data_hash}
+            self._write_json(DATA_INDEX_FILE, index)
+
+    def data_hash(self, version, name, X, y):
+        """Training-data hash of ``name`` for ``version``, hashing ``X``/``y`` only the first time."""
+        entry = self.data_entry(version, name)
+        # The row count guards against a version name reused for different data
+        if entry is not None and entry["rows"] == len(X):
+            return entry["hash"]
+        data_hash = frame_fingerprint(X, y)
+        try:
+            self.record_data(version, name, len(X), data_hash)
+        except OSError:
+            pass  # read-only deployments hash again on the next start
+        return data_hash
+
+    def key_for(self, name, estimator, X, y, version=None):
+        """Cache key of ``estimator`` on ``X``/``y``; pass the dataset ``version`` to use the data index."""
+        data_hash = frame_fingerprint(X, y) if version is None else self.data_hash(version, name, X, y)
+        return model_key(name, data_hash, X.columns, estimator)
+
+    def get_or_train(self, name, estimator, X, y):
+        """Return a fitted copy of ``estimator``, training it only on a cache miss."""
+        key = self.key_for(name, estimator, X, y)
+        model = self.load(key)
+        if model is None:
+            model = estimator.fit(X, y)
+            self.save(key, model)
+        return model
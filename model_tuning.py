@@ -0,0 +1,311 @@
+"""Cross-validated tuning of the dashboard forests with successive halving.
+
+The dashboard reports accuracy, F1, R², MAE and RMSE from one 80/20 split
+with ``n_estimators=100``. This tool tunes ``n_estimators`` and
+``max_depth`` for all three targets on the training rows only (the test rows
+stay held out for the dashboard's metrics):
+
+- Every candidate configuration is scored by k-fold cross-validation. The
+  fits of all targets, candidates and folds of a round run in parallel
+  across a process pool (one single-threaded forest per task).
+- Successive halving keeps the search cheap: the first round scores every
+  candidate on a small sample of each fold's training rows, then only the
+  best ``1/factor`` of the candidates go on to a ``factor`` times larger
+  sample, until the last round scores the survivors on all rows.
+- Fold results are cached under ``artifacts/tuning`` keyed by the dataset
+  version, so re-running (or widening the grid) only fits what is new.
+
+The winner per target (best weighted F1 for the classifiers, lowest RMSE
+for the regressor) replaces the default configuration only if its CV score
+on all rows beats the default's. The result is published to the
+``ModelStore``; ``train_models``
+and ``load_flat_models`` train with it from then on, and the tuned models
+and their flat exports are built right away. Restart the dashboard server
+to pick them up.
+
+Usage::
+
+    python model_tuning.py --folds 5 --workers 4
+    python model_tuning.py --n-estimators 50,100,200 --max-depth none,10,20 --dry-run
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+import sklearn
+from sklearn.metrics import (accuracy_score, mean_absolute_error, precision_recall_fscore_support,
+                             r2_score)
+
+from cyber_data import DATA_PATH, FEATURE_COLUMNS, dataset_version, load_dataset
+from cyber_models import (DEFAULT_PARAMS, MODEL_SPECS, SPLIT_SEED, load_flat_models, make_estimator,
+                          split_dataset, train_models)
+from model_store import ARTIFACT_DIR, ModelStore
+
+TUNING_DIR = ARTIFACT_DIR / "tuning"
+DEFAULT_N_ESTIMATORS = (50, 100, 200, 400)
+DEFAULT_MAX_DEPTH = (None, 8, 16, 32)
+DEFAULT_FOLDS = 5
+HALVING_FACTOR = 3
+# Smallest per-fold training sample the first round is allowed to use
+MIN_SAMPLES = 100
+# kind -> (metric the winner is chosen on, higher is better)
+SELECTION_METRIC = {'classifier': ('f1', True), 'regressor': ('rmse', False)}
+
+
+def candidate_grid(n_estimators=DEFAULT_N_ESTIMATORS, max_depth=DEFAULT_MAX_DEPTH):
+    """Return every ``{'n_estimators', 'max_depth'}`` combination."""
+    return [{'n_estimators': n, 'max_depth': d} for n, d in itertools.product(n_estimators, max_depth)]
+
+
+def fold_assignment(n_rows, folds, seed=SPLIT_SEED):
+    """Return ``(order, fold_of)``: a fixed row permutation and each row's fold.
+
+    Rounds take the first rows of ``order`` outside the validation fold, so
+    every round's sample contains the previous round's.
+    """
+    order = np.random.default_rng(seed).permutation(n_rows)
+    fold_of = np.empty(n_rows, dtype=np.int64)
+    fold_of[order] = np.arange(n_rows) % folds
+    return order, fold_of
+
+
+def halving_schedule(n_train, n_candidates, factor=HALVING_FACTOR, min_samples=MIN_SAMPLES):
+    """Per-round training sample sizes, ending with all ``n_train`` rows."""
+    rounds = max(1, math.ceil(math.log(max(n_candidates, 1)) / math.log(factor)))
+    # Drop the earliest rounds rather than go below ``min_samples``
+    while rounds > 1 and n_train // factor ** (rounds - 1) < min_samples:
+        rounds -= 1
+    return [n_train // factor ** (rounds - 1 - r) for r in range(rounds)]
+
+
+def score(kind, y_true, y_pred):
+    """Metrics the dashboard reports for a target of ``kind``."""
+    if kind == 'classifier':
+        _, _, f1, _ = precision_recall_fscore_support(y_true, y_pred, average='weighted', zero_division=0)
+        return {'accuracy': accuracy_score(y_true, y_pred), 'f1': f1}
+    return {'r2': r2_score(y_true, y_pred), 'mae': mean_absolute_error(y_true, y_pred),
+            'rmse': float(np.sqrt(np.mean((y_true - y_pred) ** 2)))}
+
+
+# Training data of the current tuning run, set in each worker by ``_init_worker``
+_DATA = {}
+
+
+def _init_worker(X, targets, order, fold_of):
+    _DATA.update(X=X, targets=targets, order=order, fold_of=fold_of)
+
+
+def _fit_fold(name, params, n_samples, fold):
+    X, y, order, fold_of = _DATA['X'], _DATA['targets'][name], _DATA['order'], _DATA['fold_of']
+    train = order[fold_of[order] != fold][:n_samples]
+    valid = np.flatnonzero(fold_of == fold)
+    start = time.perf_counter()
+    model = make_estimator(name, **params, n_jobs=1).fit(X[train], y[train])
+    return {**score(MODEL_SPECS[name][0], y[valid], model.predict(X[valid])),
+            'fit_s': time.perf_counter() - start}
+
+
+class FoldCache:
+    """Fold scores for one dataset version, stored as JSON under ``TUNING_DIR``."""
+
+    def __init__(self, version, folds, root=None):
+        self.path = (root if root is not None else TUNING_DIR) / f"{version}.json"
+        self.folds = folds
+        self.results = json.loads(self.path.read_text()) if self.path.exists() else {}
+
+    def key(self, name, params, n_samples, fold):
+        payload = [name, params, n_samples, fold, self.folds, SPLIT_SEED, FEATURE_COLUMNS, sklearn.__version__]
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:20]
+
+    def get(self, *task):
+        return self.results.get(self.key(*task))
+
+    def put(self, task, result):
+        self.results[self.key(*task)] = result
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.results, f)
+            os.replace(tmp_path, self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+@dataclass
+class TuningRound:
+    n_samples: int
+    candidates: int
+    fits: int
+    cached: int
+    wall_s: float
+
+
+@dataclass
+class TuningResult:
+    """Chosen configuration and cross-validated scores per target."""
+
+    dataset_version: str
+    folds: int
+    params: dict
+    scores: dict
+    baseline_scores: dict
+    rounds: list = field(default_factory=list)
+    leaderboards: dict = field(default_factory=dict)
+
+
+def _mean_scores(results):
+    return {metric: float(np.mean([r[metric] for r in results])) for metric in results[0] if metric != 'fit_s'}
+
+
+def tune(df, version, grid=None, folds=DEFAULT_FOLDS, factor=HALVING_FACTOR, workers=None, cache=None,
+         echo=True):
+    """Run successive halving with k-fold CV for every model; returns a ``TuningResult``."""
+    grid = grid if grid is not None else candidate_grid()
+    cache = cache if cache is not None else FoldCache(version, folds)
+    split = split_dataset(df)
+    X = np.ascontiguousarray(split.X_train, dtype=np.float32)
+    targets = {name: np.asarray(y) for name, y in split.y_train.items()}
+    order, fold_of = fold_assignment(len(X), folds)
+    n_train = int(min(np.sum(fold_of != f) for f in range(folds)))
+    schedule = halving_schedule(n_train, len(grid), factor)
+    baseline = {k: v for k, v in make_estimator(next(iter(MODEL_SPECS))).get_params().items()
+                if k in ('n_estimators', 'max_depth')}
+    workers = workers or os.cpu_count() or 1
+
+    def run(tasks, pool):
+        """Return ``{cache key: fold scores}`` for ``tasks`` and how many were cached."""
+        results, missing = {}, []
+        for task in tasks:
+            hit = cache.get(*task)
+            if hit is None:
+                missing.append(task)
+            else:
+                results[cache.key(*task)] = hit
+        if pool is None:
+            computed = [_fit_fold(*task) for task in missing]
+        else:
+            computed = list(pool.map(_fit_fold, *zip(*missing))) if missing else []
+        for task, result in zip(missing, computed):
+            cache.put(task, result)
+            results[cache.key(*task)] = result
+        if missing:
+            cache.save()
+        return results, len(tasks) - len(missing)
+
+    alive = {name: list(grid) for name in MODEL_SPECS}
+    result = TuningResult(version, folds, {}, {}, {})
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(X, targets, order, fold_of))
+    else:
+        _init_worker(X, targets, order, fold_of)
+    try:
+        for r, n_samples in enumerate(schedule):
+            start = time.perf_counter()
+            tasks = [(name, params, n_samples, fold)
+                     for name, candidates in alive.items() for params in candidates for fold in range(folds)]
+            results, cached = run(tasks, pool)
+            candidates = sum(len(c) for c in alive.values())
+            for name, candidates_ in alive.items():
+                metric, higher = SELECTION_METRIC[MODEL_SPECS[name][0]]
+                ranked = []
+                for params in candidates_:
+                    mean = _mean_scores([results[cache.key(name, params, n_samples, fold)] for fold in range(folds)])
+                    # Ties go to the cheaper forest
+                    cost = (params['n_estimators'], params['max_depth'] or math.inf)
+                    ranked.append(((-mean[metric] if higher else mean[metric], *cost), params, mean))
+                ranked.sort(key=lambda item: item[0])
+                keep = 1 if r == len(schedule) - 1 else max(1, math.ceil(len(ranked) / factor))
+                alive[name] = [params for _, params, _ in ranked[:keep]]
+                result.leaderboards[name] = [{**params, **mean} for _, params, mean in ranked]
+                if r == len(schedule) - 1:
+                    result.params[name], result.scores[name] = ranked[0][1], ranked[0][2]
+            round_ = TuningRound(n_samples, candidates, len(tasks), cached, time.perf_counter() - start)
+            result.rounds.append(round_)
+            if echo:
+                print(f"round {r + 1}/{len(schedule)}: {round_.candidates:3d} candidates x {folds} folds "
+                      f"on {n_samples} rows, {round_.fits} fits ({round_.cached} cached) in {round_.wall_s:.2f}s",
+                      flush=True)
+
+        # The untuned configuration on all rows; a winner that doesn't beat it is not used
+        tasks = [(name, baseline, schedule[-1], fold) for name in MODEL_SPECS for fold in range(folds)]
+        results, _ = run(tasks, pool)
+        for name in MODEL_SPECS:
+            scores = _mean_scores([results[cache.key(name, baseline, schedule[-1], fold)] for fold in range(folds)])
+            result.baseline_scores[name] = scores
+            metric, higher = SELECTION_METRIC[MODEL_SPECS[name][0]]
+            gain = result.scores[name][metric] - scores[metric]
+            if not (gain > 0 if higher else gain < 0):
+                result.params[name], result.scores[name] = dict(baseline), scores
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return result
+
+
+def publish(result, store, df):
+    """Publish ``result.params`` to ``store`` and train the tuned models and their flat exports."""
+    store.publish_params(result.params, dataset_version=result.dataset_version, folds=result.folds,
+                         cv_scores=result.scores, baseline_cv_scores=result.baseline_scores,
+                         defaults=DEFAULT_PARAMS)
+    split = split_dataset(df)
+    _, timings = train_models(store, split, version=result.dataset_version)
+    load_flat_models(store, split, version=result.dataset_version)
+    return timings
+
+
+def _parse_list(text, parse):
+    return [None if item.strip().lower() == 'none' else parse(item) for item in text.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune the dashboard forests with cross-validated successive halving.")
+    parser.add_argument("--data", default=str(DATA_PATH), help="dataset to tune on")
+    parser.add_argument("--folds", type=int, default=DEFAULT_FOLDS, help="cross-validation folds")
+    parser.add_argument("--n-estimators", default=",".join(map(str, DEFAULT_N_ESTIMATORS)),
+                        help="comma-separated tree counts to try")
+    parser.add_argument("--max-depth", default=",".join(str(d).lower() for d in DEFAULT_MAX_DEPTH),
+                        help="comma-separated depths to try ('none' for unlimited)")
+    parser.add_argument("--factor", type=int, default=HALVING_FACTOR,
+                        help="candidates kept per round: 1/factor; rows per round grow by factor")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--dry-run", action="store_true", help="report the winners without publishing them")
+    args = parser.parse_args(argv)
+
+    grid = candidate_grid(_parse_list(args.n_estimators, int), _parse_list(args.max_depth, int))
+    df, _ = load_dataset(args.data)
+    version = dataset_version(args.data)
+    print(f"Tuning {len(MODEL_SPECS)} models over {len(grid)} configurations on {version}")
+    result = tune(df, version, grid, args.folds, args.factor, args.workers)
+
+    for name, params in result.params.items():
+        baseline = result.baseline_scores[name]
+        if result.scores[name] is baseline:
+            print(f"{name:<10} keeping the defaults: no candidate beat them "
+                  + "  ".join(f"{metric} {value:.4f}" for metric, value in baseline.items()))
+            continue
+        print(f"{name:<10} n_estimators={params['n_estimators']!s:<4} max_depth={params['max_depth']!s:<5} "
+              + "  ".join(f"{metric} {value:.4f} (default {baseline[metric]:.4f})"
+                          for metric, value in result.scores[name].items()))
+    if args.dry_run:
+        return
+    store = ModelStore()
+    timings = publish(result, store, df)
+    print(f"Published to {store.root}; trained {len(timings) - 1 if timings else 0} tuned models.")
+
+
+if __name__ == "__main__":
+    main()
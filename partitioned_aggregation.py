@@ -0,0 +1,185 @@
+"""Partitioned, multi-core aggregation of the incident data into mergeable states.
+
+The rows are split into contiguous partitions and each worker process turns
+its partition into a ``PartialAggregate``:
+
+- an ``IncidentCube`` of count / sum / sum-of-squares cells (exact means,
+  sums and standard deviations);
+- a ``QuantileSketch`` per measure in ``QUANTILE_MEASURES`` for medians
+  (within ``alpha`` relative error, 0.5% by default);
+- a ``DistinctSketch`` per column in ``DISTINCT_COLUMNS`` for distinct counts
+  (HyperLogLog at ``DISTINCT_PRECISION``, linear counting for small counts).
+
+Partials merge in any order, so the same states can be built across cores,
+across files, or incrementally as incidents are appended (``incident_append``
+folds each batch into the saved aggregate). ``summary`` answers
+``groupby(dims).agg(spec)``-shaped tables like ``IncidentCube.summary`` plus
+the ``median`` and ``nunique`` statistics.
+
+Usage::
+
+    python partitioned_aggregation.py --workers 4 --verify
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import reduce
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cyber_data import DATA_PATH, load_dataset
+from incident_cube import CUBE_CACHE_DIR, CUBE_DIMENSIONS, CUBE_MEASURES, IncidentCube
+from incident_sketches import DEFAULT_RELATIVE_ACCURACY, DistinctSketch, QuantileSketch
+
+# Sketches keep the filterable cube dimensions, so filtered medians and distinct counts are roll-ups too
+SKETCH_DIMENSIONS = ['Year', 'Country', 'Target Industry', 'Attack Source']
+QUANTILE_MEASURES = ['Financial Loss (in Million $)', 'Number of Affected Users']
+DISTINCT_COLUMNS = ['Country', 'Attack Source']
+# Lower than incident_sketches.DEFAULT_PRECISION because there is one sketch per cube cell:
+# 1024 registers per cell keeps the distinct sketches to a few MB rather than tens of MB, so the
+# dashboard's distinct counts have a 3.3% standard error (1.04 / sqrt(1024)) above 2560 values
+DISTINCT_PRECISION = 10
+
+
+@dataclass
+class PartialAggregate:
+    cube: IncidentCube
+    quantiles: dict
+    distinct: dict
+
+    @classmethod
+    def load(cls, path):
+        return pd.read_pickle(path)
+
+    def save(self, path):
+        """Persist the aggregate to ``path`` (atomic replace)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        os.close(fd)
+        try:
+            pd.to_pickle(self, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def merge(self, other):
+        return PartialAggregate(
+            self.cube.merge(other.cube),
+            {m: sketch.merge(other.quantiles[m]) for m, sketch in self.quantiles.items()},
+            {c: sketch.merge(other.distinct[c]) for c, sketch in self.distinct.items()},
+        )
+
+    def where(self, selections):
+        """Restrict the cube and sketches to ``{dimension: allowed values}``."""
+        return PartialAggregate(
+            self.cube.where(selections),
+            {m: sketch.where(selections) for m, sketch in self.quantiles.items()},
+            {c: sketch.where(selections) for c, sketch in self.distinct.items()},
+        )
+
+    def summary(self, dims, spec):
+        """``IncidentCube.summary`` plus ``median`` (quantile sketch) and ``nunique`` (HyperLogLog)."""
+        dims = [dims] if isinstance(dims, str) else list(dims)
+        stats = {column: [stat] if isinstance(stat, str) else list(stat) for column, stat in spec.items()}
+        cube_spec = {column: [s for s in wanted if s not in ('median', 'nunique')] for column, wanted in stats.items()}
+        cube_table = self.cube.summary(dims, {c: s for c, s in cube_spec.items() if s})
+        columns = {}
+        for column, wanted in stats.items():
+            for stat in wanted:
+                if stat == 'median':
+                    values = self.quantiles[column].quantile(dims, 0.5)
+                elif stat == 'nunique':
+                    values = self.distinct[column].estimate(dims).round()
+                else:
+                    values = cube_table[(column, stat)]
+                # The grand total (no dims) is one row whatever each source's index says
+                columns[(column, stat)] = values if dims else values.to_numpy()
+        table = pd.DataFrame(columns)
+        if all(isinstance(stat, str) for stat in spec.values()):
+            table.columns = table.columns.get_level_values(0)
+        return table
+
+
+def partial_aggregate(df, alpha=DEFAULT_RELATIVE_ACCURACY, precision=DISTINCT_PRECISION):
+    """Aggregate one partition of incidents."""
+    return PartialAggregate(
+        IncidentCube.from_frame(df),
+        {m: QuantileSketch.from_frame(df, m, SKETCH_DIMENSIONS, alpha) for m in QUANTILE_MEASURES},
+        {c: DistinctSketch.from_frame(df, c, SKETCH_DIMENSIONS, precision) for c in DISTINCT_COLUMNS},
+    )
+
+
+def merge_partials(partials):
+    return reduce(PartialAggregate.merge, partials)
+
+
+def aggregate_parallel(df, workers=None, partitions=None, alpha=DEFAULT_RELATIVE_ACCURACY,
+                       precision=DISTINCT_PRECISION):
+    """Aggregate ``df`` in ``partitions`` row ranges (default: one per worker) across ``workers`` processes."""
+    workers = workers or os.cpu_count() or 1
+    partitions = max(1, min(partitions or workers, len(df)))
+    columns = list(dict.fromkeys(CUBE_DIMENSIONS + CUBE_MEASURES + DISTINCT_COLUMNS))
+    bounds = np.linspace(0, len(df), partitions + 1).astype(int)
+    parts = [df[columns].iloc[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+    if workers == 1 or partitions == 1:
+        return merge_partials(partial_aggregate(part, alpha, precision) for part in parts)
+    with ProcessPoolExecutor(min(workers, partitions)) as pool:
+        futures = [pool.submit(partial_aggregate, part, alpha, precision) for part in parts]
+        return merge_partials(future.result() for future in futures)
+
+
+def aggregate_path_for(version, cache_dir=None):
+    cache_dir = Path(cache_dir) if cache_dir is not None else CUBE_CACHE_DIR
+    return cache_dir / f"{version}.aggregate.pkl"
+
+
+def load_or_build_aggregate(df, version, cache_dir=None, workers=None):
+    """Load the aggregate saved for dataset ``version`` or build it from ``df`` in parallel and save it."""
+    path = aggregate_path_for(version, cache_dir)
+    if path.exists():
+        return PartialAggregate.load(path)
+    aggregate = aggregate_parallel(df, workers)
+    aggregate.save(path)
+    return aggregate
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the yearly summary table with partitioned aggregation.")
+    parser.add_argument("--data", default=str(DATA_PATH), help="dataset to aggregate")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--partitions", type=int, default=None, help="row partitions (default: one per worker)")
+    parser.add_argument("--verify", action="store_true", help="compare with the exact pandas groupby")
+    args = parser.parse_args(argv)
+
+    df, _ = load_dataset(args.data)
+    spec = {'Financial Loss (in Million $)': ['mean', 'median', 'std'],
+            'Number of Affected Users': ['mean', 'median'],
+            'Country': 'nunique', 'Attack Source': 'nunique'}
+    start = time.perf_counter()
+    aggregate = aggregate_parallel(df, args.workers, args.partitions)
+    table = aggregate.summary('Year', spec)
+    print(f"Aggregated {len(df):,} incidents in {time.perf_counter() - start:.2f}s")
+    print(table.round(2).to_string())
+
+    if args.verify:
+        start = time.perf_counter()
+        exact = df.groupby('Year').agg(spec)
+        print(f"\nExact groupby: {time.perf_counter() - start:.2f}s")
+        alpha = aggregate.quantiles[QUANTILE_MEASURES[0]].alpha
+        for column in table.columns:
+            estimate, truth = table[column].to_numpy(float), exact[column].to_numpy(float)
+            error = np.nanmax(np.abs(estimate - truth) / np.where(truth == 0, 1, np.abs(truth)))
+            bound = f" (bound {alpha:.2%})" if column[1] == 'median' else ""
+            print(f"  {column[0]} {column[1]}: max relative error {error:.3%}{bound}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Lightweight per-stage timing and memory instrumentation.
+
+``PerfRecorder.stage`` wraps a pipeline stage and records its wall time,
+CPU time (of the calling thread by default), memory and row count. Memory is
+the stage's peak traced allocation when tracemalloc is tracing (set
+``CYBER_PERF_TRACEMALLOC=1`` or call ``tracemalloc.start()``); otherwise it
+is how much the process's resident set grew over the stage, which costs one
+read of ``/proc/self/statm``. ``memory_source`` says which one a record holds.
+
+Every finished stage also feeds a process-wide registry that is rendered in
+the Prometheus text exposition format, and recorders can append their
+records to a JSON lines file, rotated to ``<name>.1`` once it reaches
+``CYBER_PERF_JSONL_MB`` (16 MB by default).
+"""
+
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from model_store import ARTIFACT_DIR
+
+METRICS_DIR = Path(os.environ.get("CYBER_PERF_EXPORT_DIR", ARTIFACT_DIR / "metrics"))
+METRIC_PREFIX = "cyber_dashboard"
+MAX_JSONL_BYTES = int(float(os.environ.get("CYBER_PERF_JSONL_MB", 16)) * 2**20)
+_EXPORT_LOCK = threading.Lock()
+
+if os.environ.get("CYBER_PERF_TRACEMALLOC") == "1" and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+def max_rss_bytes():
+    """Resident-set high water mark of this process in bytes."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def current_rss_bytes():
+    """Current resident set of this process in bytes, or ``None`` where ``/proc`` is unavailable."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StageRegistry:
+    """Process-wide cumulative stage statistics for the Prometheus export."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def observe(self, record):
+        with self._lock:
+            stats = self._stages.setdefault(record['stage'], {
+                'runs': 0, 'wall_total': 0.0, 'cpu_total': 0.0,
+                'last_wall': 0.0, 'last_cpu': 0.0, 'last_memory': 0, 'last_rows': 0,
+            })
+            stats['runs'] += 1
+            stats['wall_total'] += record['wall_s']
+            stats['cpu_total'] += record['cpu_s']
+            stats['last_wall'] = record['wall_s']
+            stats['last_cpu'] = record['cpu_s']
+            stats['last_memory'] = record['memory_bytes']
+            stats['last_rows'] = record['rows'] or 0
+
+    def snapshot(self):
+        """Return ``{stage: stats}`` copies of the cumulative statistics."""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stages.items()}
+
+    def to_prometheus(self, prefix=METRIC_PREFIX):
+        """Render the registry in the Prometheus text exposition format."""
+        metrics = [
+            ('stage_runs_total', 'counter', 'Number of times the stage ran', 'runs'),
+            ('stage_wall_seconds_total', 'counter', 'Cumulative wall-clock seconds spent in the stage', 'wall_total'),
+            ('stage_cpu_seconds_total', 'counter', 'Cumulative CPU seconds spent in the stage', 'cpu_total'),
+            ('stage_last_wall_seconds', 'gauge', 'Wall-clock seconds of the latest run', 'last_wall'),
+            ('stage_last_cpu_seconds', 'gauge', 'CPU seconds of the latest run', 'last_cpu'),
+            ('stage_last_memory_bytes', 'gauge',
+             'Peak traced allocation or resident-set growth of the latest run', 'last_memory'),
+            ('stage_last_rows', 'gauge', 'Rows processed by the latest run', 'last_rows'),
+        ]
+        stages = self.snapshot()
+        lines = []
+        for suffix, kind, help_text, field in metrics:
+            name = f"{prefix}_{suffix}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for stage, stats in sorted(stages.items()):
+                label = stage.replace('\\', '\\\\').replace('"', '\\"')
+                lines.append(f'{name}{{stage="{label}"}} {stats[field]}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = StageRegistry()
+
+
+class PerfRecorder:
+    """Records one run's stages (e.g. one Streamlit rerun or one benchmark size)."""
+
+    def __init__(self, context=None, registry=REGISTRY, echo=False, cpu_clock=time.thread_time):
+        self.context = {'run_id': uuid.uuid4().hex[:12], **(context or {})}
+        self.registry = registry
+        self.echo = echo
+        # Thread CPU by default: Streamlit serves concurrent sessions from one process
+        self.cpu_clock = cpu_clock
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """Time the enclosed block; the yielded dict takes extra fields for the record."""
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        else:
+            base = current_rss_bytes()
+        wall, cpu = time.perf_counter(), self.cpu_clock()
+        extra = {}
+        try:
+            yield extra
+        finally:
+            rows = extra.pop('rows', rows)
+            wall_s = time.perf_counter() - wall
+            cpu_s = self.cpu_clock() - cpu
+            if tracing:
+                memory, source = tracemalloc.get_traced_memory()[1] - base, 'tracemalloc_peak'
+            elif base is not None:
+                memory, source = current_rss_bytes() - base, 'rss_delta'
+            else:
+                memory, source = max_rss_bytes(), 'max_rss'
+            record = {
+                **self.context,
+                'timestamp': time.time(),
+                'stage': name,
+                'rows': int(rows) if rows is not None else None,
+                'wall_s': round(wall_s, 6),
+                'cpu_s': round(cpu_s, 6),
+                'memory_bytes': int(memory),
+                'memory_source': source,
+                **extra,
+            }
+            self.records.append(record)
+            if self.registry is not None:
+                self.registry.observe(record)
+            if self.echo:
+                print(format_record(record), flush=True)
+
+    @property
+    def total_wall_s(self):
+        return sum(record['wall_s'] for record in self.records)
+
+    def to_jsonl(self, path, max_bytes=MAX_JSONL_BYTES):
+        """Append this run's records to the JSON lines file at ``path``.
+
+        A file that has reached ``max_bytes`` is first moved to ``<path>.1``
+        (replacing the previous one), so at most two files are kept.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lines = ''.join(json.dumps(record) + '\n' for record in self.records)
+        with _EXPORT_LOCK:
+            try:
+                if max_bytes is not None and path.stat().st_size >= max_bytes:
+                    os.replace(path, path.with_name(path.name + '.1'))
+            except FileNotFoundError:
+                pass
+            with open(path, 'a') as out:
+                out.write(lines)
+
+    def export(self, directory=None):
+        """Append the records to ``stages.jsonl`` and rewrite ``stages.prom`` in ``directory``."""
+        directory = Path(directory) if directory is not None else METRICS_DIR
+        self.to_jsonl(directory / 'stages.jsonl')
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as out:
+                out.write(self.registry.to_prometheus())
+            os.replace(tmp_path, directory / 'stages.prom')
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def format_record(record):
+    rows = f"{record['rows']:>11,}" if record['rows'] is not None else f"{'-':>11}"
+    return (f"  {record['stage']:<22} rows {rows}  wall {record['wall_s']:9.3f}s  "
+            f"cpu {record['cpu_s']:9.3f}s  mem {record['memory_bytes'] / 2**20:9.1f} MiB")
@@ -0,0 +1,316 @@
+"""Local HTTP prediction service with request micro-batching.
+
+Serves the dashboard's attack-type, target-industry and financial-loss
+models without Streamlit. Concurrent ``POST /predict`` requests are queued
+and collected into micro-batches (bounded by ``--max-batch-size`` and
+``--max-wait-ms``), so each batch costs one ``predict`` call per model.
+
+Endpoints::
+
+    POST /predict   JSON scenario, e.g. {"Country": "USA", "Attack Source": "Insider",
+                    "Security Vulnerability Type": "Zero-day", "Defense Mechanism Used": "VPN",
+                    "Year": 2023, "Number of Affected Users": 500000,
+                    "Incident Resolution Time (in Hours)": 36}
+    GET  /stats     request latency percentiles and batch-size statistics
+    GET  /health
+
+Usage::
+
+    python prediction_server.py --port 8600 --max-batch-size 256 --max-wait-ms 5
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import Counter, deque
+
+import numpy as np
+import pandas as pd
+
+from cyber_data import CATEGORICAL_FEATURES, DATA_PATH, FEATURE_COLUMNS, NUMERIC_FEATURES
+from cyber_models import decode_predictions, load_current_models, predict_all
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 500: 'Internal Server Error'}
+MAX_BODY_BYTES = 1 << 20
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ServiceStats:
+    """Rolling request latency and batch-size statistics."""
+
+    def __init__(self, window=10_000):
+        self.latencies = deque(maxlen=window)
+        self.batch_sizes = Counter()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+
+    def record_batch(self, size):
+        self.batches += 1
+        self.batch_sizes[size] += 1
+
+    def record_request(self, seconds, ok=True):
+        self.requests += 1
+        self.errors += not ok
+        self.latencies.append(seconds)
+
+    def snapshot(self):
+        latencies = np.asarray(self.latencies) * 1000
+        sizes = np.repeat(list(self.batch_sizes), list(self.batch_sizes.values()))
+        uptime = time.perf_counter() - self.started
+        snapshot = {
+            'requests': self.requests,
+            'errors': self.errors,
+            'batches': self.batches,
+            'uptime_s': round(uptime, 3),
+            'requests_per_s': round(self.requests / max(uptime, 1e-9), 2),
+        }
+        if len(latencies):
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            snapshot['latency_ms'] = {'mean': round(float(latencies.mean()), 3), 'p50': round(float(p50), 3),
+                                      'p95': round(float(p95), 3), 'p99': round(float(p99), 3),
+                                      'max': round(float(latencies.max()), 3)}
+        if len(sizes):
+            snapshot['batch_size'] = {'mean': round(float(sizes.mean()), 2), 'max': int(sizes.max()),
+                                      'histogram': {str(k): v for k, v in sorted(self.batch_sizes.items())}}
+        return snapshot
+
+
+def _number(scenario, col, integer=False):
+    """Return ``scenario[col]`` as a finite float, or an int when ``integer``."""
+    value = scenario[col]
+    try:
+        number = float(value)
+    except (TypeError, ValueError, OverflowError):
+        number = None
+    if isinstance(value, bool) or number is None or not math.isfinite(number):
+        raise ValueError(f"{col} must be a finite number, got {value!r}")
+    if integer:
+        if not number.is_integer():
+            raise ValueError(f"{col} must be an integer, got {value!r}")
+        return int(number)
+    return number
+
+
+class MicroBatcher:
+    """Collects single-scenario requests into batched ``predict`` calls."""
+
+    def __init__(self, models, label_encoders, stats, max_batch_size=256, max_wait_ms=5.0):
+        self.models = models
+        self.label_encoders = label_encoders
+        self._codes = {col: {label: code for code, label in enumerate(label_encoders[col].classes_)}
+                       for col in CATEGORICAL_FEATURES}
+        self.stats = stats
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def feature_row(self, scenario):
+        """Validate one scenario and return its values in ``FEATURE_COLUMNS`` order.
+
+        Labels are encoded here with a dict lookup, so a bad request is
+        rejected before it can fail a whole batch.
+        """
+        row = []
+        for col in CATEGORICAL_FEATURES:
+            if col + '_encoded' in scenario:
+                code = _number(scenario, col + '_encoded', integer=True)
+                if not 0 <= code < len(self._codes[col]):
+                    raise ValueError(f"{col}_encoded out of range: {code}")
+            elif col in scenario:
+                code = self._codes[col].get(str(scenario[col]))
+                if code is None:
+                    raise ValueError(f"Unknown {col} label: {scenario[col]}")
+            else:
+                raise KeyError(f"missing feature '{col}'")
+            row.append(code)
+        for col in NUMERIC_FEATURES:
+            if col not in scenario:
+                raise KeyError(f"missing feature '{col}'")
+            row.append(_number(scenario, col))
+        return row
+
+    async def predict(self, scenario):
+        row = self.feature_row(scenario)
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((row, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            self.stats.record_batch(len(batch))
+            try:
+                results = await loop.run_in_executor(None, self._score, [row for row, _ in batch])
+            except Exception as exc:  # keep serving; report the failure to every caller
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _score(self, rows):
+        X = pd.DataFrame(rows, columns=FEATURE_COLUMNS)
+        decoded = decode_predictions(predict_all(self.models, X), self.label_encoders)
+        return [{key: _to_json(values[i]) for key, values in decoded.items()} for i in range(len(rows))]
+
+
+def _to_json(value):
+    return value.item() if hasattr(value, 'item') else value
+
+
+async def _read_line(reader):
+    try:
+        return await reader.readline()
+    except (ValueError, asyncio.LimitOverrunError):
+        # readline reports a line longer than the stream limit as ValueError
+        raise HTTPError(400, 'request line or header too long') from None
+
+
+async def read_request(reader):
+    """Parse one HTTP/1.1 request; returns ``None`` when the client closed."""
+    request_line = await _read_line(reader)
+    if not request_line:
+        return None
+    parts = request_line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise HTTPError(400, 'malformed request line')
+    method, target, _ = parts
+    headers = {}
+    while True:
+        line = await _read_line(reader)
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(400, 'invalid Content-Length') from None
+    if length < 0:
+        raise HTTPError(400, 'invalid Content-Length')
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, 'payload too large')
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target.split('?', 1)[0], headers, body
+
+
+def write_response(writer, status, payload, keep_alive):
+    body = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode() + body)
+
+
+class PredictionServer:
+    def __init__(self, batcher, stats):
+        self.batcher = batcher
+        self.stats = stats
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as exc:
+                    write_response(writer, exc.status, {'error': str(exc)}, False)
+                    break
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                status, payload = await self.route(method, path, body)
+                write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path == '/stats':
+            return 200, self.stats.snapshot()
+        if path != '/predict':
+            return 404, {'error': f'unknown path {path}'}
+        if method != 'POST':
+            return 405, {'error': 'use POST'}
+        start = time.perf_counter()
+        try:
+            scenario = json.loads(body)
+            if not isinstance(scenario, dict):
+                raise ValueError('expected a JSON object')
+            result = await self.batcher.predict(scenario)
+        except (KeyError, TypeError, ValueError) as exc:
+            self.stats.record_request(time.perf_counter() - start, ok=False)
+            return 400, {'error': str(exc)}
+        except Exception as exc:
+            self.stats.record_request(time.perf_counter() - start, ok=False)
+            return 500, {'error': str(exc)}
+        latency = time.perf_counter() - start
+        self.stats.record_request(latency)
+        return 200, {**result, 'latency_ms': round(latency * 1000, 3)}
+
+
+async def serve(host, port, max_batch_size, max_wait_ms, data_path=DATA_PATH):
+    # Micro-batches are small, where the flat forests beat sklearn's per-tree dispatch
+    models, label_encoders = load_current_models(data_path, flat=True)
+    stats = ServiceStats()
+    batcher = MicroBatcher(models, label_encoders, stats, max_batch_size, max_wait_ms)
+    batcher.start()
+    server = await asyncio.start_server(PredictionServer(batcher, stats).handle, host, port)
+    print(f"Prediction service listening on http://{host}:{port} "
+          f"(max batch {max_batch_size}, max wait {max_wait_ms}ms)")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the dashboard models over HTTP with micro-batching.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--max-batch-size", type=int, default=256, help="largest micro-batch")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="longest a request waits for its batch to fill")
+    parser.add_argument("--data", default=str(DATA_PATH), help="dataset the models were trained on")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_batch_size, args.max_wait_ms, args.data))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -19,7 +19,7 @@ fi
 
 # Install requirements
 echo "📦 Installing dependencies..."
-pip install streamlit pandas numpy plotly scikit-learn matplotlib seaborn
+pip install -r requirements.txt
 
 # Check if data file exists
 if [ ! -f "data/clean_global_cybersecurity_threats.csv" ]; then
@@ -0,0 +1,265 @@
+"""What-if sensitivity sweeps of the dashboard models over scenario grids.
+
+A sweep fixes the categorical features (country, attack source,
+vulnerability, defense) and varies Year, Number of Affected Users and
+Incident Resolution Time over the Cartesian grid of the given axis values.
+
+Scoring a 100 x 100 x 100 grid row by row means a million traversals of
+every tree. Instead each forest is specialized to the fixed features: every
+tree is walked once, following only the branch the fixed values take, which
+leaves a set of leaves that are boxes over the three swept features. Each box
+covers a contiguous block of grid indices on every axis (found with
+``searchsorted`` on the sorted axis values), so the forest's mean prediction
+on the whole grid is a sum of block additions, done with a 3D difference
+array and three cumulative sums. The comparisons are the ones
+``predict`` makes (float32 features against the split thresholds), so the
+result matches scoring the explicit grid; ``predict_grid_chunked`` does that
+the slow way, in bounded-size chunks, and ``--verify`` compares the two.
+
+Usage::
+
+    python scenario_sweep.py --country USA --source "Hacker Group" --steps 100 --verify
+"""
+
+import argparse
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from cyber_data import CATEGORICAL_FEATURES, DATA_PATH, FEATURE_COLUMNS, NUMERIC_FEATURES, load_dataset
+from cyber_models import MODEL_SPECS, load_current_models
+from flat_forest import FlatForest
+
+SWEEP_FEATURES = NUMERIC_FEATURES
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+@dataclass
+class SweepResult:
+    axes: dict
+    # Per model: predicted class code (classifiers) or value (regressor) at every grid point
+    predictions: dict
+    # Per classifier: mean tree probability of the predicted class
+    confidence: dict
+    # Per model and axis: mean prediction (probability per class for classifiers) along that axis
+    partial_dependence: dict
+    classes: dict
+    elapsed_s: float = 0.0
+    n_leaves: dict = field(default_factory=dict)
+
+    @property
+    def n_points(self):
+        return int(np.prod([len(values) for values in self.axes.values()]))
+
+
+def axis_values(low, high, steps, integer=False):
+    """``steps`` evenly spaced values from ``low`` to ``high`` (unique integers with ``integer``)."""
+    values = np.linspace(low, high, steps)
+    return np.unique(np.round(values).astype(np.int64)) if integer else values
+
+
+def _as_forest(model):
+    return model if isinstance(model, FlatForest) else FlatForest.from_sklearn(model)
+
+
+def _feature_index(forest):
+    names = getattr(forest, 'feature_names_in_', None)
+    return {str(name): i for i, name in enumerate(names if names is not None else FEATURE_COLUMNS)}
+
+
+def leaf_boxes(forest, fixed):
+    """Leaves reachable when the ``fixed`` features (``{column index: value}``) are set.
+
+    Returns ``(leaves, lower, upper)``: global leaf indices and, per leaf, the
+    open lower / closed upper bound on every feature (``x`` is in the leaf iff
+    ``lower < x <= upper`` on each free feature).
+    """
+    n_features = forest.n_features_in_
+    # Features are compared as float32, like predict does
+    fixed_values = {f: float(np.float32(v)) for f, v in fixed.items()}
+    children = forest.children.tolist()
+    feature = forest.feature.tolist()
+    threshold = forest.threshold.astype(np.float64).tolist()
+    leaves, lowers, uppers = [], [], []
+    for root in forest.roots.tolist():
+        stack = [(root, [-np.inf] * n_features, [np.inf] * n_features)]
+        while stack:
+            node, lo, hi = stack.pop()
+            left, right = children[node]
+            if left == node:
+                leaves.append(node)
+                lowers.append(lo)
+                uppers.append(hi)
+                continue
+            f, t = feature[node], threshold[node]
+            if f in fixed_values:
+                stack.append((left if fixed_values[f] <= t else right, lo, hi))
+                continue
+            if lo[f] < t:
+                left_hi = list(hi)
+                left_hi[f] = min(hi[f], t)
+                stack.append((left, lo, left_hi))
+            if t < hi[f]:
+                right_lo = list(lo)
+                right_lo[f] = max(lo[f], t)
+                stack.append((right, right_lo, hi))
+    return np.asarray(leaves, dtype=np.intp), np.asarray(lowers), np.asarray(uppers)
+
+
+def grid_means(forest, boxes, axes):
+    """Yield ``(output, grid)``: the forest's mean leaf value for each output column on the grid.
+
+    ``boxes`` comes from ``leaf_boxes``; ``axes`` is a list of ``(column index,
+    sorted values)`` for the three swept features.
+    """
+    leaves, lower, upper = boxes
+    shape = tuple(len(values) for _, values in axes)
+    starts, stops = [], []
+    for f, values in axes:
+        values = np.asarray(values, dtype=np.float32).astype(np.float64)
+        starts.append(np.searchsorted(values, lower[:, f], side='right'))
+        stops.append(np.searchsorted(values, upper[:, f], side='right'))
+    keep = np.all([start < stop for start, stop in zip(starts, stops)], axis=0)
+    starts = [start[keep] for start in starts]
+    stops = [stop[keep] for stop in stops]
+    values = forest.value[leaves[keep]].astype(np.float64)
+
+    # Inclusion-exclusion corners of each block in a (n0+1, n1+1, n2+1) difference array
+    padded = tuple(n + 1 for n in shape)
+    corners, signs = [], []
+    for corner in range(8):
+        index = [stops[axis] if corner >> axis & 1 else starts[axis] for axis in range(3)]
+        corners.append(np.ravel_multi_index(index, padded))
+        signs.append(-1.0 if bin(corner).count('1') % 2 else 1.0)
+    corners = np.concatenate(corners)
+    signs = np.repeat(signs, len(values))
+    size = int(np.prod(padded))
+    for output in range(values.shape[1]):
+        weights = np.tile(values[:, output], 8) * signs
+        grid = np.bincount(corners, weights=weights, minlength=size).reshape(padded)
+        for axis in range(3):
+            np.cumsum(grid, axis=axis, out=grid)
+        yield output, grid[:shape[0], :shape[1], :shape[2]] / forest.n_trees
+
+
+def _axis_means(grid):
+    return [grid.mean(axis=tuple(a for a in range(3) if a != axis)) for axis in range(3)]
+
+
+def sweep(models, fixed, axes):
+    """Score every model on the grid of ``axes`` (``{column: values}``) with ``fixed`` (``{column: value}``).
+
+    ``fixed`` must set every feature that is not swept; ``fixed`` categorical
+    features are given as their ``*_encoded`` codes.
+    """
+    start = time.perf_counter()
+    axes = {name: np.sort(np.asarray(values, dtype=np.float64)) for name, values in axes.items()}
+    if len(axes) != 3:
+        raise ValueError("A sweep varies exactly three features")
+    result = SweepResult(axes, {}, {}, {}, {})
+    for name, model in models.items():
+        forest = _as_forest(model)
+        index = _feature_index(forest)
+        missing = set(index) - set(axes) - set(fixed)
+        if missing:
+            raise ValueError(f"No value for {', '.join(sorted(missing))}")
+        fixed_idx = {index[col]: value for col, value in fixed.items() if col in index}
+        axis_idx = [(index[col], values) for col, values in axes.items()]
+        boxes = leaf_boxes(forest, fixed_idx)
+        result.n_leaves[name] = len(boxes[0])
+        if forest.kind == 'classifier':
+            best = best_p = None
+            curves = [[] for _ in axes]
+            for output, grid in grid_means(forest, boxes, axis_idx):
+                if best is None:
+                    best, best_p = np.zeros(grid.shape, dtype=np.intp), grid.copy()
+                else:
+                    better = grid > best_p
+                    best[better], best_p[better] = output, grid[better]
+                for axis, curve in enumerate(_axis_means(grid)):
+                    curves[axis].append(curve)
+            result.predictions[name] = forest.classes_[best]
+            result.confidence[name] = best_p
+            result.classes[name] = forest.classes_
+            result.partial_dependence[name] = {col: np.column_stack(curves[axis]) for axis, col in enumerate(axes)}
+        else:
+            _, grid = next(grid_means(forest, boxes, axis_idx))
+            result.predictions[name] = grid
+            result.partial_dependence[name] = {col: curve[:, None] for col, curve in zip(axes, _axis_means(grid))}
+    result.elapsed_s = time.perf_counter() - start
+    return result
+
+
+def grid_frame(fixed, axes, start=0, stop=None):
+    """Rows ``start:stop`` (C order over ``axes``) of the explicit feature grid."""
+    names = list(axes)
+    shape = tuple(len(axes[name]) for name in names)
+    stop = int(np.prod(shape)) if stop is None else stop
+    index = np.unravel_index(np.arange(start, stop), shape)
+    columns = {name: np.asarray(axes[name])[i] for name, i in zip(names, index)}
+    columns.update({col: np.full(stop - start, value) for col, value in fixed.items()})
+    return pd.DataFrame(columns)[FEATURE_COLUMNS]
+
+
+def predict_grid_chunked(models, fixed, axes, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Reference path: one ``predict`` per model over the explicit grid, in bounded-size chunks."""
+    axes = {name: np.sort(np.asarray(values, dtype=np.float64)) for name, values in axes.items()}
+    shape = tuple(len(values) for values in axes.values())
+    total = int(np.prod(shape))
+    out = {name: np.empty(total, dtype=np.float64) for name in models}
+    for start in range(0, total, chunk_rows):
+        X = grid_frame(fixed, axes, start, min(start + chunk_rows, total))
+        for name, model in models.items():
+            out[name][start:start + len(X)] = model.predict(X)
+    return {name: values.reshape(shape) for name, values in out.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep the dashboard models over a Year x Users x Resolution grid.")
+    parser.add_argument("--data", default=str(DATA_PATH), help="dataset whose models to use")
+    parser.add_argument("--country", required=True)
+    parser.add_argument("--source", required=True, help="attack source")
+    parser.add_argument("--vulnerability", default=None, help="security vulnerability type (default: first)")
+    parser.add_argument("--defense", default=None, help="defense mechanism used (default: first)")
+    parser.add_argument("--steps", type=int, default=100, help="grid points per axis")
+    parser.add_argument("--verify", action="store_true", help="compare against predict on the explicit grid")
+    args = parser.parse_args(argv)
+
+    models, label_encoders = load_current_models(args.data, flat=True)
+    labels = dict(zip(CATEGORICAL_FEATURES, [args.country, args.source, args.vulnerability, args.defense]))
+    fixed = {}
+    for col, label in labels.items():
+        classes = list(label_encoders[col].classes_)
+        fixed[col + '_encoded'] = classes.index(label) if label is not None else 0
+    df, _ = load_dataset(args.data)
+    axes = {col: axis_values(df[col].min(), df[col].max(), args.steps, integer=(col == 'Year'))
+            for col in SWEEP_FEATURES}
+
+    result = sweep(models, fixed, axes)
+    print(f"Swept {result.n_points:,} scenarios in {result.elapsed_s:.2f}s "
+          f"(leaves per model: {', '.join(f'{k}={v:,}' for k, v in result.n_leaves.items())})")
+    loss = result.predictions['rf_sev']
+    print(f"Predicted loss: min {loss.min():.2f}M, mean {loss.mean():.2f}M, max {loss.max():.2f}M")
+    for name in ('rf_attack', 'rf_thr'):
+        label_col = MODEL_SPECS[name][2]
+        codes, counts = np.unique(result.predictions[name], return_counts=True)
+        shares = ', '.join(f"{label_encoders[label_col].classes_[int(c)]} {n / result.n_points:.1%}"
+                           for c, n in zip(codes, counts))
+        print(f"{label_col}: {shares}")
+
+    if args.verify:
+        start = time.perf_counter()
+        reference = predict_grid_chunked(models, fixed, axes)
+        elapsed = time.perf_counter() - start
+        for name, values in reference.items():
+            if MODEL_SPECS[name][0] == 'classifier':
+                agreement = np.mean(values == result.predictions[name])
+                print(f"{name}: {agreement:.4%} of grid points match predict ({elapsed:.1f}s for all models)")
+            else:
+                print(f"{name}: max abs difference {np.abs(values - result.predictions[name]).max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
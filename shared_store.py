@@ -0,0 +1,251 @@
+"""Process-wide store for the dashboard's shared data, models and derived results.
+
+Streamlit runs every session's script in the same server process, so one
+module-level ``SharedStore`` (``STORE``) is shared by all concurrent
+analysts:
+
+- ``pinned`` holds the immutable base artifacts (cleaned dataset, label
+  encoders, train/test split, models, aggregates, filter index). Each is
+  built once per key and never evicted by the budget; its NumPy arrays,
+  including the blocks behind its DataFrames, are marked read-only so no
+  session can change the copy the others see. Only one key is pinned per
+  artifact name: pinning a new one (e.g. the next dataset version after
+  ``incident_append``) moves the previous key into the derived LRU, where
+  sessions still on that version keep finding it until the budget evicts
+  it. A superseded key that is built again is cached there too rather than
+  pinned, so readers of the old and new versions never unpin each other.
+- ``get`` holds derived artifacts (filtered masks and aggregates, chart
+  payloads, metric tables, sweeps) under a memory budget, evicting the least
+  recently used entries first. Sizes are estimated from the arrays and
+  frames an entry holds; memory shared with pinned artifacts (e.g. the
+  unfiltered aggregate) is not charged again.
+
+Concurrent requests for a key that is being built wait for that build
+instead of repeating it. Hits, misses and evictions are counted per artifact
+name (the first element of the key) for the Performance panel.
+
+The budget is ``CYBER_STORE_BUDGET_MB`` (256 MB by default).
+"""
+
+import dataclasses
+import os
+import sys
+import threading
+import types
+from collections import OrderedDict, defaultdict
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_BUDGET_BYTES = int(float(os.environ.get("CYBER_STORE_BUDGET_MB", 256)) * 2**20)
+
+
+def _children(obj):
+    # Modules and stores are shared infrastructure, not part of the artifact that references them
+    if isinstance(obj, (types.ModuleType, SharedStore)):
+        return []
+    if isinstance(obj, dict):
+        return list(obj.keys()) + list(obj.values())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return list(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return [getattr(obj, f.name) for f in dataclasses.fields(obj)]
+    if hasattr(obj, '__dict__') and not isinstance(obj, type):
+        return list(vars(obj).values())
+    return []
+
+
+def _walk(obj, skip):
+    """Yield ``(object, own bytes)`` for ``obj`` and everything it holds, skipping ids in ``skip``."""
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in skip:
+            continue
+        skip.add(id(item))
+        if isinstance(item, np.ndarray):
+            # Views are charged to the array that owns the memory (memory maps to themselves)
+            owner = isinstance(item.base, np.ndarray)
+            yield item, 0 if owner else item.nbytes
+            if owner:
+                stack.append(item.base)
+        elif isinstance(item, (pd.DataFrame, pd.Series, pd.Index)):
+            usage = item.memory_usage(deep=True)
+            yield item, int(usage.sum() if hasattr(usage, 'sum') else usage)
+        else:
+            yield item, sys.getsizeof(item)
+            stack.extend(_children(item))
+
+
+def estimate_nbytes(obj, shared=()):
+    """Approximate memory held by ``obj``, not counting objects whose ids are in ``shared``."""
+    return sum(size for _, size in _walk(obj, set(shared)))
+
+
+def _backing_arrays(frame):
+    """NumPy arrays holding the data of a DataFrame or Series (an Index is immutable already)."""
+    for value in (block.values for block in frame._mgr.blocks):
+        # Extension arrays keep their data in one of these (datetimes, categoricals, nullable dtypes)
+        for array in (value, *(getattr(value, attr, None) for attr in ('_ndarray', '_codes', '_data', '_mask'))):
+            if isinstance(array, np.ndarray):
+                yield array
+
+
+def freeze(obj):
+    """Mark every NumPy array reachable from ``obj`` read-only; returns the ids of everything visited."""
+    visited = set()
+    for item, _ in _walk(obj, visited):
+        if isinstance(item, (pd.DataFrame, pd.Series)):
+            arrays = _backing_arrays(item)
+        else:
+            arrays = [item] if isinstance(item, np.ndarray) else []
+        for array in arrays:
+            if array.flags.writeable:
+                array.flags.writeable = False
+    return visited
+
+
+def _name(key):
+    return key[0] if isinstance(key, tuple) and key else key
+
+
+class SharedStore:
+    """Pinned base artifacts plus an LRU cache of derived artifacts under ``budget_bytes``."""
+
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES, max_entries=None):
+        self.budget_bytes = budget_bytes
+        self.max_entries = max_entries
+        self.nbytes = 0
+        self.pinned_nbytes = 0
+        self.counters = defaultdict(lambda: {'hits': 0, 'misses': 0, 'evictions': 0})
+        self._pinned = {}
+        self._shared_ids = set()
+        self._entries = OrderedDict()
+        self._superseded = set()
+        self._building = {}
+        self._lock = threading.RLock()
+
+    def _count(self, key, event):
+        self.counters[_name(key)][event] += 1
+
+    def _build_lock(self, key):
+        with self._lock:
+            return self._building.setdefault(key, threading.Lock())
+
+    def _lookup(self, key):
+        """``(True, value)`` for a pinned or cached ``key`` (counted as a hit), else ``(False, None)``."""
+        if key in self._pinned:
+            self._count(key, 'hits')
+            return True, self._pinned[key][0]
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self._count(key, 'hits')
+            return True, self._entries[key][0]
+        return False, None
+
+    def _build(self, key, build, store):
+        """Build ``key`` once across threads and hand the value to ``store`` under the lock."""
+        with self._lock:
+            found, value = self._lookup(key)
+        if found:
+            return value
+        try:
+            with self._build_lock(key):
+                with self._lock:
+                    found, value = self._lookup(key)
+                    if found:
+                        return value
+                    self._count(key, 'misses')
+                value = build()
+                with self._lock:
+                    store(key, value)
+        finally:
+            # Also after a failed build, so the next request retries with a fresh lock
+            with self._lock:
+                self._building.pop(key, None)
+        return value
+
+    def pinned(self, key, build):
+        """Return the base artifact for ``key``, building it once with ``build()``."""
+        return self._build(key, build, self._pin)
+
+    def _pin(self, key, value):
+        visited = freeze(value)
+        if key in self._superseded:
+            # An older version still being read: cache it without unpinning the current one
+            self._cache(key, value)
+            return
+        self._release(_name(key))
+        size = estimate_nbytes(value, self._shared_ids)
+        self._pinned[key] = (value, size, visited)
+        self.pinned_nbytes += size
+        self._shared_ids |= visited
+
+    def _release(self, name):
+        """Move the artifacts pinned as ``name`` into the derived LRU."""
+        released = [key for key in self._pinned if _name(key) == name]
+        if not released:
+            return
+        values = {}
+        for key in released:
+            value, size, _ = self._pinned.pop(key)
+            self.pinned_nbytes -= size
+            self._superseded.add(key)
+            values[key] = value
+        self._shared_ids = set().union(*(visited for _, _, visited in self._pinned.values()))
+        for key, value in values.items():
+            self._cache(key, value)
+
+    def get(self, key, build):
+        """Return the derived artifact for ``key``, building and caching it with ``build()`` on a miss."""
+        return self._build(key, build, self._cache)
+
+    def _cache(self, key, value):
+        size = estimate_nbytes(value, self._shared_ids)
+        # A value larger than the whole budget is returned but not kept
+        if size <= self.budget_bytes:
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            self._evict()
+        else:
+            self._count(key, 'evictions')
+
+    def _evict(self):
+        while self._entries and (self.nbytes > self.budget_bytes
+                                 or (self.max_entries is not None and len(self._entries) > self.max_entries)):
+            key, (_, size) = self._entries.popitem(last=False)
+            self.nbytes -= size
+            self._count(key, 'evictions')
+
+    def memoize(self, name, pinned=False):
+        """Decorator caching ``func(*args)`` under ``(name, *args)`` with ``pinned`` or ``get``."""
+        def decorate(func):
+            @wraps(func)
+            def wrapper(*args):
+                lookup = self.pinned if pinned else self.get
+                return lookup((name, *args), lambda: func(*args))
+            return wrapper
+        return decorate
+
+    def clear(self):
+        """Drop the derived artifacts (pinned artifacts stay)."""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        """Per-name hit/miss/eviction counts plus the entries and bytes currently held."""
+        with self._lock:
+            held = defaultdict(lambda: {'pinned': False, 'entries': 0, 'bytes': 0})
+            for pinned, entries in ((True, self._pinned), (False, self._entries)):
+                for key, (_, size, *_) in entries.items():
+                    row = held[_name(key)]
+                    row['pinned'] |= pinned
+                    row['entries'] += 1
+                    row['bytes'] += size
+            return [{'artifact': name, **held[name], **self.counters[name]}
+                    for name in sorted(set(self.counters) | set(held), key=str)]
+
+
+STORE = SharedStore()
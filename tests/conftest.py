@@ -0,0 +1,33 @@
+"""Shared fixtures: the sample dataset and small forests trained on it."""
+
+import pandas as pd
+import pytest
+
+from cyber_data import DATA_PATH, clean_frame, encode_frame
+from cyber_models import MODEL_SPECS, make_estimator, split_dataset
+
+# Small forests keep the suite fast; the code under test does not depend on the tree count
+SMALL_PARAMS = {name: {'n_estimators': 8, 'max_depth': 8} for name in MODEL_SPECS}
+
+
+@pytest.fixture(scope='session')
+def raw_incidents():
+    return pd.read_csv(DATA_PATH)
+
+
+@pytest.fixture(scope='session')
+def dataset(raw_incidents):
+    """``(df, label_encoders)`` for the sample dataset; treat both as read-only."""
+    return encode_frame(clean_frame(raw_incidents.copy()))
+
+
+@pytest.fixture(scope='session')
+def split(dataset):
+    return split_dataset(dataset[0])
+
+
+@pytest.fixture(scope='session')
+def models(split):
+    """The three dashboard models, fitted with ``SMALL_PARAMS``."""
+    return {name: make_estimator(name, **SMALL_PARAMS[name]).fit(split.X_train, split.y_train[name])
+            for name in MODEL_SPECS}
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from incident_cube import IncidentCube
+from incident_sketches import DistinctSketch, QuantileSketch
+from partitioned_aggregation import (DISTINCT_PRECISION, SKETCH_DIMENSIONS, aggregate_parallel, merge_partials,
+                                     partial_aggregate)
+
+LOSS = 'Financial Loss (in Million $)'
+
+
+@pytest.fixture(scope='module')
+def halves(dataset):
+    df, _ = dataset
+    return df, df.iloc[:len(df) // 2], df.iloc[len(df) // 2:]
+
+
+def test_quantile_sketch_merge_equals_sketch_of_all_rows(halves):
+    df, first, second = halves
+    merged = QuantileSketch.from_frame(first, LOSS, ['Year']).merge(QuantileSketch.from_frame(second, LOSS, ['Year']))
+    whole = QuantileSketch.from_frame(df, LOSS, ['Year'])
+    pd.testing.assert_series_equal(merged.counts, whole.counts)
+
+
+def test_quantile_sketch_median_within_relative_accuracy(dataset):
+    df, _ = dataset
+    sketch = QuantileSketch.from_frame(df, LOSS, ['Year'])
+    exact = df.groupby('Year')[LOSS].median()
+    estimate = sketch.quantile('Year').reindex(exact.index)
+    assert np.all(np.abs(estimate - exact) <= sketch.alpha * exact + 1e-9)
+
+
+def test_distinct_sketch_merge_equals_sketch_of_all_rows(halves):
+    df, first, second = halves
+    merged = DistinctSketch.from_frame(first, 'Country', ['Year']).merge(
+        DistinctSketch.from_frame(second, 'Country', ['Year']))
+    whole = DistinctSketch.from_frame(df, 'Country', ['Year'])
+    assert merged.keys.equals(whole.keys)
+    np.testing.assert_array_equal(merged.registers, whole.registers)
+
+
+def test_distinct_sketch_counts_small_cardinalities_exactly(dataset):
+    df, _ = dataset
+    sketch = DistinctSketch.from_frame(df, 'Country', SKETCH_DIMENSIONS, DISTINCT_PRECISION)
+    exact = df.groupby('Year', observed=True)['Country'].nunique()
+    pd.testing.assert_series_equal(sketch.estimate('Year').round().astype(int), exact, check_names=False,
+                                   check_index_type=False, check_dtype=False)
+
+
+def test_cube_merge_equals_cube_of_all_rows(halves):
+    df, first, second = halves
+    merged = IncidentCube.from_frame(first).merge(IncidentCube.from_frame(second))
+    whole = IncidentCube.from_frame(df)
+    pd.testing.assert_frame_equal(merged.counts('Year', 'Attack Type'), whole.counts('Year', 'Attack Type'))
+    pd.testing.assert_series_equal(merged.mean('Year', LOSS), whole.mean('Year', LOSS))
+
+
+def test_partitioned_aggregate_matches_pandas(dataset):
+    df, _ = dataset
+    aggregate = aggregate_parallel(df, workers=1, partitions=4)
+    spec = {LOSS: ['mean', 'std', 'median'], 'Country': 'nunique'}
+    table = aggregate.summary('Year', spec)
+    grouped = df.groupby('Year', observed=True)
+    np.testing.assert_allclose(table[(LOSS, 'mean')], grouped[LOSS].mean())
+    np.testing.assert_allclose(table[(LOSS, 'std')], grouped[LOSS].std())
+    np.testing.assert_allclose(table[(LOSS, 'median')], grouped[LOSS].median(), rtol=aggregate.quantiles[LOSS].alpha)
+    np.testing.assert_array_equal(table[('Country', 'nunique')], grouped['Country'].nunique())
+
+
+def test_merge_order_does_not_matter(dataset):
+    df, _ = dataset
+    parts = [partial_aggregate(df.iloc[i::3]) for i in range(3)]
+    forward, backward = merge_partials(parts), merge_partials(parts[::-1])
+    pd.testing.assert_frame_equal(forward.cube.counts('Year', 'Country'), backward.cube.counts('Year', 'Country'))
+    np.testing.assert_array_equal(forward.distinct['Country'].registers, backward.distinct['Country'].registers)
@@ -0,0 +1,28 @@
+import numpy as np
+
+import cyber_models
+
+
+def test_test_mask_is_stable_under_appends():
+    before = cyber_models.test_mask(1000)
+    after = cyber_models.test_mask(1500)
+    np.testing.assert_array_equal(after[:1000], before)
+
+
+def test_test_mask_start_gives_the_tail_of_the_full_mask():
+    full = cyber_models.test_mask(1500)
+    np.testing.assert_array_equal(cyber_models.test_mask(500, start=1000), full[1000:])
+
+
+def test_test_mask_selects_test_size_of_the_rows():
+    mask = cyber_models.test_mask(100_000)
+    assert abs(mask.mean() - cyber_models.TEST_SIZE) < 0.01
+    assert not np.array_equal(mask, cyber_models.test_mask(100_000, seed=7))
+
+
+def test_split_dataset_follows_test_mask(dataset):
+    df, _ = dataset
+    split = cyber_models.split_dataset(df)
+    mask = cyber_models.test_mask(len(df))
+    assert len(split.X_test) == mask.sum()
+    np.testing.assert_array_equal(split.X_test.index, df.index[mask])
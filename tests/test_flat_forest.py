@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from flat_forest import FlatForest
+
+
+@pytest.mark.parametrize('name', ['rf_attack', 'rf_thr'])
+def test_classifier_matches_sklearn(models, split, name):
+    flat = FlatForest.from_sklearn(models[name])
+    np.testing.assert_allclose(flat.predict_proba(split.X_test), models[name].predict_proba(split.X_test),
+                               rtol=1e-6, atol=1e-9)
+    np.testing.assert_array_equal(flat.predict(split.X_test), models[name].predict(split.X_test))
+
+
+def test_regressor_matches_sklearn(models, split):
+    flat = FlatForest.from_sklearn(models['rf_sev'])
+    np.testing.assert_allclose(flat.predict(split.X_test), models['rf_sev'].predict(split.X_test), rtol=1e-6)
+
+
+def test_small_chunks_give_the_same_predictions(models, split):
+    flat = FlatForest.from_sklearn(models['rf_attack'])
+    np.testing.assert_array_equal(flat.predict_proba(split.X_test, chunk_rows=7), flat.predict_proba(split.X_test))
+
+
+@pytest.mark.parametrize('name', ['rf_sev', 'rf_attack'])
+def test_contributions_add_up_to_the_prediction(models, split, name):
+    flat = FlatForest.from_sklearn(models[name])
+    X = split.X_test.iloc[:50]
+    bias, contributions = flat.contributions(X, chunk_rows=16)
+    total = bias + contributions.sum(axis=1)
+    expected = flat.predict_proba(X) if flat.kind == 'classifier' else flat.predict(X)[:, None]
+    np.testing.assert_allclose(total, expected, atol=1e-6)
+
+
+def test_save_and_mmap_load_round_trip(models, split, tmp_path):
+    flat = FlatForest.from_sklearn(models['rf_thr'])
+    flat.save(tmp_path / 'forest')
+    loaded = FlatForest.load(tmp_path / 'forest', mmap=True)
+    assert loaded.path is not None
+    np.testing.assert_array_equal(loaded.predict_proba(split.X_test), flat.predict_proba(split.X_test))
@@ -0,0 +1,134 @@
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import incident_append
+from conftest import SMALL_PARAMS
+from cyber_data import CATEGORICAL_COLUMNS, DATA_PATH, NUMERIC_COLUMNS, clean_frame, dataset_version, load_dataset
+from cyber_models import split_dataset, train_models
+from incident_append import RefitPolicy, append_incidents, extend_label_encoders, grow_forest, unseen_classes
+from incident_cube import IncidentCube
+from model_store import ModelStore
+from partitioned_aggregation import PartialAggregate, aggregate_path_for
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """A copy of the sample dataset with models trained and recorded as on the dashboard's first start."""
+    monkeypatch.setattr(incident_append, 'LINEAGE_PATH', tmp_path / 'lineage.json')
+    source = tmp_path / 'incidents.csv'
+    source.write_bytes(DATA_PATH.read_bytes())
+    cache_dir, aggregate_dir = tmp_path / 'cache', tmp_path / 'aggregates'
+    store = ModelStore(tmp_path / 'models')
+    store.publish_params(SMALL_PARAMS)
+    df, _ = load_dataset(source, cache_dir)
+    train_models(store, split_dataset(df), version=dataset_version(source, cache_dir))
+
+    def append(rows, policy=None):
+        return append_incidents(rows, source, store, policy, cache_dir=cache_dir, aggregate_dir=aggregate_dir)
+
+    return {'source': source, 'cache_dir': cache_dir, 'aggregate_dir': aggregate_dir, 'store': store,
+            'df': df, 'append': append, 'models_root': tmp_path / 'models'}
+
+
+def as_raw(df):
+    return df[CATEGORICAL_COLUMNS + NUMERIC_COLUMNS].astype({col: str for col in CATEGORICAL_COLUMNS})
+
+
+def test_extend_label_encoders_keeps_existing_codes(dataset):
+    _, label_encoders = dataset
+    delta = pd.DataFrame({'Country': ['Atlantis', 'USA', 'Atlantis'], 'Attack Type': ['Phishing'] * 3})
+    extended, new_labels = extend_label_encoders(label_encoders, delta)
+    assert new_labels == {'Country': ['Atlantis']}
+    old = label_encoders['Country'].classes_
+    np.testing.assert_array_equal(extended['Country'].transform(old), np.arange(len(old)))
+    assert extended['Country'].transform(['Atlantis'])[0] == len(old)
+    assert list(label_encoders['Country'].classes_) == list(old)
+
+
+def test_append_matches_full_rebuild(workspace, raw_incidents):
+    batch = raw_incidents.sample(60, random_state=0).copy()
+    batch.iloc[:5, batch.columns.get_loc('Country')] = 'Atlantis'
+    report = workspace['append'](batch)
+    assert report.new_labels == {'Country': ['Atlantis']}
+
+    full, label_encoders = load_dataset(workspace['source'], workspace['cache_dir'])
+    expected = clean_frame(pd.concat([raw_incidents, batch], ignore_index=True))
+    pd.testing.assert_frame_equal(as_raw(full), as_raw(expected), check_dtype=False)
+    # Codes issued before the append are unchanged
+    old = workspace['df']
+    np.testing.assert_array_equal(full['Country_encoded'].to_numpy()[:len(old)], old['Country_encoded'])
+
+    version = dataset_version(workspace['source'], workspace['cache_dir'])
+    assert report.dataset_version == version
+    aggregate = PartialAggregate.load(aggregate_path_for(version, workspace['aggregate_dir']))
+    rebuilt = IncidentCube.from_frame(full)
+    merged_counts, rebuilt_counts = (counts.rename(columns=str).sort_index(axis=1)
+                                     for counts in (aggregate.cube.counts('Year', 'Country'),
+                                                    rebuilt.counts('Year', 'Country')))
+    pd.testing.assert_frame_equal(merged_counts, rebuilt_counts, check_names=False, check_column_type=False)
+
+    # The dashboard's keys for the rebuilt dataset find the appended models, so nothing is retrained
+    split = split_dataset(full)
+    models, timings = train_models(ModelStore(workspace['models_root']), split, version=version)
+    assert timings == {}
+    for name, action in report.actions.items():
+        assert action.startswith('grown')
+        assert models[name].n_estimators == len(models[name].estimators_) > SMALL_PARAMS[name]['n_estimators']
+    n_attack_types = len(label_encoders['Attack Type'].classes_)
+    assert models['rf_attack'].predict_proba(split.X_test).shape == (len(split.X_test), n_attack_types)
+
+
+def test_small_batches_grow_and_large_ones_refit(workspace, raw_incidents):
+    report = workspace['append'](raw_incidents.sample(40, random_state=1))
+    assert all(action.startswith('grown') for action in report.actions.values())
+    report = workspace['append'](raw_incidents.sample(40, random_state=2), RefitPolicy(max_delta_fraction=0.01))
+    assert set(report.actions.values()) == {'refit'}
+
+
+def test_unseen_target_class_refits_that_model(workspace, raw_incidents):
+    batch = raw_incidents.sample(40, random_state=3).copy()
+    batch.iloc[:3, batch.columns.get_loc('Attack Type')] = 'Quantum Heist'
+    report = workspace['append'](batch)
+    assert report.actions['rf_attack'] == 'refit'
+    assert report.actions['rf_thr'].startswith('grown')
+
+
+def test_refit_policy_thresholds():
+    policy = RefitPolicy(max_delta_fraction=0.25, max_tree_growth=0.5)
+    lineage = {'rows_at_refit': 1000, 'trees_at_refit': 100, 'rows_since_refit': 200, 'trees_added': 20}
+    assert policy.new_tree_count(lineage, 10) == 1
+    assert policy.new_tree_count(lineage, 100) == 10
+    assert not policy.needs_refit(lineage, 40, 4, new_classes=False)
+    assert policy.needs_refit(lineage, 40, 4, new_classes=True)
+    assert policy.needs_refit(lineage, 60, 6, new_classes=False)
+    assert policy.needs_refit({**lineage, 'trees_added': 48}, 10, 3, new_classes=False)
+
+
+def test_grow_forest_keeps_the_forest_class_layout(models, split):
+    model = models['rf_thr']
+    classes = model.classes_
+    X, y = split.X_train.iloc[:200], split.y_train['rf_thr'].iloc[:200]
+    # A batch holding only two of the forest's classes
+    keep = y.isin(classes[:2]).to_numpy()
+    before = len(model.estimators_)
+    grown = grow_forest(copy.deepcopy(model), X[keep], y[keep], 3)
+    assert len(grown.estimators_) == grown.n_estimators == before + 3
+    np.testing.assert_array_equal(grown.classes_, classes)
+    proba = grown.predict_proba(split.X_test)
+    assert proba.shape == (len(split.X_test), len(classes))
+    np.testing.assert_allclose(proba.sum(axis=1), 1)
+    # The new trees only vote for the classes they were fitted on
+    new_votes = np.mean([tree.predict_proba(split.X_test.to_numpy()) for tree in grown.estimators_[before:]], axis=0)
+    assert np.all(new_votes[:, 2:] == 0)
+
+
+def test_unseen_classes(models, split):
+    model = models['rf_attack']
+    assert len(unseen_classes(model, model.classes_[:2])) == 0
+    np.testing.assert_array_equal(unseen_classes(model, [model.classes_.max() + 1]), [model.classes_.max() + 1])
+    assert len(unseen_classes(models['rf_sev'], [1.5, 2.5])) == 0
+    with pytest.raises(ValueError):
+        grow_forest(copy.deepcopy(model), split.X_train.iloc[:1], [model.classes_.max() + 1], 1)
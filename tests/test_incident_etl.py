@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from cyber_data import CATEGORICAL_COLUMNS, NUMERIC_COLUMNS, clean_frame
+from incident_etl import load_partitioned, row_hashes, run_etl
+
+
+@pytest.fixture
+def raw_csv(raw_incidents, tmp_path):
+    """The sample with duplicated rows (near and far apart, across chunks) and some blanks."""
+    mixed = pd.concat([raw_incidents, raw_incidents.sample(400, random_state=1)])
+    mixed = mixed.sample(frac=1, random_state=2).reset_index(drop=True)
+    mixed = pd.concat([mixed, mixed.iloc[:50]], ignore_index=True)
+    for col in ['Country', 'Financial Loss (in Million $)', 'Attack Type']:
+        mixed.loc[mixed.sample(30, random_state=3).index, col] = np.nan
+    path = tmp_path / 'raw.csv'
+    mixed.to_csv(path, index=False)
+    return path
+
+
+def canonical(df):
+    columns = CATEGORICAL_COLUMNS + NUMERIC_COLUMNS
+    df = df[columns].astype({col: str for col in CATEGORICAL_COLUMNS})
+    df = df.astype({col: float for col in NUMERIC_COLUMNS})
+    return df.sort_values(columns).reset_index(drop=True)
+
+
+def test_etl_matches_drop_duplicates(raw_csv, tmp_path):
+    expected = clean_frame(pd.read_csv(raw_csv).drop_duplicates())
+    report = run_etl(raw_csv, tmp_path / 'out', chunksize=700, memory_mb=0.05, csv_path=tmp_path / 'clean.csv')
+    assert report.partitions > 1
+    assert report.rows_written == len(expected)
+    assert report.duplicates == report.rows_read - len(expected)
+    pd.testing.assert_frame_equal(canonical(load_partitioned(tmp_path / 'out')), canonical(expected))
+    # The CSV keeps the source order of the first occurrences
+    written = clean_frame(pd.read_csv(tmp_path / 'clean.csv'))
+    pd.testing.assert_frame_equal(written.astype(str), expected.reset_index(drop=True).astype(str))
+
+
+def test_etl_reads_only_requested_years(raw_csv, tmp_path):
+    expected = clean_frame(pd.read_csv(raw_csv).drop_duplicates())
+    run_etl(raw_csv, tmp_path / 'out', chunksize=1000)
+    year = int(expected['Year'].iloc[0])
+    assert len(load_partitioned(tmp_path / 'out', years=[year])) == (expected['Year'] == year).sum()
+
+
+def test_etl_output_is_deterministic(raw_csv, tmp_path):
+    first = run_etl(raw_csv, tmp_path / 'a', chunksize=500)
+    second = run_etl(raw_csv, tmp_path / 'b', chunksize=500)
+    assert first.years == second.years
+    for part in sorted((tmp_path / 'a').rglob('*.arrow')):
+        assert part.read_bytes() == (tmp_path / 'b' / part.relative_to(tmp_path / 'a')).read_bytes()
+
+
+def test_row_hashes_separate_nulls_empties_and_shifted_values():
+    batch = pa.record_batch([pa.array(['ab', 'a', None, '', 'x' * 100, 'x' * 100]),
+                             pa.array(['c', 'bc', '', None, 'y', 'y'])], names=['a', 'b'])
+    h1, h2 = row_hashes(batch)
+    pairs = list(zip(h1.tolist(), h2.tolist()))
+    assert len(set(pairs[:5])) == 5
+    assert pairs[4] == pairs[5]
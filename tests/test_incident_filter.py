@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from incident_filter import BitmapIndex, FilterEngine, FilterState, popcount
+from partitioned_aggregation import aggregate_parallel
+
+
+@pytest.fixture(scope='module')
+def engine(dataset):
+    df, label_encoders = dataset
+    return FilterEngine(df, label_encoders, aggregate_parallel(df, workers=1))
+
+
+def pandas_mask(df, state):
+    mask = np.ones(len(df), dtype=bool)
+    if state.countries:
+        mask &= df['Country'].isin(state.countries).to_numpy()
+    if state.years is not None:
+        mask &= df['Year'].between(*state.years).to_numpy()
+    if state.industries:
+        mask &= df['Target Industry'].isin(state.industries).to_numpy()
+    if state.sources:
+        mask &= df['Attack Source'].isin(state.sources).to_numpy()
+    return mask
+
+
+def random_states(df, n, seed=0):
+    rng = np.random.default_rng(seed)
+    values = {col: sorted(df[col].astype(str).unique()) for col in ('Country', 'Target Industry', 'Attack Source')}
+    years = sorted(df['Year'].unique())
+    for _ in range(n):
+        pick = {col: list(rng.choice(options, rng.integers(0, 3), replace=False)) for col, options in values.items()}
+        low, high = sorted(rng.choice(years, 2))
+        yield FilterState.from_selection(pick['Country'], (low, high) if rng.random() < 0.5 else None,
+                                         pick['Target Industry'], pick['Attack Source'])
+
+
+def test_bitmap_select_matches_pandas_filter(dataset):
+    df, label_encoders = dataset
+    index = BitmapIndex.from_frame(df, label_encoders)
+    for country in index.values('Country')[:3]:
+        for source in index.values('Attack Source')[:2]:
+            bitmap = index.select({'Country': [country], 'Attack Source': [source]})
+            expected = ((df['Country'] == country) & (df['Attack Source'] == source)).to_numpy()
+            np.testing.assert_array_equal(index.to_mask(bitmap), expected)
+            assert popcount(bitmap) == expected.sum()
+
+
+def test_bitmap_index_without_encoded_columns(dataset):
+    df, _ = dataset
+    plain = df[['Country', 'Year', 'Target Industry', 'Attack Source']]
+    index = BitmapIndex.from_frame(plain, {})
+    year = index.values('Year')[0]
+    np.testing.assert_array_equal(index.to_mask(index.select({'Year': [year]})), (plain['Year'] == year).to_numpy())
+
+
+def test_filter_engine_matches_pandas(dataset, engine):
+    df, _ = dataset
+    for state in random_states(df, 25):
+        expected = pandas_mask(df, state)
+        mask = engine.mask(state)
+        np.testing.assert_array_equal(np.ones(len(df), bool) if mask is None else mask, expected)
+        filtered = engine.aggregates(state)
+        assert filtered.n_rows == expected.sum()
+        assert filtered.cube.total_count == expected.sum()
+
+
+def test_empty_state_selects_every_row(dataset, engine):
+    df, _ = dataset
+    assert engine.mask(FilterState()) is None
+    assert engine.aggregates(FilterState()).n_rows == len(df)
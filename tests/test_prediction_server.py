@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import pytest
+
+from cyber_data import CATEGORICAL_FEATURES
+from prediction_server import MAX_BODY_BYTES, HTTPError, MicroBatcher, PredictionServer, ServiceStats, read_request
+
+
+@pytest.fixture
+def scenario(dataset):
+    _, label_encoders = dataset
+    scenario = {col: str(label_encoders[col].classes_[0]) for col in CATEGORICAL_FEATURES}
+    scenario.update({'Year': 2020, 'Number of Affected Users': 500_000, 'Incident Resolution Time (in Hours)': 36})
+    return scenario
+
+
+@pytest.fixture
+def call(models, dataset):
+    """``call(method, path, body)`` -> ``(status, payload)`` through a running batcher."""
+    _, label_encoders = dataset
+
+    def call(method, path, body=b''):
+        async def run():
+            stats = ServiceStats()
+            batcher = MicroBatcher(models, label_encoders, stats, max_wait_ms=1)
+            batcher.start()
+            return await PredictionServer(batcher, stats).route(method, path, body)
+        return asyncio.run(run())
+    return call
+
+
+def post(call, scenario):
+    return call('POST', '/predict', json.dumps(scenario).encode())
+
+
+def test_predict_returns_decoded_labels(call, scenario, dataset):
+    status, payload = post(call, scenario)
+    assert status == 200
+    assert payload['Predicted Attack Type'] in set(dataset[1]['Attack Type'].classes_)
+    assert payload['Predicted Target Industry'] in set(dataset[1]['Target Industry'].classes_)
+    assert isinstance(payload['Predicted Financial Loss (in Million $)'], float)
+
+
+def test_encoded_codes_are_accepted(call, scenario):
+    encoded = {k: v for k, v in scenario.items() if k not in CATEGORICAL_FEATURES}
+    encoded.update({col + '_encoded': 0 for col in CATEGORICAL_FEATURES})
+    by_code, by_label = post(call, encoded), post(call, scenario)
+    assert by_code[0] == by_label[0] == 200
+    by_code[1].pop('latency_ms'), by_label[1].pop('latency_ms')
+    assert by_code[1] == by_label[1]
+
+
+@pytest.mark.parametrize('change', [
+    {'Country': 'Atlantis'},
+    {'Year': 'soon'},
+    {'Year': float('nan')},
+    {'Number of Affected Users': float('inf')},
+    {'Incident Resolution Time (in Hours)': True},
+    {'Country_encoded': 1.7},
+    {'Country_encoded': -1},
+    {'Country_encoded': 10_000},
+])
+def test_invalid_values_are_rejected(call, scenario, change):
+    status, payload = post(call, {**scenario, **change})
+    assert status == 400
+    assert 'error' in payload
+
+
+def test_missing_feature_is_rejected(call, scenario):
+    del scenario['Year']
+    assert post(call, scenario)[0] == 400
+
+
+@pytest.mark.parametrize('body', [b'{not json', b'[1, 2]', b'null'])
+def test_malformed_bodies_are_rejected(call, body):
+    assert call('POST', '/predict', body)[0] == 400
+
+
+def test_routing_status_codes(call):
+    assert call('GET', '/health') == (200, {'status': 'ok'})
+    assert call('GET', '/stats')[0] == 200
+    assert call('GET', '/predict')[0] == 405
+    assert call('GET', '/nowhere')[0] == 404
+
+
+def parse(data, limit=2 ** 16):
+    async def run():
+        reader = asyncio.StreamReader(limit=limit)
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await read_request(reader)
+    return asyncio.run(run())
+
+
+def test_read_request_parses_method_path_and_body():
+    method, path, headers, body = parse(b'post /predict?x=1 HTTP/1.1\r\nContent-Length: 2\r\n\r\n{}')
+    assert (method, path, headers['content-length'], body) == ('POST', '/predict', '2', b'{}')
+    assert parse(b'') is None
+
+
+@pytest.mark.parametrize('data, status', [
+    (b'GARBAGE\r\n\r\n', 400),
+    (b'POST /predict HTTP/1.1\r\nContent-Length: abc\r\n\r\n', 400),
+    (b'POST /predict HTTP/1.1\r\nContent-Length: -5\r\n\r\n', 400),
+    (b'POST /predict HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % (MAX_BODY_BYTES + 1), 413),
+    (b'GET /health HTTP/1.1\r\nX-Long: ' + b'a' * 5000 + b'\r\n\r\n', 400),
+    (b'GET /' + b'a' * 5000 + b' HTTP/1.1\r\n\r\n', 400),
+])
+def test_read_request_status_codes(data, status):
+    with pytest.raises(HTTPError) as error:
+        parse(data, limit=1024)
+    assert error.value.status == status
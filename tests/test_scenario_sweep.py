@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from cyber_data import CATEGORICAL_FEATURES, NUMERIC_FEATURES
+from cyber_models import MODEL_SPECS
+from flat_forest import FlatForest
+from scenario_sweep import axis_values, predict_grid_chunked, sweep
+
+
+@pytest.fixture(scope='module')
+def grid(dataset):
+    df, _ = dataset
+    fixed = {col + '_encoded': 1 for col in CATEGORICAL_FEATURES}
+    axes = {col: axis_values(df[col].min(), df[col].max(), 12, integer=(col == 'Year')) for col in NUMERIC_FEATURES}
+    return fixed, axes
+
+
+@pytest.mark.parametrize('flat', [False, True])
+def test_sweep_matches_predict_on_the_explicit_grid(models, grid, flat):
+    fixed, axes = grid
+    scored = {name: FlatForest.from_sklearn(model) if flat else model for name, model in models.items()}
+    result = sweep(scored, fixed, axes)
+    reference = predict_grid_chunked(scored, fixed, axes, chunk_rows=500)
+    for name, (kind, _, _) in MODEL_SPECS.items():
+        if kind == 'classifier':
+            np.testing.assert_array_equal(result.predictions[name], reference[name])
+        else:
+            np.testing.assert_allclose(result.predictions[name], reference[name], rtol=1e-9)
+
+
+def test_sweep_requires_every_unswept_feature(models, grid):
+    fixed, axes = grid
+    with pytest.raises(ValueError):
+        sweep(models, dict(list(fixed.items())[1:]), axes)
+
+
+def test_axis_values_integer_axis_is_unique():
+    np.testing.assert_array_equal(axis_values(2015, 2024, 50, integer=True), np.arange(2015, 2025))
@@ -0,0 +1,100 @@
+"""Concurrent multi-target training over one shared feature buffer.
+
+The training features are converted once to the C-contiguous ``float32``
+matrix scikit-learn's trees work on and placed in shared memory. Every
+target is fitted in its own worker process against a view of that buffer
+(no per-target copy), with the machine's cores split between the workers
+through each forest's ``n_jobs``. Each worker measures its own wall-clock
+and CPU time, including the forest's tree-building threads.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+@dataclass
+class TargetTiming:
+    name: str
+    wall_s: float
+    cpu_s: float
+    n_jobs: int
+
+
+def _fit_target(name, estimator, y, X=None, shm_name=None, shape=None):
+    shm = None
+    if X is None:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        X = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+    try:
+        wall, cpu = time.perf_counter(), time.process_time()
+        estimator.fit(X, y)
+        timing = TargetTiming(name, time.perf_counter() - wall, time.process_time() - cpu,
+                              estimator.get_params().get('n_jobs') or 1)
+    finally:
+        if shm is not None:
+            del X
+            shm.close()
+    return name, estimator, timing
+
+
+def _copy_features(X, out):
+    """Cast ``X`` into the ``float32`` array ``out`` without an intermediate copy."""
+    if hasattr(X, 'columns'):
+        # Column by column, so a mixed-dtype frame is never consolidated into a temporary matrix
+        for i in range(X.shape[1]):
+            np.copyto(out[:, i], X.iloc[:, i].to_numpy(), casting='unsafe')
+    else:
+        np.copyto(out, X, casting='unsafe')
+    return out
+
+
+def fit_concurrently(X, tasks, n_jobs=None, feature_names=None):
+    """Fit several estimators on the same features concurrently.
+
+    ``tasks`` maps a name to ``(estimator, y)``. Cores (``n_jobs``, default:
+    all) are split evenly between the targets. Returns ``(models, timings)``
+    where ``timings`` maps each name to a ``TargetTiming`` plus ``'total'``.
+    """
+    if not tasks:
+        return {}, {}
+    n_jobs = n_jobs or os.cpu_count() or 1
+    shape = np.shape(X)
+    names = feature_names if feature_names is not None else getattr(X, 'columns', None)
+    per_target = max(1, n_jobs // len(tasks))
+    for estimator, _ in tasks.values():
+        estimator.set_params(n_jobs=per_target)
+
+    start = time.perf_counter()
+    results = []
+    if n_jobs == 1 or len(tasks) == 1:
+        X_local = np.ascontiguousarray(X, dtype=np.float32)
+        for name, (estimator, y) in tasks.items():
+            results.append(_fit_target(name, estimator, np.asarray(y), X=X_local))
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * 4, 1))
+        try:
+            _copy_features(X, np.ndarray(shape, dtype=np.float32, buffer=shm.buf))
+            with ProcessPoolExecutor(min(len(tasks), n_jobs)) as pool:
+                futures = [pool.submit(_fit_target, name, estimator, np.asarray(y),
+                                       shm_name=shm.name, shape=shape)
+                           for name, (estimator, y) in tasks.items()]
+                results = [future.result() for future in futures]
+        finally:
+            shm.close()
+            shm.unlink()
+    total = time.perf_counter() - start
+
+    models, timings = {}, {}
+    for name, estimator, timing in results:
+        # Fitted on a bare array; restore the column names so DataFrame input is validated as usual
+        if names is not None:
+            estimator.feature_names_in_ = np.asarray(list(names), dtype=object)
+        estimator.set_params(n_jobs=None)
+        models[name], timings[name] = estimator, timing
+    timings['total'] = TargetTiming('total', total, sum(t.cpu_s for t in timings.values()), n_jobs)
+    return models, timings